@@ -0,0 +1,415 @@
+import math
+import numpy as np
+from vector import Vector2
+from flatBody import FlatAABB
+from collision import collideAABB
+
+NULL_NODE = -1
+
+class TreeNode:
+    def __init__(self) -> None:
+        self.aabb = None
+        self.parent = NULL_NODE
+        self.child1 = NULL_NODE
+        self.child2 = NULL_NODE
+        #leaves has a height of 0, free nodes has a height of -1
+        self.height = -1
+        self.item = None
+
+    def is_leaf(self) -> bool:
+        return self.child1 == NULL_NODE
+
+def _union(aabbA: FlatAABB, aabbB: FlatAABB) -> FlatAABB:
+    return FlatAABB(min(aabbA.minX, aabbB.minX), max(aabbA.maxX, aabbB.maxX), min(aabbA.minY, aabbB.minY), max(aabbA.maxY, aabbB.maxY), None)
+
+def _perimeter(aabb: FlatAABB) -> float:
+    return 2*(aabb.maxX-aabb.minX + aabb.maxY-aabb.minY)
+
+def _contains(outer: FlatAABB, inner: FlatAABB) -> bool:
+    return outer.minX <= inner.minX and outer.minY <= inner.minY and inner.maxX <= outer.maxX and inner.maxY <= outer.maxY
+
+def _fatten(aabb: FlatAABB, margin: float) -> FlatAABB:
+    return FlatAABB(aabb.minX-margin, aabb.maxX+margin, aabb.minY-margin, aabb.maxY+margin, None)
+
+def ray_aabb_distance(origin: Vector2, direction: Vector2, aabb: FlatAABB, maxDistance: float):
+    """slab test, returns the distance along the (normalized) direction where the ray enters the aabb or None"""
+    near = 0
+    far = maxDistance
+    for start, dir, low, high in ((origin.x, direction.x, aabb.minX, aabb.maxX), (origin.y, direction.y, aabb.minY, aabb.maxY)):
+        if dir == 0:
+            if start < low or start > high:
+                return None
+            continue
+        t1 = (low-start)/dir
+        t2 = (high-start)/dir
+        if t1 > t2:
+            t1, t2 = t2, t1
+        near = max(near, t1)
+        far = min(far, t2)
+        if near > far:
+            return None
+    return near
+
+class DynamicAABBTree:
+    """
+    bounding volume hierarchy that is updated incrementally
+    every leaf stores a fattened aabb so the leaf only has to be reinserted when the item moves out of it
+    """
+    def __init__(self, margin: float = 0.2) -> None:
+        self.margin = margin
+        self.nodes = []
+        self.freeNodes = []
+        self.root = NULL_NODE
+        #how many leaves (proxies) the tree has, kept up to date so destroy_proxies doesn't have to count them
+        self.leafCount = 0
+
+    def _allocate_node(self) -> int:
+        if self.freeNodes:
+            nodeId = self.freeNodes.pop()
+            node = self.nodes[nodeId]
+        else:
+            nodeId = len(self.nodes)
+            node = TreeNode()
+            self.nodes.append(node)
+        node.parent = NULL_NODE
+        node.child1 = NULL_NODE
+        node.child2 = NULL_NODE
+        node.height = 0
+        node.item = None
+        return nodeId
+
+    def _free_node(self, nodeId: int) -> None:
+        node = self.nodes[nodeId]
+        node.height = -1
+        node.item = None
+        node.aabb = None
+        self.freeNodes.append(nodeId)
+
+    def create_proxy(self, aabb: FlatAABB, item) -> int:
+        proxyId = self._allocate_node()
+        node = self.nodes[proxyId]
+        node.aabb = _fatten(aabb, self.margin)
+        node.item = item
+        self._insert_leaf(proxyId)
+        self.leafCount += 1
+        return proxyId
+
+    def create_proxies(self, aabbs: list, items: list) -> list:
+        """
+        does what create_proxy does for every aabb and item, the new leaves are built into a subtree with _build
+        which is then inserted like one leaf, so adding many items costs n log n instead of a walk down the tree for every item
+        """
+        leaves = []
+        nodes = self.nodes
+        margin = self.margin
+        for aabb, item in zip(aabbs, items):
+            proxyId = self._allocate_node()
+            node = nodes[proxyId]
+            node.aabb = _fatten(aabb, margin)
+            node.item = item
+            leaves.append(proxyId)
+        if leaves:
+            self._insert_leaf(self._build(leaves))
+        self.leafCount += len(leaves)
+        return leaves
+
+    def _build(self, leaves: list) -> int:
+        """
+        splits the leaves at the median of the longer side of their centers until every node has two children
+        the splits of a whole level of the tree are done together with numpy, the leaves are kept in one array
+        where every node to be split is a segment, then the nodes are made from the bottom level up
+        """
+        nodes = self.nodes
+        count = len(leaves)
+        if count == 1:
+            return leaves[0]
+        aabbs = np.array([(aabb.minX, aabb.maxX, aabb.minY, aabb.maxY) for aabb in (nodes[leaf].aabb for leaf in leaves)])
+        centers = np.column_stack((aabbs[:, 0]+aabbs[:, 1], aabbs[:, 2]+aabbs[:, 3]))
+        order = np.arange(count)
+        starts = np.array([0])
+        ends = np.array([count])
+        levels = []
+        while len(starts):
+            lengths = ends-starts
+            #the place in order of every leaf of the segments, segment by segment
+            offsets = np.cumsum(lengths)-lengths
+            positions = np.repeat(starts-offsets, lengths)+np.arange(lengths.sum())
+            segmentCenters = centers[order[positions]]
+            segmentAABBs = aabbs[order[positions]]
+            spread = np.maximum.reduceat(segmentCenters, offsets)-np.minimum.reduceat(segmentCenters, offsets)
+            axes = (spread[:, 1] >= spread[:, 0]).astype(np.int64)
+            keys = np.zeros(count)
+            keys[positions] = segmentCenters[np.arange(len(positions)), np.repeat(axes, lengths)]
+            #the leaves are sorted inside their segment and the ones not in a segment stay where they are
+            boundaries = np.zeros(count+1, np.int64)
+            boundaries[starts] = 1
+            boundaries[ends] = 1
+            order = order[np.lexsort((keys, np.cumsum(boundaries[:count])))]
+            levels.append((starts.tolist(), ends.tolist(), np.minimum.reduceat(segmentAABBs, offsets).tolist(), np.maximum.reduceat(segmentAABBs, offsets).tolist()))
+            middles = starts+lengths//2
+            starts = np.concatenate((starts, middles))
+            ends = np.concatenate((middles, ends))
+            split = ends-starts > 1
+            starts = starts[split]
+            ends = ends[split]
+        #a segment of one leaf is that leaf, the others are the nodes made for them
+        leafOrder = np.array(leaves)[order].tolist()
+        made = {}
+        for levelStarts, levelEnds, minima, maxima in reversed(levels):
+            for start, end, (minX, _, minY, _), (_, maxX, _, maxY) in zip(levelStarts, levelEnds, minima, maxima):
+                middle = start+(end-start)//2
+                child1 = leafOrder[start] if middle-start == 1 else made[start, middle]
+                child2 = leafOrder[middle] if end-middle == 1 else made[middle, end]
+                parent = self._allocate_node()
+                node = nodes[parent]
+                node.child1 = child1
+                node.child2 = child2
+                node.aabb = FlatAABB(minX, maxX, minY, maxY, None)
+                node.height = 1+max(nodes[child1].height, nodes[child2].height)
+                nodes[child1].parent = parent
+                nodes[child2].parent = parent
+                made[start, end] = parent
+        return made[0, count]
+
+    def destroy_proxy(self, proxyId: int) -> None:
+        self._remove_leaf(proxyId)
+        self._free_node(proxyId)
+        self.leafCount -= 1
+
+    def destroy_proxies(self, proxyIds: list) -> None:
+        """does what destroy_proxy does for every proxy, the tree is built again from the leaves that are left when many are removed"""
+        if len(proxyIds)*4 < self.leafCount:
+            for proxyId in proxyIds:
+                self.destroy_proxy(proxyId)
+            return
+        nodes = self.nodes
+        removed = set(proxyIds)
+        leaves = []
+        for nodeId, node in enumerate(nodes):
+            if node.height == 0 and nodeId not in removed:
+                leaves.append(nodeId)
+            elif node.height >= 0:
+                self._free_node(nodeId)
+        self.leafCount = len(leaves)
+        if not leaves:
+            self.root = NULL_NODE
+            return
+        self.root = self._build(leaves)
+        nodes[self.root].parent = NULL_NODE
+
+    def move_proxy(self, proxyId: int, aabb: FlatAABB) -> bool:
+        """returns True if the leaf had to be reinserted"""
+        if _contains(self.nodes[proxyId].aabb, aabb):
+            return False
+        self._remove_leaf(proxyId)
+        self.nodes[proxyId].aabb = _fatten(aabb, self.margin)
+        self._insert_leaf(proxyId)
+        return True
+
+    def get_item(self, proxyId: int):
+        return self.nodes[proxyId].item
+
+    def get_fatAABB(self, proxyId: int) -> FlatAABB:
+        return self.nodes[proxyId].aabb
+
+    def _insert_leaf(self, leaf: int) -> None:
+        nodes = self.nodes
+        if self.root == NULL_NODE:
+            self.root = leaf
+            nodes[leaf].parent = NULL_NODE
+            return
+
+        #find the best sibling by walking down to the child whose area grows the least
+        leafAABB = nodes[leaf].aabb
+        index = self.root
+        while not nodes[index].is_leaf():
+            node = nodes[index]
+            area = _perimeter(node.aabb)
+            combinedArea = _perimeter(_union(node.aabb, leafAABB))
+            #cost of making a new parent for this node and the leaf
+            cost = 2*combinedArea
+            #minimum cost of pushing the leaf further down the tree
+            inheritanceCost = 2*(combinedArea-area)
+
+            childCosts = []
+            for child in (node.child1, node.child2):
+                childAABB = nodes[child].aabb
+                if nodes[child].is_leaf():
+                    childCosts.append(_perimeter(_union(childAABB, leafAABB))+inheritanceCost)
+                else:
+                    childCosts.append(_perimeter(_union(childAABB, leafAABB))-_perimeter(childAABB)+inheritanceCost)
+            if cost < childCosts[0] and cost < childCosts[1]:
+                break
+            index = node.child1 if childCosts[0] < childCosts[1] else node.child2
+
+        sibling = index
+        oldParent = nodes[sibling].parent
+        newParent = self._allocate_node()
+        nodes[newParent].parent = oldParent
+        nodes[newParent].aabb = _union(leafAABB, nodes[sibling].aabb)
+        nodes[newParent].height = nodes[sibling].height+1
+        nodes[newParent].child1 = sibling
+        nodes[newParent].child2 = leaf
+        nodes[sibling].parent = newParent
+        nodes[leaf].parent = newParent
+        if oldParent == NULL_NODE:
+            self.root = newParent
+        elif nodes[oldParent].child1 == sibling:
+            nodes[oldParent].child1 = newParent
+        else:
+            nodes[oldParent].child2 = newParent
+
+        self._refit(nodes[leaf].parent)
+
+    def _remove_leaf(self, leaf: int) -> None:
+        nodes = self.nodes
+        if leaf == self.root:
+            self.root = NULL_NODE
+            return
+        parent = nodes[leaf].parent
+        grandParent = nodes[parent].parent
+        sibling = nodes[parent].child2 if nodes[parent].child1 == leaf else nodes[parent].child1
+
+        if grandParent == NULL_NODE:
+            self.root = sibling
+            nodes[sibling].parent = NULL_NODE
+            self._free_node(parent)
+            return
+        if nodes[grandParent].child1 == parent:
+            nodes[grandParent].child1 = sibling
+        else:
+            nodes[grandParent].child2 = sibling
+        nodes[sibling].parent = grandParent
+        self._free_node(parent)
+        self._refit(grandParent)
+
+    def _refit(self, index: int) -> None:
+        """walks back up to the root fixing the heights and aabbs and balancing the tree on the way"""
+        nodes = self.nodes
+        while index != NULL_NODE:
+            index = self._balance(index)
+            node = nodes[index]
+            child1 = nodes[node.child1]
+            child2 = nodes[node.child2]
+            node.height = 1+max(child1.height, child2.height)
+            node.aabb = _union(child1.aabb, child2.aabb)
+            index = node.parent
+
+    def _balance(self, indexA: int) -> int:
+        """rotates the tree if it is not balanced at A and returns the index of the new subtree root"""
+        nodes = self.nodes
+        A = nodes[indexA]
+        if A.is_leaf() or A.height < 2:
+            return indexA
+        indexB = A.child1
+        indexC = A.child2
+        B = nodes[indexB]
+        C = nodes[indexC]
+        balance = C.height-B.height
+        if balance > 1:
+            return self._rotate(indexA, indexC, indexB)
+        if balance < -1:
+            return self._rotate(indexA, indexB, indexC)
+        return indexA
+
+    def _rotate(self, indexA: int, indexUp: int, indexOther: int) -> int:
+        """promotes the taller child of A (up) so it becomes the parent of A"""
+        nodes = self.nodes
+        A = nodes[indexA]
+        up = nodes[indexUp]
+        other = nodes[indexOther]
+        indexF = up.child1
+        indexG = up.child2
+        F = nodes[indexF]
+        G = nodes[indexG]
+
+        up.child1 = indexA
+        up.parent = A.parent
+        A.parent = indexUp
+        if up.parent == NULL_NODE:
+            self.root = indexUp
+        elif nodes[up.parent].child1 == indexA:
+            nodes[up.parent].child1 = indexUp
+        else:
+            nodes[up.parent].child2 = indexUp
+
+        #the taller grand child stays under up and the shorter one replaces up under A
+        if F.height > G.height:
+            keep, indexKeep, move, indexMove = F, indexF, G, indexG
+        else:
+            keep, indexKeep, move, indexMove = G, indexG, F, indexF
+        up.child2 = indexKeep
+        if A.child1 == indexUp:
+            A.child1 = indexMove
+        else:
+            A.child2 = indexMove
+        move.parent = indexA
+        A.aabb = _union(other.aabb, move.aabb)
+        A.height = 1+max(other.height, move.height)
+        up.aabb = _union(A.aabb, keep.aabb)
+        up.height = 1+max(A.height, keep.height)
+        return indexUp
+
+    def query_aabb(self, aabb: FlatAABB) -> list:
+        """returns the items whose fat aabb overlaps the given aabb"""
+        result = []
+        if self.root == NULL_NODE:
+            return result
+        nodes = self.nodes
+        stack = [self.root]
+        while stack:
+            node = nodes[stack.pop()]
+            if not collideAABB(node.aabb, aabb):
+                continue
+            if node.is_leaf():
+                result.append(node.item)
+            else:
+                stack.append(node.child1)
+                stack.append(node.child2)
+        return result
+
+    def query_point(self, point: Vector2) -> list:
+        """returns the items whose fat aabb contains the point"""
+        result = []
+        if self.root == NULL_NODE:
+            return result
+        nodes = self.nodes
+        stack = [self.root]
+        while stack:
+            node = nodes[stack.pop()]
+            aabb = node.aabb
+            if point.x < aabb.minX or point.x > aabb.maxX or point.y < aabb.minY or point.y > aabb.maxY:
+                continue
+            if node.is_leaf():
+                result.append(node.item)
+            else:
+                stack.append(node.child1)
+                stack.append(node.child2)
+        return result
+
+    def raycast(self, origin: Vector2, direction: Vector2, maxDistance: float, callback) -> None:
+        """
+        direction has to be normalized
+        callback(item, maxDistance) is called for every leaf the ray reaches and returns the new max distance,
+        returning a smaller distance clips the ray so farther nodes are skipped
+        """
+        if self.root == NULL_NODE:
+            return
+        nodes = self.nodes
+        stack = [self.root]
+        while stack:
+            node = nodes[stack.pop()]
+            if ray_aabb_distance(origin, direction, node.aabb, maxDistance) is None:
+                continue
+            if node.is_leaf():
+                maxDistance = callback(node.item, maxDistance)
+                if maxDistance <= 0:
+                    return
+            else:
+                stack.append(node.child1)
+                stack.append(node.child2)
+
+    def get_height(self) -> int:
+        if self.root == NULL_NODE:
+            return 0
+        return self.nodes[self.root].height
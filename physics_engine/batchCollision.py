@@ -0,0 +1,104 @@
+"""
+vectorized narrowphase for box-box pairs (World.useBatchNarrowphase)
+
+get_box_collides finds the same collide vector and reference face as collision.get_collide_reference for many pairs in one numpy pass,
+the reference face is then passed to collision.find_contact_features so the contacts are the same as the scalar path
+
+the batch is not the same simulation as the scalar path though: every pair is tested with the poses from the start of the substep,
+while the scalar path tests each pair after the pairs before it already pushed their bodies apart,
+so a pair can hit in one path and miss in the other (box_pyramid: 174980 hits batched against 176279 scalar)
+and with the per pair python work that is left it is not reliably faster (6.2 to 6.9 against 5.9 to 6.4 steps/s on box_pyramid),
+which is why it is only used when World.useBatchNarrowphase is turned on
+"""
+import numpy as np
+import collision
+from vector import Vector2
+
+def transform_boxes(positions: np.ndarray, rotations: np.ndarray, widths: np.ndarray, heights: np.ndarray) -> np.ndarray:
+    """returns the world vertices of every box as a (n, 4, 2) array in the same CLOCK WISE order as create_vectices"""
+    left = -widths/2
+    right = widths/2
+    top = -heights/2
+    bottom = heights/2
+    localX = np.stack((left, right, right, left), axis=1)
+    localY = np.stack((top, top, bottom, bottom), axis=1)
+    sine = np.sin(rotations)[:, None]
+    cosine = np.cos(rotations)[:, None]
+    vertices = np.empty((len(positions), 4, 2))
+    vertices[:, :, 0] = localX*cosine-localY*sine+positions[:, 0, None]
+    vertices[:, :, 1] = localX*sine+localY*cosine+positions[:, 1, None]
+    return vertices
+
+#the outward unit normals of the edges of a box before it is rotated, normals[i] belongs to the edge from vertex i to vertex i+1 like ShapePrototype.normals
+BOX_NORMALS = np.array(((0., -1.), (1., 0.), (0., 1.), (-1., 0.)))
+
+def transform_box_normals(rotations: np.ndarray) -> np.ndarray:
+    """returns the world normals of every box as a (n, 4, 2) array rotated the same way as FlatBody.get_transformedNormals"""
+    sine = np.sin(rotations)[:, None]
+    cosine = np.cos(rotations)[:, None]
+    normals = np.empty((len(rotations), 4, 2))
+    normals[:, :, 0] = BOX_NORMALS[:, 0]*cosine-BOX_NORMALS[:, 1]*sine
+    normals[:, :, 1] = BOX_NORMALS[:, 0]*sine+BOX_NORMALS[:, 1]*cosine
+    return normals
+
+def max_separation_batch(vertices: np.ndarray, normals: np.ndarray, otherVertices: np.ndarray) -> tuple:
+    """does what collision._max_separation does for n pairs of polygons at once, returns the (n,) separations and edges"""
+    edgeDistance = normals[:, :, 0]*vertices[:, :, 0]+normals[:, :, 1]*vertices[:, :, 1]
+    #the support point of the other polygon against every normal
+    projection = normals[:, :, 0, None]*otherVertices[:, None, :, 0]+normals[:, :, 1, None]*otherVertices[:, None, :, 1]
+    separation = projection.min(axis=2)-edgeDistance
+    #argmax picks the first largest separation just like the scalar loop
+    edge = np.argmax(separation, axis=1)
+    return separation[np.arange(len(edge)), edge], edge
+
+def find_reference_faces_batch(verticesA: np.ndarray, normalsA: np.ndarray, verticesB: np.ndarray, normalsB: np.ndarray) -> tuple:
+    """
+    does what collision.find_reference_face and reference_collide do for n pairs of polygons at once
+    the vertices and normals are (n, k, 2) arrays, returns (hits, separation, isB, edge, collides) arrays,
+    the collides are the (n, 2) collide vectors from A to B and are zero for pairs that don't collide
+    """
+    separationA, edgeA = max_separation_batch(verticesA, normalsA, verticesB)
+    separationB, edgeB = max_separation_batch(verticesB, normalsB, verticesA)
+    hits = (separationA < 0) & (separationB < 0)
+    isB = separationB > separationA+collision.REFERENCE_FACE_TOLERANCE
+    separation = np.where(isB, separationB, separationA)
+    edge = np.where(isB, edgeB, edgeA)
+    rows = np.arange(len(edge))
+    #the normals point out of the polygon they belong to, the collide vector points from A to B
+    collides = np.where(isB[:, None], normalsB[rows, edgeB]*separationB[:, None], normalsA[rows, edgeA]*-separationA[:, None])
+    collides[~hits] = 0
+    return hits, separation, isB, edge, collides
+
+def get_box_collides(bodyPairs: list) -> list:
+    """
+    returns what collision.get_collide_reference returns for every (bodyA, bodyB) pair of boxes, computed in one vectorized pass:
+    (collide, reference) with the reference face that can be passed to find_contact_features, (None, None) if the boxes don't collide
+    """
+    if not bodyPairs:
+        return []
+    #every box is only transformed once even if it is in many pairs
+    indices = {}
+    boxes = []
+    pairIndices = []
+    for pair in bodyPairs:
+        for body in pair:
+            index = indices.get(body)
+            if index == None:
+                index = len(boxes)
+                indices[body] = index
+                boxes.append(body)
+            pairIndices.append(index)
+    pairIndices = np.array(pairIndices, dtype=np.intp).reshape(-1, 2)
+
+    positions = np.array([tuple(body.position) for body in boxes], dtype=float)
+    rotations = np.array([body.rotation for body in boxes], dtype=float)
+    widths = np.array([body.WIDTH for body in boxes], dtype=float)
+    heights = np.array([body.HEIGHT for body in boxes], dtype=float)
+    vertices = transform_boxes(positions, rotations, widths, heights)
+    normals = transform_box_normals(rotations)
+
+    indexA = pairIndices[:, 0]
+    indexB = pairIndices[:, 1]
+    hits, separation, isB, edge, collides = find_reference_faces_batch(vertices[indexA], normals[indexA], vertices[indexB], normals[indexB])
+    return [(Vector2(collide[0], collide[1]), (pairSeparation, pairIsB, pairEdge)) if hit else (None, None)
+            for hit, collide, pairSeparation, pairIsB, pairEdge in zip(hits.tolist(), collides.tolist(), separation.tolist(), isB.tolist(), edge.tolist())]
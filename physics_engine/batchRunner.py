@@ -0,0 +1,130 @@
+"""
+runs many headless variations of a scene on a process pool
+
+    python batchRunner.py --scenario mixed_pile --gravity 4.9 9.8 --restitution 0 0.5 --substeps 2 4 --seeds 0 1
+
+every combination of the given values is one run, the results are printed as one JSON line per run as soon as it finishes
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import random
+import sys
+import time
+import benchmark
+from vector import Vector2
+from world import World
+
+#the size of the default scene, the same as the window of game.py
+DEFAULT_BOUND = Vector2(649, 480)/20
+
+class RunConfig:
+    """
+    one run of a batch, scenario is "default" (the scene of game.py) or one of the scenes in benchmark.SCENARIOS
+    bodyCount random bodies are added with create_randomBodies using a random.Random seeded with seed
+    """
+    def __init__(self, scenario: str = "default", seed: int = 0, steps: int = 120, tickPerSecond: int = 60, subSteps: int = 4,
+                 gravity: float = 9.8, restitution: float = 0, bodyCount: int = 0, useBodyStore = False, useBatchNarrowphase = False) -> None:
+        self.scenario = scenario
+        self.seed = seed
+        self.steps = steps
+        self.tickPerSecond = tickPerSecond
+        self.subSteps = subSteps
+        self.gravity = gravity
+        self.restitution = restitution
+        self.bodyCount = bodyCount
+        self.useBodyStore = useBodyStore
+        self.useBatchNarrowphase = useBatchNarrowphase
+
+def create_world(config: RunConfig) -> World:
+    if config.scenario == "default":
+        #the colors of the bodies use the global random so it is seeded too
+        random.seed(config.seed)
+        world = World(DEFAULT_BOUND.copy(), useBodyStore=config.useBodyStore)
+        world.useBatchNarrowphase = config.useBatchNarrowphase
+    else:
+        world = benchmark.create_world(config.scenario, config.seed, config.useBodyStore, config.useBatchNarrowphase)
+    world.create_randomBodies(config.bodyCount, random.Random(config.seed))
+    world.GRAVITY = Vector2(0, config.gravity)
+    for body in world.flatBodies:
+        body.restitution = config.restitution
+    return world
+
+def get_state(world: World) -> list:
+    """[x, y, rotation, velocity x, velocity y, rotational velocity, is static] of every body"""
+    state = []
+    for body in world.flatBodies:
+        position = body.position
+        velocity = body.velocity
+        state.append([position.x, position.y, body.rotation, velocity.x, velocity.y, body.rotationalVelocity, body.IS_STATIC])
+    return state
+
+def run(config: RunConfig) -> dict:
+    world = create_world(config)
+    bodyCount = len(world.flatBodies)
+    world.reset_counters()
+    start = time.perf_counter()
+    for _ in range(config.steps):
+        world.step(config.tickPerSecond, config.subSteps)
+    seconds = time.perf_counter()-start
+    metrics = {
+        "bodies": bodyCount,
+        "finalBodies": len(world.flatBodies),
+        "seconds": seconds,
+        "stepsPerSecond": config.steps/seconds if seconds > 0 else None,
+    }
+    metrics.update(world.stats.totals)
+    return {"config": vars(config), "metrics": metrics, "finalState": get_state(world)}
+
+def _run_indexed(indexAndConfig: tuple) -> dict:
+    index, config = indexAndConfig
+    result = run(config)
+    result["index"] = index
+    return result
+
+def run_batch(configs: list, processes: int = None):
+    """
+    runs every config on a pool of processes (one per core by default) and yields the result of every run as soon as it finishes
+    the results come in the order they finish, result["index"] is the position of its config in configs
+    """
+    configs = list(configs)
+    if not configs:
+        return
+    processes = min(processes or multiprocessing.cpu_count(), len(configs))
+    if processes == 1:
+        for indexAndConfig in enumerate(configs):
+            yield _run_indexed(indexAndConfig)
+        return
+    with multiprocessing.Pool(processes) as pool:
+        #chunksize 1 so a slow run never holds back runs queued behind it
+        for result in pool.imap_unordered(_run_indexed, enumerate(configs), chunksize=1):
+            yield result
+
+def main(argv: list = None) -> None:
+    parser = argparse.ArgumentParser(description="run every combination of the given parameters on a process pool")
+    parser.add_argument("--scenario", nargs="+", default=["default"], help=f"default or one of: {', '.join(benchmark.SCENARIOS)}")
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0])
+    parser.add_argument("--gravity", nargs="+", type=float, default=[9.8])
+    parser.add_argument("--restitution", nargs="+", type=float, default=[0])
+    parser.add_argument("--substeps", nargs="+", type=int, default=[4])
+    parser.add_argument("--bodies", nargs="+", type=int, default=[0], help="how many random bodies to add")
+    parser.add_argument("--steps", type=int, default=120)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--no-state", action="store_true", help="leave the final body states out of the output")
+    args = parser.parse_args(argv)
+    for name in args.scenario:
+        if name != "default" and name not in benchmark.SCENARIOS:
+            parser.error(f"unknown scenario {name}")
+
+    configs = [RunConfig(scenario, seed, args.steps, subSteps=subSteps, gravity=gravity, restitution=restitution, bodyCount=bodyCount)
+               for scenario, seed, gravity, restitution, subSteps, bodyCount
+               in itertools.product(args.scenario, args.seeds, args.gravity, args.restitution, args.substeps, args.bodies)]
+    for result in run_batch(configs, args.processes):
+        if args.no_state:
+            del result["finalState"]
+        print(json.dumps(result), flush=True)
+    print(f"{len(configs)} runs finished", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+headless benchmark of World.step with canned seeded scenes
+
+    python benchmark.py                            runs every scene
+    python benchmark.py box_pyramid circle_rain    runs only those scenes
+    python benchmark.py --output before.json       writes the results as JSON so they can be compared between commits
+    python benchmark.py --compare before.json      prints how much faster or slower every scene got
+    python benchmark.py --solver-workers 4         solves the contact islands on 4 worker processes
+                                                   (only substeps with solver.MIN_PARALLEL_CONTACTS contacts or more go to them)
+"""
+import argparse
+import contextlib
+import json
+import math
+import platform
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import flatBody
+import broadphase
+import particles
+import stats
+from vector import Vector2
+from world import World
+
+def add_ground(world: World, width: float, wallHeight: float = 0) -> None:
+    bound = world.bound
+    world.add_body(flatBody.create_box(Vector2(bound.x/2, bound.y-0.5), 1, width, 1, isStatic=True))
+    if wallHeight > 0:
+        left = (bound.x-width)/2
+        world.add_body(flatBody.create_box(Vector2(left, bound.y-wallHeight/2), 1, 1, wallHeight, isStatic=True))
+        world.add_body(flatBody.create_box(Vector2(left+width, bound.y-wallHeight/2), 1, 1, wallHeight, isStatic=True))
+
+def add_random_body(world: World, rng: random.Random, position: Vector2, boxChance: float) -> None:
+    if rng.random() < boxChance:
+        width = rng.uniform(0.5, 1.5)
+        height = rng.uniform(0.5, 1.5)
+        body = flatBody.create_box(position, width*height, width, height)
+        body.rotate_body(rng.random()*2*math.pi)
+    else:
+        radius = rng.uniform(0.25, 0.75)
+        body = flatBody.create_circle(position, radius**2, radius)
+    world.add_body(body)
+
+def box_pyramid(world: World, rng: random.Random) -> None:
+    add_ground(world, world.bound.x-10)
+    rows = 20
+    bottom = world.bound.y-1.5
+    for row in range(rows):
+        for column in range(rows-row):
+            x = world.bound.x/2+(column-(rows-row-1)/2)*1.05
+            world.add_body(flatBody.create_box(Vector2(x, bottom-row*1.05), 1, 1, 1))
+
+def circle_rain(world: World, rng: random.Random) -> None:
+    add_ground(world, world.bound.x-10, world.bound.y)
+    for row in range(15):
+        for column in range(20):
+            x = 7+column*(world.bound.x-14)/20+rng.uniform(-0.2, 0.2)
+            radius = rng.uniform(0.3, 0.6)
+            world.add_body(flatBody.create_circle(Vector2(x, 2+row*1.3), radius**2, radius))
+
+def mixed_pile(world: World, rng: random.Random) -> None:
+    #the slopes of the default scene with a pile of boxes and circles dropped on them
+    bound = world.bound
+    add_ground(world, bound.x-10, bound.y)
+    slope1 = flatBody.create_box(Vector2(12, bound.y-10), 1, 10, 1, isStatic=True)
+    slope2 = flatBody.create_box(Vector2(bound.x-10, bound.y-5), 1, 9, 1, isStatic=True)
+    slope1.rotate_body(math.pi/20)
+    slope2.rotate_body(-math.pi/10)
+    world.add_body(slope1)
+    world.add_body(slope2)
+    for _ in range(200):
+        add_random_body(world, rng, Vector2(rng.uniform(7, bound.x-7), rng.uniform(1, bound.y-14)), 0.5)
+
+def polygon_pile(world: World, rng: random.Random) -> None:
+    #regular polygons with 3 to 8 sides dropped into a box
+    add_ground(world, world.bound.x-10, world.bound.y)
+    for row in range(10):
+        for column in range(15):
+            x = 7+column*(world.bound.x-14)/15+rng.uniform(-0.2, 0.2)
+            radius = rng.uniform(0.4, 0.7)
+            body = flatBody.create_regular_polygon(Vector2(x, 2+row*1.6), radius**2, radius, rng.randint(3, 8))
+            body.rotate_body(rng.random()*2*math.pi)
+            world.add_body(body)
+
+def projectiles(world: World, rng: random.Random) -> None:
+    #small boxes and circles shot at a wall as thick as the walls of the default scene, without continuous collision they go through it
+    bound = world.bound
+    add_ground(world, bound.x-10, bound.y)
+    for i in range(40):
+        position = Vector2(7+rng.uniform(0, 3), bound.y-3-i*0.6)
+        size = rng.uniform(0.2, 0.4)
+        if i%2 == 0:
+            body = flatBody.create_box(position, size*size, size, size)
+        else:
+            body = flatBody.create_circle(position, size*size, size/2)
+        body.velocity = Vector2(rng.uniform(80, 120), rng.uniform(-5, 5))
+        body.rotationalVelocity = rng.uniform(-20, 20)
+        world.add_body(body)
+
+def layered_debris(world: World, rng: random.Random) -> None:
+    #boxes fall through a cloud of small debris that only collides with the walls and ground,
+    #the debris and the boxes are in their own categories and the ground is in the default one
+    add_ground(world, world.bound.x-10, world.bound.y)
+    for row in range(6):
+        for column in range(20):
+            x = 7+column*(world.bound.x-14)/20+rng.uniform(-0.2, 0.2)
+            body = flatBody.create_box(Vector2(x, 2+row*1.3), 1, 0.8, 0.8)
+            world.set_collision_filter(body, categoryBits=4)
+            world.add_body(body)
+    for _ in range(400):
+        radius = rng.uniform(0.1, 0.2)
+        body = flatBody.create_circle(Vector2(rng.uniform(6, world.bound.x-6), rng.uniform(1, world.bound.y-2)), radius**2, radius)
+        world.set_collision_filter(body, categoryBits=2, maskBits=flatBody.DEFAULT_CATEGORY)
+        world.add_body(body)
+
+def particle_flow(world: World, rng: random.Random) -> None:
+    #a block of sand particles poured down the slopes of mixed_pile into a box
+    bound = world.bound
+    add_ground(world, bound.x-10, bound.y)
+    slope1 = flatBody.create_box(Vector2(14, bound.y-12), 1, 14, 1, isStatic=True)
+    slope2 = flatBody.create_box(Vector2(bound.x-12, bound.y-6), 1, 12, 1, isStatic=True)
+    slope1.rotate_body(math.pi/12)
+    slope2.rotate_body(-math.pi/10)
+    world.add_body(slope1)
+    world.add_body(slope2)
+    count = 10000
+    positions = particles.grid_positions(Vector2(7, 1), 80, count, 0.22)+[(rng.uniform(-0.02, 0.02), rng.uniform(-0.02, 0.02)) for _ in range(count)]
+    world.add_particles(positions, [rng.uniform(0.08, 0.1) for _ in range(count)])
+
+def stress(count: int):
+    def build(world: World, rng: random.Random) -> None:
+        add_ground(world, world.bound.x-4, world.bound.y)
+        columns = int((world.bound.x-8)/1.6)
+        for i in range(count):
+            row, column = divmod(i, columns)
+            position = Vector2(4+column*1.6+rng.uniform(-0.1, 0.1), world.bound.y-2-row*1.6)
+            add_random_body(world, rng, position, 0.3)
+    return build
+
+#name: (scene builder, world size in meters, default number of steps)
+SCENARIOS = {
+    "box_pyramid": (box_pyramid, Vector2(40, 30), 120),
+    "circle_rain": (circle_rain, Vector2(40, 30), 120),
+    "mixed_pile": (mixed_pile, Vector2(32, 24), 120),
+    "polygon_pile": (polygon_pile, Vector2(40, 30), 120),
+    "projectiles": (projectiles, Vector2(40, 30), 120),
+    "layered_debris": (layered_debris, Vector2(40, 30), 120),
+    "particle_flow": (particle_flow, Vector2(40, 30), 120),
+    "stress_1k": (stress(1000), Vector2(100, 40), 20),
+    "stress_5k": (stress(5000), Vector2(200, 80), 5),
+    "stress_10k": (stress(10000), Vector2(300, 100), 3),
+}
+
+def create_world(name: str, seed: int = 0, useBodyStore = False, useBatchNarrowphase = False, bruteForce = False, solverExecutor = None,
+                 continuousCollision = False) -> World:
+    build, bound, _ = SCENARIOS[name]
+    #the colors of the bodies use the global random so it is seeded too
+    random.seed(seed)
+    world = World(bound, useBodyStore=useBodyStore, createScene=False)
+    world.useBatchNarrowphase = useBatchNarrowphase
+    world.continuousCollision = continuousCollision
+    if bruteForce:
+        world.broadphase = broadphase.BruteForceBroadphase()
+    world.solver.executor = solverExecutor
+    build(world, random.Random(seed))
+    return world
+
+def run_scenario(name: str, steps: int = None, subSteps: int = 4, tickPerSecond: int = 60, seed: int = 0, profile = False, **worldOptions) -> dict:
+    """profile records how long every phase of the step took, which makes the steps a little slower"""
+    if steps == None:
+        steps = SCENARIOS[name][2]
+    world = create_world(name, seed, **worldOptions)
+    bodyCount = len(world.flatBodies)
+    world.reset_counters()
+    world.stats.enabled = profile
+    world.stats.set_window(steps)
+    start = time.perf_counter()
+    for _ in range(steps):
+        world.step(tickPerSecond, subSteps)
+    seconds = time.perf_counter()-start
+    result = {
+        "scenario": name,
+        "seed": seed,
+        "bodies": bodyCount,
+        "finalBodies": len(world.flatBodies),
+        "finalParticles": world.particles.count if world.particles != None else 0,
+        "steps": steps,
+        "subSteps": subSteps,
+        "seconds": seconds,
+        "stepsPerSecond": steps/seconds if seconds > 0 else math.inf,
+    }
+    result.update(world.stats.totals)
+    if profile:
+        #the average milliseconds per step of every phase
+        result["phases"] = {phase: world.stats.average(phase)*1000 for phase in stats.PHASES}
+    return result
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results: list, baseline: dict) -> None:
+    previous = {result["scenario"]: result for result in baseline["results"]}
+    for result in results:
+        old = previous.get(result["scenario"])
+        if old == None:
+            continue
+        speedup = result["stepsPerSecond"]/old["stepsPerSecond"]
+        print(f"{result['scenario']:>12}: {old['stepsPerSecond']:9.2f} -> {result['stepsPerSecond']:9.2f} steps/s ({speedup:.2f}x)", file=sys.stderr)
+
+def main(argv: list = None) -> None:
+    parser = argparse.ArgumentParser(description="benchmark World.step on canned scenes")
+    parser.add_argument("scenarios", nargs="*", help=f"the scenes to run (every scene if none are given): {', '.join(SCENARIOS)}")
+    parser.add_argument("--steps", type=int, default=None, help="steps per scene (each scene has its own default)")
+    parser.add_argument("--substeps", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--body-store", action="store_true", help="keep the bodies in the numpy body store")
+    parser.add_argument("--batch-narrowphase", action="store_true", help="test box-box pairs in one vectorized pass (with the poses from the start of the substep, so the hits differ)")
+    parser.add_argument("--brute-force", action="store_true", help="use the brute force broadphase")
+    parser.add_argument("--ccd", action="store_true", help="turn on continuous collision detection")
+    parser.add_argument("--profile", action="store_true", help="time every phase of the step and add the averages to the results")
+    parser.add_argument("--solver-workers", type=int, default=0, help="solve the contact islands on this many worker processes")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="a JSON file written by --output to compare against")
+    args = parser.parse_args(argv)
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario {name}")
+
+    results = []
+    with (ProcessPoolExecutor(args.solver_workers) if args.solver_workers > 0 else contextlib.nullcontext()) as executor:
+        for name in args.scenarios or list(SCENARIOS):
+            result = run_scenario(name, args.steps, args.substeps, seed=args.seed, useBodyStore=args.body_store,
+                                  useBatchNarrowphase=args.batch_narrowphase, bruteForce=args.brute_force, solverExecutor=executor,
+                                  continuousCollision=args.ccd, profile=args.profile)
+            results.append(result)
+            print(f"{name:>12}: {result['bodies']:6} bodies {result['stepsPerSecond']:9.2f} steps/s "
+                  f"{result['pairTests']:9} pair tests {result['narrowphaseHits']:8} hits {result['contacts']:8} contacts", file=sys.stderr)
+            if args.profile:
+                print("              "+" ".join(f"{phase} {milliseconds:.2f}ms" for phase, milliseconds in result["phases"].items()), file=sys.stderr)
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "options": {"substeps": args.substeps, "seed": args.seed, "bodyStore": args.body_store,
+                    "batchNarrowphase": args.batch_narrowphase, "bruteForce": args.brute_force, "solverWorkers": args.solver_workers,
+                    "continuousCollision": args.ccd, "profile": args.profile},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+hands out an integer handle for every body in the world and keeps the bodies in one list without holes
+
+a handle is the slot of the body and the generation of that slot, the generation goes up every time the slot is freed
+so a handle of a removed body never finds the body that got its slot after it
+"""
+from flatBody import FlatBody
+
+#the low bits of a handle are the slot, the bits above them the generation
+INDEX_BITS = 32
+INDEX_MASK = (1 << INDEX_BITS)-1
+
+class BodyRegistry:
+    """
+    bodies is a plain list of every body, a removed body is replaced by the last one so removing never shifts the list
+    body.handle is the handle of a body in the registry and None when it isn't in one
+    """
+    def __init__(self) -> None:
+        self.bodies = []
+        #slot -> generation, and slot -> index in bodies (-1 if the slot is free)
+        self.generations = []
+        self.indices = []
+        #index in bodies -> slot
+        self.slots = []
+        self.freeSlots = []
+
+    def __len__(self) -> int:
+        return len(self.bodies)
+
+    def __contains__(self, body: FlatBody) -> bool:
+        return body.handle != None and self.get(body.handle) is body
+
+    def add(self, body: FlatBody) -> int:
+        if body.handle != None:
+            raise ValueError("the body is already in a registry")
+        if self.freeSlots:
+            slot = self.freeSlots.pop()
+        else:
+            slot = len(self.generations)
+            self.generations.append(0)
+            self.indices.append(-1)
+        self.indices[slot] = len(self.bodies)
+        self.slots.append(slot)
+        self.bodies.append(body)
+        body.handle = (self.generations[slot] << INDEX_BITS) | slot
+        return body.handle
+
+    def remove(self, body: FlatBody) -> None:
+        """the last body is moved into the place of the removed one"""
+        if body not in self:
+            raise ValueError("the body is not in this registry")
+        slot = body.handle & INDEX_MASK
+        index = self.indices[slot]
+        last = len(self.bodies)-1
+        if index != last:
+            lastBody = self.bodies[last]
+            lastSlot = self.slots[last]
+            self.bodies[index] = lastBody
+            self.slots[index] = lastSlot
+            self.indices[lastSlot] = index
+        self.bodies.pop()
+        self.slots.pop()
+        self.indices[slot] = -1
+        self.generations[slot] += 1
+        self.freeSlots.append(slot)
+        body.handle = None
+
+    def get(self, handle: int) -> FlatBody:
+        """the body of the handle, None if it was removed"""
+        slot = handle & INDEX_MASK
+        if slot >= len(self.generations) or self.generations[slot] != handle >> INDEX_BITS:
+            return None
+        index = self.indices[slot]
+        return self.bodies[index] if index >= 0 else None
+
+    def restore(self, bodies: list, handles: list) -> None:
+        """
+        gives the bodies back the handles they had in a snapshot and puts them in that order, they have to be the bodies in the registry now
+        the slots go back to the generations of the handles, a handle given out after the snapshot can be given out again
+        """
+        slotCount = max(len(self.generations), max((handle & INDEX_MASK for handle in handles), default=-1)+1)
+        self.generations += [0]*(slotCount-len(self.generations))
+        self.indices = [-1]*slotCount
+        self.slots = []
+        for index, (body, handle) in enumerate(zip(bodies, handles)):
+            slot = handle & INDEX_MASK
+            self.generations[slot] = handle >> INDEX_BITS
+            self.indices[slot] = index
+            self.slots.append(slot)
+            body.handle = handle
+        self.bodies[:] = bodies
+        self.freeSlots = [slot for slot in range(slotCount) if self.indices[slot] == -1]
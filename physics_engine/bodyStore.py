@@ -0,0 +1,108 @@
+import numpy as np
+
+class BodyStore:
+    """
+    keeps the state of the bodies in contiguous numpy arrays (structure of arrays)
+    a body that is added becomes a view into the arrays and is integrated with every other body in a few vectorized operations
+    only the integration is vectorized, reading body.position, velocity or force of a body in a store makes a new Vector2 every time
+    so hot paths read get_positionXY or the arrays instead, and the store pays off when integration is a large part of the step
+    """
+    def __init__(self, capacity: int = 64) -> None:
+        self.count = 0
+        self.bodies = []
+        self.capacity = 0
+        self.position = np.zeros((0, 2))
+        self.velocity = np.zeros((0, 2))
+        self.force = np.zeros((0, 2))
+        self.rotation = np.zeros(0)
+        self.rotationalVelocity = np.zeros(0)
+        self.inverseMass = np.zeros(0)
+        self.inverseInertia = np.zeros(0)
+        #1 for dynamic bodies and 0 for static bodies so the gravity can be masked without branching
+        self.gravityScale = np.zeros(0)
+        #1 for awake bodies and 0 for sleeping bodies, sleeping bodies has no velocity so only the gravity has to be masked
+        self.awake = np.zeros(0)
+        self._grow(max(capacity, 1))
+
+    def _grow(self, capacity: int) -> None:
+        count = self.count
+        for name in ('position', 'velocity', 'force'):
+            array = np.zeros((capacity, 2))
+            array[:count] = getattr(self, name)[:count]
+            setattr(self, name, array)
+        for name in ('rotation', 'rotationalVelocity', 'inverseMass', 'inverseInertia', 'gravityScale', 'awake'):
+            array = np.zeros(capacity)
+            array[:count] = getattr(self, name)[:count]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def add(self, body) -> None:
+        if body.store != None:
+            raise ValueError("the body is already in a body store")
+        if self.count == self.capacity:
+            self._grow(self.capacity*2)
+        index = self.count
+        #the state is copied before the body starts reading it from the arrays
+        position = body.position
+        velocity = body.velocity
+        force = body.force
+        self.position[index] = (position.x, position.y)
+        self.velocity[index] = (velocity.x, velocity.y)
+        self.force[index] = (force.x, force.y)
+        self.rotation[index] = body.rotation
+        self.rotationalVelocity[index] = body.rotationalVelocity
+        self.inverseMass[index] = body.INVERSE_MASS
+        self.inverseInertia[index] = body.inverseInteria
+        self.gravityScale[index] = 0 if body.IS_STATIC else 1
+        self.awake[index] = 1 if body.isAwake else 0
+        self.bodies.append(body)
+        self.count += 1
+        body.store = self
+        body.storeIndex = index
+
+    def remove(self, body) -> None:
+        """the last body is swapped into the removed slot, the removed body keeps its state as normal attributes"""
+        if body.store != self:
+            raise ValueError("the body is not in this body store")
+        index = body.storeIndex
+        body.detach_store()
+        last = self.count-1
+        if index != last:
+            for array in (self.position, self.velocity, self.force, self.rotation, self.rotationalVelocity, self.inverseMass, self.inverseInertia, self.gravityScale, self.awake):
+                array[index] = array[last]
+            lastBody = self.bodies[last]
+            self.bodies[index] = lastBody
+            lastBody.storeIndex = index
+        self.bodies.pop()
+        self.count -= 1
+
+    def integrate(self, tickPerSec: int, gravity) -> None:
+        """does what FlatBody.physic_update does for every body in the store"""
+        self.integrate_velocities(tickPerSec, gravity)
+        self.integrate_positions(tickPerSec)
+
+    def integrate_velocities(self, tickPerSec: int, gravity) -> None:
+        """does what FlatBody.integrate_velocity does for every body in the store"""
+        count = self.count
+        if count == 0:
+            return
+        velocity = self.velocity[:count]
+        force = self.force[:count]
+
+        acceleration = force*self.inverseMass[:count, None]
+        acceleration += np.outer(self.gravityScale[:count]*self.awake[:count], (gravity.x, gravity.y))
+        velocity += acceleration/tickPerSec
+        #small velocities are snapped to zero
+        velocity[np.einsum('ij,ij->i', velocity, velocity) < 0.0001] = 0
+        force[:] = 0
+
+    def integrate_positions(self, tickPerSec: int) -> None:
+        """does what FlatBody.integrate_position does for every body in the store"""
+        count = self.count
+        if count == 0:
+            return
+        self.position[:count] += self.velocity[:count]/tickPerSec
+        self.rotation[:count] += self.rotationalVelocity[:count]/tickPerSec
+        for body in self.bodies:
+            body.verticesUpdateNeeded = True
+            body.aabbUpdateNeeded = True
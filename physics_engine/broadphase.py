@@ -0,0 +1,316 @@
+import math
+from collision import collideAABB
+from flatBody import FlatAABB
+
+def is_active(body) -> bool:
+    #pairs where neither body is active (static or sleeping) can never need resolving
+    return body.isAwake and not body.IS_STATIC
+
+def should_collide(bodyA, bodyB) -> bool:
+    """
+    the collision filter of a pair, bodies in the same nonzero group always collide if the group is positive and never if it is negative,
+    other bodies collide when the category of each one has a bit in the mask of the other
+    """
+    group = bodyA.groupIndex
+    if group != 0 and group == bodyB.groupIndex:
+        return group > 0
+    return (bodyA.categoryBits & bodyB.maskBits) != 0 and (bodyB.categoryBits & bodyA.maskBits) != 0
+
+def get_filters(flatBodies: list) -> tuple:
+    """
+    (categories, masks, groups, included) lists of the bodies, included is False for the bodies whose filter can't match any of the others
+    so they are left out of the broadphase structure, like a whole layer that nothing else collides with
+    """
+    categories = [body.categoryBits for body in flatBodies]
+    masks = [body.maskBits for body in flatBodies]
+    groups = [body.groupIndex for body in flatBodies]
+    categoryUnion = 0
+    maskUnion = 0
+    for category in categories:
+        categoryUnion |= category
+    for mask in masks:
+        maskUnion |= mask
+    #a positive group can make a body collide with bodies its mask doesn't match so those are always included
+    included = [group > 0 or (category & maskUnion != 0 and mask & categoryUnion != 0) for category, mask, group in zip(categories, masks, groups)]
+    return categories, masks, groups, included
+
+class BruteForceBroadphase:
+    """tests every pair of bodies, this is the reference the other broadphases has to match"""
+    def __init__(self) -> None:
+        #how many AABB tests the last find_pairs did
+        self.pairTests = 0
+
+    def find_pairs(self, flatBodies: list) -> list:
+        pairs = []
+        pairTests = 0
+        aabbs = [body.get_transformedAABB() for body in flatBodies]
+        active = [is_active(body) for body in flatBodies]
+        categories, masks, groups, included = get_filters(flatBodies)
+        for i in range(len(flatBodies)-1):
+            if not included[i]:
+                continue
+            activeA = active[i]
+            aabbA = aabbs[i]
+            categoryA = categories[i]
+            maskA = masks[i]
+            groupA = groups[i]
+            for j in range(i+1, len(flatBodies)):
+                if not activeA and not active[j]:
+                    continue
+                #the filter is only a few integer operations so it is checked before the AABBs
+                if groupA != 0 and groupA == groups[j]:
+                    if groupA < 0:
+                        continue
+                elif not (categoryA & masks[j] and categories[j] & maskA):
+                    continue
+                pairTests += 1
+                if not collideAABB(aabbA, aabbs[j]):
+                    continue
+                pairs.append((i, j))
+        self.pairTests = pairTests
+        return pairs
+
+class SpatialHashBroadphase:
+    """
+    puts the AABB of every body in the cells of a uniform grid that it covers
+    only the bodies that share a cell are tested against each other
+    if cellSize is None the cell size is derived from the size of the bodies every time pairs are found
+    """
+    #bodies that covers more cells than this (long grounds and walls) are tested against every body instead
+    MAX_CELLS_PER_BODY = 64
+    #the derived cell size is this many times the average size of the dynamic bodies
+    CELL_SIZE_SCALE = 2
+
+    def __init__(self, cellSize: float = None) -> None:
+        self.cellSize = cellSize
+        #how many AABB tests the last find_pairs did
+        self.pairTests = 0
+
+    def derive_cell_size(self, flatBodies: list, aabbs: list) -> float:
+        total = 0
+        count = 0
+        for body, aabb in zip(flatBodies, aabbs):
+            if body.IS_STATIC:
+                continue
+            total += max(aabb.maxX-aabb.minX, aabb.maxY-aabb.minY)
+            count += 1
+        #if there is only static bodies use them instead
+        if count == 0:
+            for aabb in aabbs:
+                total += max(aabb.maxX-aabb.minX, aabb.maxY-aabb.minY)
+                count += 1
+        if count == 0 or total <= 0:
+            return 1
+        return total/count*self.CELL_SIZE_SCALE
+
+    def find_pairs(self, flatBodies: list) -> list:
+        aabbs = [body.get_transformedAABB() for body in flatBodies]
+        active = [is_active(body) for body in flatBodies]
+        categories, masks, groups, included = get_filters(flatBodies)
+        cellSize = self.cellSize
+        if cellSize is None:
+            cellSize = self.derive_cell_size(flatBodies, aabbs)
+        inverseCellSize = 1/cellSize
+        bodyCount = len(flatBodies)
+
+        cells = {}
+        oversized = []
+        #pair keys are i*bodyCount+j with i < j so each pair is only tested once
+        tested = set()
+        pairs = []
+        pairTests = 0
+        for i in range(bodyCount):
+            if not included[i]:
+                continue
+            aabb = aabbs[i]
+            minCellX = math.floor(aabb.minX*inverseCellSize)
+            maxCellX = math.floor(aabb.maxX*inverseCellSize)
+            minCellY = math.floor(aabb.minY*inverseCellSize)
+            maxCellY = math.floor(aabb.maxY*inverseCellSize)
+            if (maxCellX-minCellX+1)*(maxCellY-minCellY+1) > self.MAX_CELLS_PER_BODY:
+                oversized.append(i)
+                continue
+            activeA = active[i]
+            categoryA = categories[i]
+            maskA = masks[i]
+            groupA = groups[i]
+            for cellX in range(minCellX, maxCellX+1):
+                for cellY in range(minCellY, maxCellY+1):
+                    key = (cellX, cellY)
+                    bucket = cells.get(key)
+                    if bucket is None:
+                        cells[key] = [i]
+                        continue
+                    for j in bucket:
+                        pairKey = j*bodyCount+i
+                        if pairKey in tested:
+                            continue
+                        tested.add(pairKey)
+                        if not activeA and not active[j]:
+                            continue
+                        if groupA != 0 and groupA == groups[j]:
+                            if groupA < 0:
+                                continue
+                        elif not (categoryA & masks[j] and categories[j] & maskA):
+                            continue
+                        pairTests += 1
+                        if collideAABB(aabbs[j], aabb):
+                            pairs.append((j, i))
+                    bucket.append(i)
+
+        #the oversized bodies are tested against every other body
+        testedOversized = set()
+        for i in oversized:
+            testedOversized.add(i)
+            activeA = active[i]
+            aabbA = aabbs[i]
+            categoryA = categories[i]
+            maskA = masks[i]
+            groupA = groups[i]
+            for j in range(bodyCount):
+                #pairs between two oversized bodies are only tested once
+                if j in testedOversized or not included[j]:
+                    continue
+                if not activeA and not active[j]:
+                    continue
+                if groupA != 0 and groupA == groups[j]:
+                    if groupA < 0:
+                        continue
+                elif not (categoryA & masks[j] and categories[j] & maskA):
+                    continue
+                pairTests += 1
+                if collideAABB(aabbA, aabbs[j]):
+                    pairs.append((min(i, j), max(i, j)))
+        #sorted so the pairs are resolved in the same order as the brute force broadphase
+        pairs.sort()
+        self.pairTests = pairTests
+        return pairs
+
+class StaticIndex:
+    """
+    grid of the static bodies that is only built again when a static body is added, moved or removed
+    the transformed vertices and AABB of every static body are computed once when it is built
+    every substep only the dynamic bodies look up the cells they cover
+    """
+    #static bodies that covers more cells than this are tested against every dynamic body instead
+    MAX_CELLS_PER_BODY = 4096
+
+    def __init__(self, cellSize: float = 4) -> None:
+        self.cellSize = cellSize
+        self.staticBodies = []
+        #body -> its index in staticBodies, so a body can be swapped out of the list without searching it
+        self.bodyIndices = {}
+        self.aabbs = []
+        self.cells = {}
+        self.oversized = []
+        #the union of the categories and masks of the indexed static bodies and their positive groups,
+        #a dynamic body that matches none of them skips the lookup
+        self.categoryUnion = 0
+        self.maskUnion = 0
+        self.groups = set()
+        self.dirty = True
+        #goes up every rebuild so other structures can tell when the static bodies changed
+        self.version = 0
+        #how many AABB tests the last find_pairs did
+        self.pairTests = 0
+
+    def add(self, body) -> None:
+        self.bodyIndices[body] = len(self.staticBodies)
+        self.staticBodies.append(body)
+        body.staticIndex = self
+        self.dirty = True
+
+    def remove(self, body) -> None:
+        self.remove_many((body,))
+
+    def remove_many(self, bodies) -> None:
+        """the last static body takes the place of every removed one"""
+        staticBodies = self.staticBodies
+        bodyIndices = self.bodyIndices
+        for body in bodies:
+            index = bodyIndices.pop(body, None)
+            if index == None:
+                continue
+            last = staticBodies.pop()
+            if last is not body:
+                staticBodies[index] = last
+                bodyIndices[last] = index
+            body.staticIndex = None
+        self.dirty = True
+
+    def rebuild(self) -> None:
+        inverseCellSize = 1/self.cellSize
+        self.cells = {}
+        self.oversized = []
+        self.aabbs = []
+        self.categoryUnion = 0
+        self.maskUnion = 0
+        self.groups = set()
+        for index, body in enumerate(self.staticBodies):
+            #the AABB is copied so later changes to the body can't change the index
+            aabb = body.get_transformedAABB()
+            aabb = FlatAABB(aabb.minX, aabb.maxX, aabb.minY, aabb.maxY, aabb.position)
+            body.get_transformedVertices()
+            self.aabbs.append(aabb)
+            #static bodies that are in no category or collide with no category are left out of the cells
+            if body.groupIndex > 0:
+                self.groups.add(body.groupIndex)
+            elif body.categoryBits == 0 or body.maskBits == 0:
+                continue
+            self.categoryUnion |= body.categoryBits
+            self.maskUnion |= body.maskBits
+            minCellX = math.floor(aabb.minX*inverseCellSize)
+            maxCellX = math.floor(aabb.maxX*inverseCellSize)
+            minCellY = math.floor(aabb.minY*inverseCellSize)
+            maxCellY = math.floor(aabb.maxY*inverseCellSize)
+            if (maxCellX-minCellX+1)*(maxCellY-minCellY+1) > self.MAX_CELLS_PER_BODY:
+                self.oversized.append(index)
+                continue
+            for cellX in range(minCellX, maxCellX+1):
+                for cellY in range(minCellY, maxCellY+1):
+                    self.cells.setdefault((cellX, cellY), []).append(index)
+        self.dirty = False
+        self.version += 1
+
+    def find_pairs(self, dynamicBodies: list) -> list:
+        """returns (static body index, dynamic body index) pairs whose AABB overlap, sorted by the dynamic body"""
+        if self.dirty:
+            self.rebuild()
+        pairs = []
+        pairTests = 0
+        if not self.staticBodies:
+            self.pairTests = 0
+            return pairs
+        inverseCellSize = 1/self.cellSize
+        cells = self.cells
+        aabbs = self.aabbs
+        oversized = self.oversized
+        staticBodies = self.staticBodies
+        categoryUnion = self.categoryUnion
+        maskUnion = self.maskUnion
+        groups = self.groups
+        for j, body in enumerate(dynamicBodies):
+            if not body.isAwake:
+                continue
+            group = body.groupIndex
+            if (body.categoryBits & maskUnion == 0 or body.maskBits & categoryUnion == 0) and group not in groups:
+                continue
+            aabb = body.get_transformedAABB()
+            minCellX = math.floor(aabb.minX*inverseCellSize)
+            maxCellX = math.floor(aabb.maxX*inverseCellSize)
+            minCellY = math.floor(aabb.minY*inverseCellSize)
+            maxCellY = math.floor(aabb.maxY*inverseCellSize)
+            candidates = set(oversized)
+            for cellX in range(minCellX, maxCellX+1):
+                for cellY in range(minCellY, maxCellY+1):
+                    bucket = cells.get((cellX, cellY))
+                    if bucket != None:
+                        candidates.update(bucket)
+            for i in sorted(candidates):
+                if not should_collide(staticBodies[i], body):
+                    continue
+                pairTests += 1
+                if collideAABB(aabbs[i], aabb):
+                    pairs.append((i, j))
+        self.pairTests = pairTests
+        return pairs
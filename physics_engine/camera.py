@@ -1,5 +1,4 @@
-import pygame
-from pygame import Vector2
+from vector import Vector2
 class Camera:
     def __init__(self, windowSize:Vector2) -> None:
         self.position = Vector2(0,0)
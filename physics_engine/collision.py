@@ -1,13 +1,24 @@
-from pygame import Vector2
+from vector import Vector2
 from flatBody import FlatBody, ShapeType, FlatAABB
 import math
 
 class CollideInfo:
-    def __init__(self, collide: Vector2, bodyA: FlatBody, bodyB: FlatBody, contactPoints: list) -> None:
+    def __init__(self, collide: Vector2, bodyA: FlatBody, bodyB: FlatBody, contactPoints: list, contactFeatures: list = None, contactDepths: list = None) -> None:
         self.collide = collide
         self.bodyA = bodyA
         self.bodyB = bodyB
         self.contactPoints = contactPoints
+        #the feature id of every contact point (see find_contact_features)
+        self.contactFeatures = contactFeatures
+        #how deep every contact point is after the bodies were pushed apart, negative if the point is just in front of the other body
+        self.contactDepths = contactDepths
+
+class RaycastHit:
+    def __init__(self, body: FlatBody, point: Vector2, normal: Vector2, distance: float) -> None:
+        self.body = body
+        self.point = point
+        self.normal = normal
+        self.distance = distance
 
 def _project_vertices(vertices:list, axis: Vector2) -> tuple:
     minVal = math.inf
@@ -29,22 +40,37 @@ def _project_circle(center: Vector2, radius:float, axis: Vector2):
     return min, max
 
 def find_contact(bodyA:FlatBody, bodyB:FlatBody):
-    contact = Vector2()
-    if bodyA.shapeType == ShapeType.Box and bodyB.shapeType == ShapeType.Box:
-        contact = find_poly_contact_point(bodyA.get_transformedVertices(), bodyB.get_transformedVertices())
-    elif bodyA.shapeType == ShapeType.Circle and bodyB.shapeType == ShapeType.Circle:
-        contact = [find_circle_contact_point(bodyA.position, bodyB.position, bodyA.RADIUS)]
-    elif bodyA.shapeType == ShapeType.Box and bodyB.shapeType == ShapeType.Circle:
-        contact = [find_circle_poly_contact_point(bodyB.position, bodyA.get_transformedVertices())]
-    elif bodyB.shapeType == ShapeType.Box and bodyA.shapeType == ShapeType.Circle:
-        contact = [find_circle_poly_contact_point(bodyA.position, bodyB.get_transformedVertices())]
+    return [point for point, _, _ in find_contact_features(bodyA, bodyB)]
+
+def find_contact_features(bodyA:FlatBody, bodyB:FlatBody, reference: tuple = None):
+    """
+    returns (contact point, feature id, depth) for every contact point
+    the feature id says which vertex and edge made the point so the same contact can be found again in the next step
+    reference is the reference face get_collide_reference found for two polygons, it saves doing SAT again
+    """
+    isCircleA = bodyA.shapeType == ShapeType.Circle
+    isCircleB = bodyB.shapeType == ShapeType.Circle
+    if not isCircleA and not isCircleB:
+        contact = find_polygon_contacts(bodyA, bodyB, reference)
+    elif isCircleA and isCircleB:
+        point = find_circle_contact_point(bodyA.position, bodyB.position, bodyA.RADIUS)
+        depth = bodyA.RADIUS+bodyB.RADIUS-(bodyB.position-bodyA.position).magnitude()
+        contact = [(point, 0, depth)]
+    elif isCircleB:
+        point, feature = _find_circle_poly_contact(bodyB.position, bodyA.get_transformedVertices())
+        contact = [(point, feature, bodyB.RADIUS-(point-bodyB.position).magnitude())]
+    else:
+        point, feature = _find_circle_poly_contact(bodyA.position, bodyB.get_transformedVertices())
+        contact = [(point, feature, bodyA.RADIUS-(point-bodyA.position).magnitude())]
     return contact
                     
 def _closest_point_on_poly(center:Vector2, vertices:list):
     result = None
     minDis = math.inf
     for vertex in vertices:
-        if minDis > (vertex-center).magnitude():
+        distance = (vertex-center).magnitude_squared()
+        if minDis > distance:
+            minDis = distance
             result = vertex
     return result
 
@@ -56,53 +82,40 @@ def point_edge_distance(point: Vector2, a: Vector2, b: Vector2):
 
     distance = proj/abLenSq
     contact = None
+    #the vertices can be the reused vectors of a body so they are copied
     if distance <= 0:
-        contact = a
+        contact = a.copy()
     elif distance >= 1:
-        contact = b
+        contact = b.copy()
     else:
         contact = a + ab *distance
     return (contact, (point-contact).magnitude_squared())
         
 def find_poly_contact_point(verticesA: list, verticesB: list):
+    #every vertex against every edge, find_polygon_contacts is used for bodies
+    return [point for point, _ in _find_poly_contacts(verticesA, verticesB)]
 
+def _find_poly_contacts(verticesA: list, verticesB: list):
+    #the feature id is (0, vertex of A, edge of B) or (1, vertex of B, edge of A)
     min_sqrt = math.inf
-    contact_points = list[Vector2()]
-    for i in range(len(verticesA)):
-        p = verticesA[i]
-        for j in range(len(verticesB)):
-            va = verticesB[j]
-            vb = verticesB[(j+1)%len(verticesB)]
-            contactInfo = point_edge_distance(p, va, vb)
-            
-            if round(min_sqrt,5) == round(contactInfo[1],5):
-                if contactInfo[0] != contact_points[0]:
+    contact_points = []
+    for side, verticesP, verticesE in ((0, verticesA, verticesB), (1, verticesB, verticesA)):
+        for i in range(len(verticesP)):
+            p = verticesP[i]
+            for j in range(len(verticesE)):
+                va = verticesE[j]
+                vb = verticesE[(j+1)%len(verticesE)]
+                contactInfo = point_edge_distance(p, va, vb)
+                
+                if round(min_sqrt,5) == round(contactInfo[1],5):
+                    if contactInfo[0] != contact_points[0][0]:
+                        min_sqrt = contactInfo[1]
+                        contact_points.append((contactInfo[0], (side, i, j)))
+
+                elif min_sqrt > contactInfo[1]:
                     min_sqrt = contactInfo[1]
-                    contact_points.append(contactInfo[0])
-
-            elif min_sqrt > contactInfo[1]:
-                min_sqrt = contactInfo[1]
-                contact_points = [contactInfo[0]]
-    
-    for i in range(len(verticesB)):
-        p = verticesB[i]
-        for j in range(len(verticesA)):
-            va = verticesA[j]
-            vb = verticesA[(j+1)%len(verticesA)]
-            contactInfo = point_edge_distance(p, va, vb)
-            
-            if round(min_sqrt,5) == round(contactInfo[1],5):
-                if contactInfo[0] != contact_points[0]:
-                    min_sqrt = contactInfo[1]
-                    contact_points.append(contactInfo[0])
-
-            elif min_sqrt > contactInfo[1]:
-                min_sqrt = contactInfo[1]
-                contact_points = [contactInfo[0]]
+                    contact_points = [(contactInfo[0], (side, i, j))]
     return contact_points
-                    
-
-
 
 def find_circle_contact_point(centerA: Vector2, centerB: Vector2, radiusA: float):
     ab = centerB-centerA
@@ -111,8 +124,13 @@ def find_circle_contact_point(centerA: Vector2, centerB: Vector2, radiusA: float
     return centerA + dir*radiusA
 
 def find_circle_poly_contact_point(centerA: Vector2, vertices: list):
+    return _find_circle_poly_contact(centerA, vertices)[0]
+
+def _find_circle_poly_contact(centerA: Vector2, vertices: list):
+    #the feature id is the index of the closest edge
     min_sqr = math.inf
     contact_point = Vector2()
+    feature = 0
     for i in range(len(vertices)):
         va = vertices[i]
         vb = vertices[(i+1)%len(vertices)]
@@ -120,7 +138,8 @@ def find_circle_poly_contact_point(centerA: Vector2, vertices: list):
         if contactInfo[1] < min_sqr:
             min_sqr = contactInfo[1]
             contact_point = contactInfo[0]
-    return contact_point
+            feature = i
+    return contact_point, feature
 
 
 def intersect_poly(verticesA:list, verticesB: list, centerA: Vector2, centerB:Vector2):
@@ -172,6 +191,177 @@ def intersect_poly(verticesA:list, verticesB: list, centerA: Vector2, centerB:Ve
 
 
 
+#the edge of B is only used as the reference face when it is this much shallower than the edge of A,
+#without it the reference face flips between the bodies when two edges are almost parallel and the contacts lose their ids
+REFERENCE_FACE_TOLERANCE = 0.0005
+#clipped points that are at most this far in front of the reference face are still contacts,
+#so a box resting flat keeps both of its corners when one of them lifts a little
+CONTACT_TOLERANCE = 0.005
+
+def intersect_polygons(bodyA: FlatBody, bodyB: FlatBody):
+    """
+    does what intersect_poly does for two box or polygon bodies with their precomputed normals
+    every axis only needs the support point of the other polygon (the vertex furthest behind the edge) instead of projecting both polygons
+    """
+    reference = find_reference_face(bodyA, bodyB)
+    if reference == None:
+        return None
+    return reference_collide(bodyA, bodyB, reference)
+
+def find_reference_face(bodyA: FlatBody, bodyB: FlatBody):
+    """
+    SAT for two box or polygon bodies, returns None if they don't collide
+    otherwise (separation, isB, edge): the edge of A (or of B if isB) with the largest separation, the separation is negative
+    """
+    verticesA = bodyA.get_transformedVertices()
+    verticesB = bodyB.get_transformedVertices()
+    separationA, edgeA = _max_separation(verticesA, bodyA.get_transformedNormals(), verticesB)
+    if separationA >= 0:
+        return None
+    separationB, edgeB = _max_separation(verticesB, bodyB.get_transformedNormals(), verticesA)
+    if separationB >= 0:
+        return None
+    if separationB > separationA+REFERENCE_FACE_TOLERANCE:
+        return (separationB, True, edgeB)
+    return (separationA, False, edgeA)
+
+def reference_collide(bodyA: FlatBody, bodyB: FlatBody, reference: tuple) -> Vector2:
+    #the normals point out of the polygon they belong to, the collide vector points from A to B
+    separation, isB, edge = reference
+    if isB:
+        normal = bodyB.get_transformedNormals()[edge]
+        return Vector2(normal.x*separation, normal.y*separation)
+    normal = bodyA.get_transformedNormals()[edge]
+    return Vector2(normal.x*-separation, normal.y*-separation)
+
+def _max_separation(vertices: list, normals: list, otherVertices: list) -> tuple:
+    #the largest distance from an edge of the polygon to the support point of the other polygon, negative means they overlap on that axis
+    maxSeparation = -math.inf
+    bestEdge = 0
+    for i in range(len(vertices)):
+        normal = normals[i]
+        normalX = normal.x
+        normalY = normal.y
+        vertex = vertices[i]
+        edgeDistance = normalX*vertex.x+normalY*vertex.y
+        #the support point of the other polygon against the normal
+        support = math.inf
+        for other in otherVertices:
+            projection = normalX*other.x+normalY*other.y
+            if projection < support:
+                support = projection
+        separation = support-edgeDistance
+        if separation > maxSeparation:
+            maxSeparation = separation
+            bestEdge = i
+            if separation >= 0:
+                break
+    return maxSeparation, bestEdge
+
+def find_polygon_contacts(bodyA: FlatBody, bodyB: FlatBody, reference: tuple = None) -> list:
+    """
+    the contacts of two colliding box or polygon bodies as (point, feature id, depth), at most two
+    the edge of the other body that faces the reference face the most (the incident edge) is clipped to the sides of the reference face
+    and the clipped points that are behind the reference face are the contacts, the point is halfway between the incident point and the face
+    the feature id is (isB, reference edge, incident edge, end of the incident edge) so it stays the same while the same edges touch
+    reference is what find_reference_face returned, it is found again if it isn't given
+    """
+    if reference == None:
+        reference = find_reference_face(bodyA, bodyB)
+        if reference == None:
+            return []
+    _, isB, edge = reference
+    referenceBody, incidentBody = (bodyB, bodyA) if isB else (bodyA, bodyB)
+    referenceVertices = referenceBody.get_transformedVertices()
+    normal = referenceBody.get_transformedNormals()[edge]
+    nx = normal.x
+    ny = normal.y
+    incidentVertices = incidentBody.get_transformedVertices()
+    incidentNormals = incidentBody.get_transformedNormals()
+    #the incident edge is the one whose normal points the most against the reference normal
+    incidentEdge = 0
+    minDot = math.inf
+    for i in range(len(incidentNormals)):
+        incidentNormal = incidentNormals[i]
+        dot = incidentNormal.x*nx+incidentNormal.y*ny
+        if dot < minDot:
+            minDot = dot
+            incidentEdge = i
+    vertex1 = referenceVertices[edge]
+    vertex2 = referenceVertices[(edge+1)%len(referenceVertices)]
+    incident1 = incidentVertices[incidentEdge]
+    incident2 = incidentVertices[(incidentEdge+1)%len(incidentVertices)]
+    x1, y1 = incident1.x, incident1.y
+    x2, y2 = incident2.x, incident2.y
+    #the reference edge goes along the tangent, clipping keeps the part of the incident edge between its two ends
+    tx = -ny
+    ty = nx
+    lower = tx*vertex1.x+ty*vertex1.y
+    upper = tx*vertex2.x+ty*vertex2.y
+    s1 = tx*x1+ty*y1
+    s2 = tx*x2+ty*y2
+    if s1 < lower and s2 < lower or s1 > upper and s2 > upper:
+        return []
+    if s1 < lower:
+        t = (lower-s1)/(s2-s1)
+        x1, y1, s1 = x1+(x2-x1)*t, y1+(y2-y1)*t, lower
+    elif s2 < lower:
+        t = (lower-s2)/(s1-s2)
+        x2, y2, s2 = x2+(x1-x2)*t, y2+(y1-y2)*t, lower
+    if s1 > upper:
+        t = (s1-upper)/(s1-s2)
+        x1, y1 = x1+(x2-x1)*t, y1+(y2-y1)*t
+    elif s2 > upper:
+        t = (s2-upper)/(s2-s1)
+        x2, y2 = x2+(x1-x2)*t, y2+(y1-y2)*t
+    front = nx*vertex1.x+ny*vertex1.y
+    contacts = []
+    deepest = None
+    for end, (x, y) in enumerate(((x1, y1), (x2, y2))):
+        separation = nx*x+ny*y-front
+        contact = (Vector2(x-nx*separation/2, y-ny*separation/2), (isB, edge, incidentEdge, end), -separation)
+        if separation <= CONTACT_TOLERANCE:
+            contacts.append(contact)
+        if deepest == None or contact[2] > deepest[2]:
+            deepest = contact
+    #the bodies collide so they always touch somewhere, the deepest point is used if both points are in front of the face
+    return contacts or [deepest]
+
+def intersect_polygon_circle(circleCenter: Vector2, circleRadius: float, body: FlatBody):
+    """does what intersect_poly_circle does for a box or polygon body with its precomputed normals"""
+    vertices = body.get_transformedVertices()
+    normals = body.get_transformedNormals()
+    centerX = circleCenter.x
+    centerY = circleCenter.y
+    depth = math.inf
+    normal = None
+    for i in range(len(vertices)):
+        edgeNormal = normals[i]
+        vertex = vertices[i]
+        #the distance from the edge to the closest point of the circle
+        separation = edgeNormal.x*(centerX-vertex.x)+edgeNormal.y*(centerY-vertex.y)-circleRadius
+        if separation >= 0:
+            return None
+        if -separation < depth:
+            depth = -separation
+            normal = edgeNormal
+    #the axis from the circle center to the closest point of the polygon catches the circle next to a corner
+    closestPoint = _closest_point_on_poly(circleCenter, vertices)
+    axis = closestPoint - circleCenter
+    if axis != Vector2():
+        axis = axis.normalize()
+        minA, maxA = _project_vertices(vertices, axis)
+        minB, maxB = _project_circle(circleCenter, circleRadius, axis)
+        if minA >= maxB or minB >= maxA:
+            return None
+        axisDepth = min(maxB-minA, maxA-minB)
+        if axisDepth < depth:
+            depth = axisDepth
+            normal = axis
+    #set the normal vector in the right direction
+    if normal.dot(circleCenter-body.position) < 0: normal = -normal
+    return normal*depth
+
 def intersect_poly_circle(circleCenter: Vector2, circleRadius:float, vertices: list, boxCenter: Vector2):
     normal = Vector2()
     depth = math.inf
@@ -235,6 +425,98 @@ def collideAABB(aabbA: FlatAABB, aabbB: FlatAABB):
     if aabbA.maxY <= aabbB.minY or aabbB.maxY <= aabbA.minY:
         return False
     return True
+def point_in_poly(point: Vector2, vertices: list):
+    #SAT with a point, if the point is inside the projection on every normal then its inside the polygon
+    for i in range(len(vertices)):
+        vertex1:Vector2 = vertices[i]
+        vertex2:Vector2 = vertices[(i+1)%len(vertices)]
+
+        edge:Vector2 = vertex2-vertex1
+        axis = Vector2(-edge.y, edge.x)
+        minA, maxA = _project_vertices(vertices, axis)
+        proj = axis.dot(point)
+        if proj < minA or proj > maxA:
+            return False
+    return True
+
+def point_in_circle(point: Vector2, center: Vector2, radius: float):
+    return (point-center).magnitude_squared() <= radius*radius
+
+def contains_point(body: FlatBody, point: Vector2):
+    if body.shapeType != ShapeType.Circle:
+        return point_in_poly(point, body.get_transformedVertices())
+    return point_in_circle(point, body.position, body.RADIUS)
+
+def intersect_body_aabb(body: FlatBody, aabb: FlatAABB):
+    #the aabb is turned into a box so the same SAT tests are used
+    vertices = [Vector2(aabb.minX, aabb.minY), Vector2(aabb.maxX, aabb.minY), Vector2(aabb.maxX, aabb.maxY), Vector2(aabb.minX, aabb.maxY)]
+    center = Vector2((aabb.minX+aabb.maxX)/2, (aabb.minY+aabb.maxY)/2)
+    if body.shapeType != ShapeType.Circle:
+        return intersect_poly(vertices, body.get_transformedVertices(), center, body.position) != None
+    return intersect_poly_circle(body.position, body.RADIUS, vertices, center) != None
+
+def raycast_circle(origin: Vector2, direction: Vector2, center: Vector2, radius: float):
+    """direction has to be normalized, returns (distance, normal) of the first hit or None"""
+    toOrigin = origin-center
+    b = toOrigin.dot(direction)
+    c = toOrigin.magnitude_squared()-radius*radius
+    #the origin is inside the circle
+    if c <= 0:
+        return 0, -direction
+    discriminant = b*b-c
+    if b > 0 or discriminant < 0:
+        return None
+    distance = -b-math.sqrt(discriminant)
+    normal = origin+direction*distance-center
+    if normal != Vector2():
+        normal = normal.normalize()
+    return distance, normal
+
+def raycast_poly(origin: Vector2, direction: Vector2, vertices: list):
+    """direction has to be normalized, returns (distance, normal) of the first hit or None"""
+    centroid = Vector2()
+    for vertex in vertices:
+        centroid += vertex
+    centroid /= len(vertices)
+
+    lower = 0
+    upper = math.inf
+    hitNormal = None
+    for i in range(len(vertices)):
+        vertex1:Vector2 = vertices[i]
+        vertex2:Vector2 = vertices[(i+1)%len(vertices)]
+        edge:Vector2 = vertex2-vertex1
+        normal = Vector2(-edge.y, edge.x)
+        #make sure the normal is pointing out of the polygon
+        if normal.dot(vertex1-centroid) < 0:
+            normal = -normal
+        numerator = normal.dot(vertex1-origin)
+        denominator = normal.dot(direction)
+        if denominator == 0:
+            #the ray is parallel to the edge and outside of it
+            if numerator < 0:
+                return None
+            continue
+        distance = numerator/denominator
+        if denominator < 0:
+            #the ray is entering through this edge
+            if distance > lower:
+                lower = distance
+                hitNormal = normal
+        elif distance < upper:
+            upper = distance
+        if upper < lower:
+            return None
+    #the origin is inside the polygon
+    if hitNormal == None:
+        return 0, -direction
+    return lower, hitNormal.normalize()
+
+def raycast_body(body: FlatBody, origin: Vector2, direction: Vector2):
+    if body.shapeType != ShapeType.Circle:
+        return raycast_poly(origin, direction, body.get_transformedVertices())
+    return raycast_circle(origin, direction, body.position, body.RADIUS)
+
 def resolve_collision_with_rotation(contactInfo: CollideInfo):
     collide = contactInfo.collide
     normal = collide.normalize()
@@ -307,16 +589,29 @@ def resolve_collision(collideInfo: CollideInfo):
     bodyB.velocity += impluse * bodyB.INVERSE_MASS
         
 def get_collide(bodyA:FlatBody, bodyB: FlatBody):
-    if bodyA.shapeType == ShapeType.Box and bodyB.shapeType == ShapeType.Box:
-        collide = intersect_poly(bodyA.get_transformedVertices(), bodyB.get_transformedVertices(), bodyA.position, bodyB.position)
-    elif bodyA.shapeType == ShapeType.Circle and bodyB.shapeType == ShapeType.Circle:
+    return get_collide_reference(bodyA, bodyB)[0]
+
+def get_collide_reference(bodyA:FlatBody, bodyB: FlatBody) -> tuple:
+    """
+    returns (collide, reference), reference is the reference face of two polygons (see find_reference_face) and None for circles
+    it can be passed to find_contact_features so the contacts are found without doing SAT again
+    """
+    #boxes and polygons are both polygons with precomputed normals
+    isCircleA = bodyA.shapeType == ShapeType.Circle
+    isCircleB = bodyB.shapeType == ShapeType.Circle
+    if not isCircleA and not isCircleB:
+        reference = find_reference_face(bodyA, bodyB)
+        if reference == None:
+            return None, None
+        return reference_collide(bodyA, bodyB, reference), reference
+    elif isCircleA and isCircleB:
         collide = intersect_circle(bodyA.position, bodyA.RADIUS, bodyB.position, bodyB.RADIUS)
-    elif bodyA.shapeType == ShapeType.Box and bodyB.shapeType == ShapeType.Circle:
-        collide = intersect_poly_circle(bodyB.position, bodyB.RADIUS, bodyA.get_transformedVertices(), bodyA.position)
-    elif bodyB.shapeType == ShapeType.Box and bodyA.shapeType == ShapeType.Circle:
+    elif isCircleB:
+        collide = intersect_polygon_circle(bodyB.position, bodyB.RADIUS, bodyA)
+    else:
         #the directions has to be swaped since the relations between A and B is swaped if this is not done 
         #then collision will be resolved in the opposite direction leading to shutters
-        collide = intersect_poly_circle(bodyA.position, bodyA.RADIUS, bodyB.get_transformedVertices(), bodyB.position)
+        collide = intersect_polygon_circle(bodyA.position, bodyA.RADIUS, bodyB)
         if collide != None:
             collide = -collide
-    return collide
+    return collide, None
@@ -0,0 +1,118 @@
+"""
+continuous collision detection for bodies that move more than a fraction of their size in one substep
+
+the time of impact is found with conservative advancement: the body is moved forward by the distance to the other body
+divided by the fastest any of its points can move, which can never move it past the other body,
+until it is as deep in the other body as the contacts of the next substep need
+"""
+import math
+from vector import Vector2
+from flatBody import FlatBody, ShapeType
+import collision
+
+#how many times a body is moved forward before the time it got to is used
+MAX_ITERATIONS = 20
+#the body is close enough to the target depth when it is within this distance of it
+TOLERANCE = 0.001
+
+def get_size(body: FlatBody) -> float:
+    #the shortest side of the aabb of the shape, a body moving less than this can't jump over a body as thick as itself
+    aabb = body.shape.aabb
+    return min(aabb.maxX-aabb.minX, aabb.maxY-aabb.minY)
+
+def get_maxRadius(body: FlatBody) -> float:
+    #how far the furthest point of the shape is from the center, a circle turning doesn't move its outline
+    if body.shapeType == ShapeType.Circle:
+        return 0
+    return max(math.sqrt(vertex.x*vertex.x+vertex.y*vertex.y) for vertex in body.vertices)
+
+def signed_distance(bodyA: FlatBody, bodyB: FlatBody) -> float:
+    """the distance between the outlines of the bodies, negative (minus how deep they are in each other) if they overlap"""
+    isCircleA = bodyA.shapeType == ShapeType.Circle
+    isCircleB = bodyB.shapeType == ShapeType.Circle
+    if isCircleA and isCircleB:
+        return (bodyB.position-bodyA.position).magnitude()-bodyA.RADIUS-bodyB.RADIUS
+    if isCircleA:
+        return _polygon_circle_distance(bodyB, bodyA.position, bodyA.RADIUS)
+    if isCircleB:
+        return _polygon_circle_distance(bodyA, bodyB.position, bodyB.RADIUS)
+    reference = collision.find_reference_face(bodyA, bodyB)
+    if reference != None:
+        return reference[0]
+    verticesA = bodyA.get_transformedVertices()
+    verticesB = bodyB.get_transformedVertices()
+    #two convex polygons that don't overlap are closest at a vertex of one of them
+    return math.sqrt(min(_vertices_edges_distance_squared(verticesA, verticesB), _vertices_edges_distance_squared(verticesB, verticesA)))
+
+def _polygon_circle_distance(body: FlatBody, center: Vector2, radius: float) -> float:
+    vertices = body.get_transformedVertices()
+    normals = body.get_transformedNormals()
+    centerX = center.x
+    centerY = center.y
+    #how far the center is in front of the edge it is furthest in front of, at most 0 when the center is inside
+    separation = -math.inf
+    for normal, vertex in zip(normals, vertices):
+        edgeSeparation = normal.x*(centerX-vertex.x)+normal.y*(centerY-vertex.y)
+        if edgeSeparation > separation:
+            separation = edgeSeparation
+    if separation <= 0:
+        return separation-radius
+    return math.sqrt(_vertices_edges_distance_squared((center,), vertices))-radius
+
+def _vertices_edges_distance_squared(vertices: list, polygon: list) -> float:
+    #the squared distance from the closest of the vertices to the closest edge of the polygon
+    minDistance = math.inf
+    count = len(polygon)
+    for vertex in vertices:
+        px = vertex.x
+        py = vertex.y
+        for i in range(count):
+            a = polygon[i]
+            b = polygon[(i+1)%count]
+            edgeX = b.x-a.x
+            edgeY = b.y-a.y
+            t = ((px-a.x)*edgeX+(py-a.y)*edgeY)/(edgeX*edgeX+edgeY*edgeY)
+            t = min(max(t, 0), 1)
+            dx = a.x+edgeX*t-px
+            dy = a.y+edgeY*t-py
+            distance = dx*dx+dy*dy
+            if distance < minDistance:
+                minDistance = distance
+    return minDistance
+
+def set_pose(body: FlatBody, startPosition: Vector2, startRotation: float, endPosition: Vector2, endRotation: float, t: float) -> None:
+    #puts the body where it is after the fraction t of its move from the start to the end pose
+    body.position = Vector2(startPosition.x+(endPosition.x-startPosition.x)*t, startPosition.y+(endPosition.y-startPosition.y)*t)
+    body.rotation = startRotation+(endRotation-startRotation)*t
+    body.transformUpdateNeeded = True
+
+def time_of_impact(body: FlatBody, startPosition: Vector2, startRotation: float, endPosition: Vector2, endRotation: float,
+                   other: FlatBody, targetDepth: float, maxTime: float = 1) -> float:
+    """
+    the fraction of the move from the start to the end pose after which body is targetDepth deep in other, None if that is after maxTime
+    other stays where it is, a body that already starts that deep returns 0 if its center would go into other and None otherwise
+    the pose of body is changed, set it again afterwards
+    """
+    motionX = endPosition.x-startPosition.x
+    motionY = endPosition.y-startPosition.y
+    #no point of the body moves faster than this over the whole move
+    bound = math.sqrt(motionX*motionX+motionY*motionY)+abs(endRotation-startRotation)*get_maxRadius(body)
+    if bound == 0:
+        return None
+    t = 0
+    for iteration in range(MAX_ITERATIONS):
+        set_pose(body, startPosition, startRotation, endPosition, endRotation, t)
+        distance = signed_distance(body, other)+targetDepth
+        if distance <= TOLERANCE:
+            if iteration > 0:
+                return t
+            #the contacts of the substep should have stopped it but a pile of bodies pushing from behind can leave it moving into other
+            motionLength = math.sqrt(motionX*motionX+motionY*motionY)
+            if motionLength == 0:
+                return None
+            hit = collision.raycast_body(other, startPosition, Vector2(motionX/motionLength, motionY/motionLength))
+            return 0 if hit != None and hit[0] < motionLength else None
+        t += distance/bound
+        if t >= maxTime:
+            return None
+    return t
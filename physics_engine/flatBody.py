@@ -1,23 +1,112 @@
-import pygame
 import random
 import math
-import camera
-from pygame import Vector2, SurfaceType
+import weakref
+import numpy as np
+from vector import Vector2
 from enum import Enum
 
 class ShapeType(Enum):
     Circle = 1
     Box = 2
+    #any convex polygon, made with create_polygon
+    Polygon = 3
 COLOR_OPTIONS = ['red', 'white' ,'green', 'yellow']
+#the collision layer a body is in when nothing else is set, and the mask of a body that collides with every layer
+DEFAULT_CATEGORY = 0x0001
+ALL_CATEGORIES = 0xFFFFFFFF
+class ShapePrototype:
+    """
+    the part of a body that only depends on its shape, bodies with the same shape and size share one
+    nothing in it is changed after it is made, it is dropped from the cache when the last body with the shape is gone
+    """
+    __slots__ = ("shapeType", "width", "height", "radius", "vertices", "normals", "triangleIndices", "aabb", "inertiaPerMass", "__weakref__")
+
+    def __init__(self, shapeType: ShapeType, width: float, height: float, radius: float, vertices: tuple = None) -> None:
+        self.shapeType = shapeType
+        self.width = width
+        self.height = height
+        self.radius = radius
+        if shapeType == ShapeType.Box:
+            self.vertices = tuple(create_vectices(width, height))
+            #the triangle indices has to be accending order!!!
+            self.triangleIndices = ((0,1,2), (0,2,3))
+            self.aabb = FlatAABB(-width/2, width/2, -height/2, height/2, None)
+            self.inertiaPerMass = (1/12)*(width*width+height*height)
+        elif shapeType == ShapeType.Polygon:
+            #the vertices are already checked and centered by create_polygon
+            self.vertices = tuple(vertices)
+            self.triangleIndices = tuple((0, i, i+1) for i in range(1, len(vertices)-1))
+            self.aabb = FlatAABB(min(v.x for v in vertices), max(v.x for v in vertices), min(v.y for v in vertices), max(v.y for v in vertices), None)
+            self.inertiaPerMass = _polygon_inertia_per_mass(vertices)
+        else:
+            self.vertices = ()
+            self.triangleIndices = ()
+            self.aabb = FlatAABB(-radius, radius, -radius, radius, None)
+            self.inertiaPerMass = 0.5*radius*radius
+        #the outward unit normal of the edge from vertex i to vertex i+1, the body only rotates them
+        self.normals = tuple(_edge_normal(self.vertices[i], self.vertices[(i+1)%len(self.vertices)]) for i in range(len(self.vertices)))
+
+def _edge_normal(vertex1: Vector2, vertex2: Vector2) -> Vector2:
+    edge = vertex2-vertex1
+    return Vector2(edge.y, -edge.x).normalize()
+
+def _polygon_inertia_per_mass(vertices: list) -> float:
+    #the vertices are centered on the centroid so this is the inertia around the centroid
+    numerator = 0
+    denominator = 0
+    for i in range(len(vertices)):
+        a = vertices[i]
+        b = vertices[(i+1)%len(vertices)]
+        cross = a.cross(b)
+        numerator += cross*(a.dot(a)+a.dot(b)+b.dot(b))
+        denominator += cross
+    return numerator/(6*denominator)
+
+#(shape type, width, height, radius, polygon vertices) -> ShapePrototype, the bodies hold the only strong references
+#so spawning bodies of ever new sizes doesn't grow it forever
+_shapePrototypes = weakref.WeakValueDictionary()
+
+def get_shapePrototype(shapeType: ShapeType, width: float, height: float, radius: float, vertices: list = None) -> ShapePrototype:
+    key = (shapeType, width, height, radius, tuple((v.x, v.y) for v in vertices) if vertices != None else None)
+    shape = _shapePrototypes.get(key)
+    if shape == None:
+        shape = ShapePrototype(shapeType, width, height, radius, vertices)
+        _shapePrototypes[key] = shape
+    return shape
+
 class FlatBody:
-    def __init__(self, position:Vector2, mass:float, width:float, height: float, radius: float, shapeType:ShapeType, isStatic = False) -> None:
-        self.position = position
-        self.velocity = Vector2()
-        self.force = Vector2()
-        self.rotation = 0
-        self.rotationalVelocity = 0
+    #no __dict__, every attribute a body can have is listed here
+    __slots__ = ("handle", "dynamicIndex", "store", "storeIndex", "_position", "_velocity", "_force", "_rotation", "_rotationalVelocity",
+                 "IS_STATIC", "isAwake", "sleepTime", "island", "staticIndex", "previousPosition", "previousRotation",
+                 "MASS", "INVERSE_MASS", "restitution", "RADIUS", "WIDTH", "HEIGHT", "shapeType", "shape",
+                 "interia", "inverseInteria", "vertices", "triangleIndices", "aabb", "transformedAABB", "_transformedVertices",
+                 "_transformedNormals", "_normalsRotation", "categoryBits", "maskBits", "groupIndex",
+                 "verticesUpdateNeeded", "aabbUpdateNeeded", "_sine", "_cosine", "_trigRotation", "color", "outLine")
+
+    def __init__(self, position:Vector2, mass:float, width:float, height: float, radius: float, shapeType:ShapeType, isStatic = False, vertices: list = None) -> None:
+        #when the body is added to a BodyStore the state below is read from and written to the store instead
+        self.store = None
+        self.storeIndex = -1
+        self._position = position
+        self._velocity = Vector2()
+        self._force = Vector2()
+        self._rotation = 0
+        self._rotationalVelocity = 0
 
         self.IS_STATIC = isStatic
+        #sleeping bodies are not integrated or collided until something wakes their island up
+        self.isAwake = True
+        self.sleepTime = 0
+        #the bodies that fell asleep together, waking one of them wakes all of them
+        self.island = None
+        #the StaticIndex a static body is in, it has to be rebuilt when the body moves
+        self.staticIndex = None
+        #the handle the world gave the body (see BodyRegistry) and where it is in World.dynamicBodies, None and -1 outside of a world
+        self.handle = None
+        self.dynamicIndex = -1
+        #the pose at the start of the last step so rendering can interpolate between steps
+        self.previousPosition = None
+        self.previousRotation = 0
         #this is to insure there is no negative or zero mass 
         mass = max(mass, 1)
         self.MASS = mass
@@ -25,31 +114,40 @@ class FlatBody:
         else: self.INVERSE_MASS = 1/mass
         #restitution = relative speed after collision/relative speed before collision ie. bounciness
         self.restitution = 0
+        #two bodies only collide when each one's category has a bit in the mask of the other (see broadphase.should_collide),
+        #bodies with the same groupIndex always collide if it is positive and never if it is negative, 0 is no group
+        self.categoryBits = DEFAULT_CATEGORY
+        self.maskBits = ALL_CATEGORIES
+        self.groupIndex = 0
         
         self.RADIUS = radius
         self.WIDTH = width
         self.HEIGHT = height
 
         self.shapeType = shapeType
+        #the local vertices, triangles, aabb and inertia are shared with every body of the same shape
+        self.shape = get_shapePrototype(shapeType, width, height, radius, vertices)
         self.interia = self.calculate_rotational_inertia()
         
         if isStatic: self.inverseInteria = 0
         else: self.inverseInteria = 1/self.interia
 
-        if self.shapeType == ShapeType.Box:
-            self.aabb = FlatAABB(-width/2, width/2, -height/2, height/2, position)
-            self.vertices = create_vectices(width, height)
-            self._transformedVertices = self.vertices
-            #the triangle indices has to be accending order!!!
-            self.triangleIndices = [(0,1,2), (0,2,3)]
-        else:
-            self.aabb = FlatAABB(-radius, radius, -radius, radius, position)
-            self.vertices = []
-            self._transformedVertices = []
-            self.triangleIndices = []
-        
-        self.transformedAABB = self.aabb
-        self.transformUpdateNeeded = True
+        self.vertices = self.shape.vertices
+        self.triangleIndices = self.shape.triangleIndices
+        self.aabb = self.shape.aabb
+        #the world vertices are written into the same vectors every time the body moves
+        self._transformedVertices = [Vector2() for _ in self.vertices]
+        #the world normals only change with the rotation so they are updated when it is different from _normalsRotation
+        self._transformedNormals = [normal.copy() for normal in self.shape.normals]
+        self._normalsRotation = 0
+        self.transformedAABB = FlatAABB(0, 0, 0, 0, position)
+        #the vertices and the aabb are updated separately so getting one doesn't update or skip the other
+        self.verticesUpdateNeeded = True
+        self.aabbUpdateNeeded = True
+        #the sine and cosine of _trigRotation, they are only recalculated when the rotation changed
+        self._sine = 0.0
+        self._cosine = 1.0
+        self._trigRotation = 0
         if isStatic:
             self.color = 'brown'
             self.outLine = 'gray'
@@ -57,96 +155,420 @@ class FlatBody:
             self.color = random.sample(COLOR_OPTIONS, 1)[0]
             self.outLine = 'white'
     
+    #a body in a store returns a copy of its row, changing it does nothing until it is set back
+    @property
+    def position(self) -> Vector2:
+        if self.store == None:
+            return self._position
+        x, y = self.store.position[self.storeIndex].tolist()
+        return Vector2(x, y)
+    @position.setter
+    def position(self, value: Vector2) -> None:
+        if self.store == None:
+            self._position = value
+        else:
+            self.store.position[self.storeIndex] = (value.x, value.y)
+
+    @property
+    def velocity(self) -> Vector2:
+        if self.store == None:
+            return self._velocity
+        x, y = self.store.velocity[self.storeIndex].tolist()
+        return Vector2(x, y)
+    @velocity.setter
+    def velocity(self, value: Vector2) -> None:
+        if self.store == None:
+            self._velocity = value
+        else:
+            self.store.velocity[self.storeIndex] = (value.x, value.y)
+
+    @property
+    def force(self) -> Vector2:
+        if self.store == None:
+            return self._force
+        x, y = self.store.force[self.storeIndex].tolist()
+        return Vector2(x, y)
+    @force.setter
+    def force(self, value: Vector2) -> None:
+        if self.store == None:
+            self._force = value
+        else:
+            self.store.force[self.storeIndex] = (value.x, value.y)
+
+    @property
+    def rotation(self) -> float:
+        if self.store == None:
+            return self._rotation
+        return float(self.store.rotation[self.storeIndex])
+    @rotation.setter
+    def rotation(self, value: float) -> None:
+        if self.store == None:
+            self._rotation = value
+        else:
+            self.store.rotation[self.storeIndex] = value
+
+    @property
+    def rotationalVelocity(self) -> float:
+        if self.store == None:
+            return self._rotationalVelocity
+        return float(self.store.rotationalVelocity[self.storeIndex])
+    @rotationalVelocity.setter
+    def rotationalVelocity(self, value: float) -> None:
+        if self.store == None:
+            self._rotationalVelocity = value
+        else:
+            self.store.rotationalVelocity[self.storeIndex] = value
+
+    def get_positionXY(self) -> tuple:
+        """the position as (x, y), a body in a store reads it from the arrays without making a Vector2"""
+        if self.store == None:
+            position = self._position
+            return position.x, position.y
+        return self.store.position[self.storeIndex].tolist()
+
+    def detach_store(self) -> None:
+        #copies the state out of the store so the body can be used on its own again
+        self._position = self.position
+        self._velocity = self.velocity
+        self._force = self.force
+        self._rotation = self.rotation
+        self._rotationalVelocity = self.rotationalVelocity
+        self.store = None
+        self.storeIndex = -1
+
+    @property
+    def transformUpdateNeeded(self) -> bool:
+        return self.verticesUpdateNeeded or self.aabbUpdateNeeded
+    @transformUpdateNeeded.setter
+    def transformUpdateNeeded(self, value: bool) -> None:
+        self.verticesUpdateNeeded = value
+        self.aabbUpdateNeeded = value
+
     def get_transformedAABB(self):
-        if self.transformUpdateNeeded:
-            if self.shapeType == ShapeType.Box: self.transform_aabb()
-            else : 
-                self.transformedAABB.minX = self.position.x-self.RADIUS
-                self.transformedAABB.maxX = self.position.x+self.RADIUS
-                self.transformedAABB.minY = self.position.y-self.RADIUS
-                self.transformedAABB.maxY = self.position.y+self.RADIUS
-                self.transformUpdateNeeded = False
-                
-            
-        self.transformedAABB.position = self.position
+        if self.aabbUpdateNeeded:
+            self.transform_aabb()
+            self.aabbUpdateNeeded = False
         return self.transformedAABB
     
     def get_transformedVertices(self) -> list:
-        if self.transformUpdateNeeded:
-            self._transformedVertices = self.transform_vertices()
-            self.transformUpdateNeeded = False
+        """the vectors are reused, copy them to keep them after the body moves"""
+        if self.verticesUpdateNeeded:
+            self.transform_vertices()
+            self.verticesUpdateNeeded = False
         return self._transformedVertices
+
+    def get_transformedNormals(self) -> list:
+        """the outward normals of the edges in world space, normals[i] belongs to the edge from vertex i to vertex i+1"""
+        rotation = self.rotation
+        if rotation != self._normalsRotation:
+            sine, cosine = self.get_sin_cos()
+            for normal, newNormal in zip(self.shape.normals, self._transformedNormals):
+                newNormal.x = normal.x*cosine-normal.y*sine
+                newNormal.y = normal.x*sine+normal.y*cosine
+            self._normalsRotation = rotation
+        return self._transformedNormals
+
+    def get_sin_cos(self) -> tuple:
+        rotation = self.rotation
+        if rotation != self._trigRotation:
+            self._sine = math.sin(rotation)
+            self._cosine = math.cos(rotation)
+            self._trigRotation = rotation
+        return self._sine, self._cosine
     
     def transform_aabb(self):
-        minX = math.inf
-        minY = math.inf
-        maxX = -math.inf
-        maxY = -math.inf
-        for vertex in self.get_transformedVertices():
-            minX = min(minX, vertex.x)
-            minY = min(minY, vertex.y)
-            maxX = max(maxX, vertex.x)
-            maxY = max(maxY, vertex.y)
-        self.transformedAABB.minX = minX
-        self.transformedAABB.maxX = maxX
-        self.transformedAABB.minY = minY
-        self.transformedAABB.maxY = maxY
+        position = self.position
+        aabb = self.transformedAABB
+        if self.shapeType == ShapeType.Box:
+            #the extents of the rotated box, no vertices needed
+            sine, cosine = self.get_sin_cos()
+            sine = abs(sine)
+            cosine = abs(cosine)
+            halfWidth = (cosine*self.WIDTH+sine*self.HEIGHT)/2
+            halfHeight = (sine*self.WIDTH+cosine*self.HEIGHT)/2
+        elif self.shapeType == ShapeType.Polygon:
+            minX = minY = math.inf
+            maxX = maxY = -math.inf
+            for vertex in self.get_transformedVertices():
+                minX = min(minX, vertex.x)
+                maxX = max(maxX, vertex.x)
+                minY = min(minY, vertex.y)
+                maxY = max(maxY, vertex.y)
+            aabb.minX = minX
+            aabb.maxX = maxX
+            aabb.minY = minY
+            aabb.maxY = maxY
+            aabb.position = position
+            return
+        else:
+            halfWidth = self.RADIUS
+            halfHeight = self.RADIUS
+        aabb.minX = position.x-halfWidth
+        aabb.maxX = position.x+halfWidth
+        aabb.minY = position.y-halfHeight
+        aabb.maxY = position.y+halfHeight
+        aabb.position = position
         
     def transform_vertices(self):
-        sine = math.sin(self.rotation)
-        cosine = math.cos(self.rotation)
-        newVertices = []
-        for vertex in self.vertices:
-            newVertex = Vector2()
-            newVertex.x = vertex.x*cosine-vertex.y*sine
-            newVertex.y = vertex.x*sine+vertex.y*cosine
-            newVertex += self.position
-            newVertices.append(newVertex)
-        return newVertices
+        sine, cosine = self.get_sin_cos()
+        positionX, positionY = self.get_positionXY()
+        for vertex, newVertex in zip(self.vertices, self._transformedVertices):
+            newVertex.x = vertex.x*cosine-vertex.y*sine+positionX
+            newVertex.y = vertex.x*sine+vertex.y*cosine+positionY
+        return self._transformedVertices
 
     def physic_update(self, tickPerSec:int, gravity: Vector2):
-        if self.IS_STATIC: gravity = Vector2()
-        accleration = self.force/self.MASS + gravity
-        self.velocity += accleration/tickPerSec
-        if self.velocity.magnitude() < 0.01:self.velocity = Vector2(0,0)
-        self.push_body(self.velocity/tickPerSec)
-        self.rotate_body(self.rotationalVelocity/tickPerSec)
-        self.force = Vector2()
+        self.integrate_velocity(tickPerSec, gravity)
+        self.integrate_position(tickPerSec)
+
+    def integrate_velocity(self, tickPerSec:int, gravity: Vector2):
+        #the vectors are changed in place so nothing is allocated (a body in a store gets copies and sets them back)
+        velocity = self.velocity
+        force = self.force
+        if self.IS_STATIC: gravityX = gravityY = 0
+        else: gravityX, gravityY = gravity.x, gravity.y
+        velocityX = velocity.x+(force.x/self.MASS+gravityX)/tickPerSec
+        velocityY = velocity.y+(force.y/self.MASS+gravityY)/tickPerSec
+        if velocityX*velocityX+velocityY*velocityY < 0.0001: velocityX = velocityY = 0
+        velocity.x = velocityX
+        velocity.y = velocityY
+        self.velocity = velocity
+        force.x = 0
+        force.y = 0
+        self.force = force
+
+    def integrate_position(self, tickPerSec:int):
+        position = self.position
+        velocity = self.velocity
+        position.x += velocity.x/tickPerSec
+        position.y += velocity.y/tickPerSec
+        self.position = position
+        self.rotation += self.rotationalVelocity/tickPerSec
+        self.verticesUpdateNeeded = True
+        self.aabbUpdateNeeded = True
+        if self.IS_STATIC and self.staticIndex != None:
+            self.staticIndex.dirty = True
     
     def calculate_rotational_inertia(self):
-        if self.shapeType == ShapeType.Circle:
-            return 0.5 * self.MASS * self.RADIUS * self.RADIUS
-        else:
-            return (1/12) *self.MASS * (self.WIDTH*self.WIDTH+self.HEIGHT*self.HEIGHT)
+        return self.MASS*self.shape.inertiaPerMass
     def apply_force(self, amount: Vector2) -> None:
         self.force += amount
+        if not self.isAwake and amount != Vector2():
+            self.wake_up()
     def rotate_body(self, amount:float) -> None:
         self.rotation += amount
-        self.transformUpdateNeeded = True
+        self.verticesUpdateNeeded = True
+        self.aabbUpdateNeeded = True
+        if self.IS_STATIC and self.staticIndex != None:
+            self.staticIndex.dirty = True
     def push_body(self, amount:Vector2) -> None:
-        self.position += amount
-        self.transformUpdateNeeded = True
+        if self.store == None:
+            self._position += amount
+        else:
+            #the row is changed in place, going through self.position would make a Vector2 only to throw it away
+            row = self.store.position[self.storeIndex]
+            row[0] += amount.x
+            row[1] += amount.y
+        self.verticesUpdateNeeded = True
+        self.aabbUpdateNeeded = True
+        if self.IS_STATIC and self.staticIndex != None:
+            self.staticIndex.dirty = True
+
+    def save_previous_state(self) -> None:
+        self.previousPosition = self.position.copy()
+        self.previousRotation = self.rotation
+
+    def get_interpolatedPose(self, alpha: float) -> tuple:
+        """the position and rotation alpha of the way from the previous step to the current one"""
+        if self.previousPosition == None or alpha >= 1:
+            return self.position, self.rotation
+        return self.previousPosition.lerp(self.position, alpha), self.previousRotation+(self.rotation-self.previousRotation)*alpha
 
     def move_body(self, pos:Vector2) -> None:
         self.position = pos
-        self.transformUpdateNeeded = True
+        #teleports are not interpolated
+        self.previousPosition = None
+        self.verticesUpdateNeeded = True
+        self.aabbUpdateNeeded = True
+        if self.IS_STATIC and self.staticIndex != None:
+            self.staticIndex.dirty = True
+        self.wake_up()
 
-    def render(self, display:SurfaceType, pixelPerMeter:int, camera: camera.Camera) -> None:
-        if self.shapeType == ShapeType.Box:
-            newVertices = [worldvertex*pixelPerMeter+camera.position for worldvertex in self.get_transformedVertices()]
-            pygame.draw.polygon(display, self.color, newVertices)
-            pygame.draw.polygon(display, self.outLine, newVertices, width=1)
+    def set_awake(self, isAwake: bool) -> None:
+        self.isAwake = isAwake
+        self.sleepTime = 0
+        if isAwake:
+            self.island = None
         else:
-            pos = self.position*pixelPerMeter+camera.position
-            if pos.x < 0:
-                return
-            pygame.draw.circle(display, self.color, pos, self.RADIUS*pixelPerMeter)
-            pygame.draw.circle(display, self.outLine, pos, self.RADIUS*pixelPerMeter, width=1)
+            self.velocity = Vector2()
+            self.rotationalVelocity = 0
+        if self.store != None:
+            self.store.awake[self.storeIndex] = 1 if isAwake else 0
+
+    def wake_up(self) -> None:
+        if self.isAwake:
+            self.sleepTime = 0
+            return
+        #the whole island wakes up together
+        for body in self.island or [self]:
+            body.set_awake(True)
+
+    def put_to_sleep(self, island: list) -> None:
+        self.set_awake(False)
+        self.island = island
     
 def create_circle(position:Vector2, mass:float, radius: float, isStatic = False) -> FlatBody:
     return FlatBody(position, mass, 0, 0, radius, ShapeType.Circle, isStatic)
 def create_box(position:Vector2, mass:float, width:float, height: float, isStatic = False) -> FlatBody:
     return FlatBody(position, mass, width, height, 0, ShapeType.Box, isStatic)
+def create_polygon(position:Vector2, mass:float, vertices: list, isStatic = False) -> FlatBody:
+    """
+    vertices are relative to position and have to be CLOCK WISE (like create_vectices) and convex
+    they are moved so the centroid is at the origin and the body is placed on the centroid, so the polygon ends up where the vertices say
+    """
+    vertices = [Vector2(vertex.x, vertex.y) for vertex in vertices]
+    validate_polygon(vertices)
+    centroid = polygon_centroid(vertices)
+    vertices = [vertex-centroid for vertex in vertices]
+    width = max(v.x for v in vertices)-min(v.x for v in vertices)
+    height = max(v.y for v in vertices)-min(v.y for v in vertices)
+    return FlatBody(position+centroid, mass, width, height, 0, ShapeType.Polygon, isStatic, vertices)
+def create_regular_polygon(position:Vector2, mass:float, radius: float, sides: int, isStatic = False) -> FlatBody:
+    vertices = [Vector2(radius, 0).rotate_rad(2*math.pi*i/sides) for i in range(sides)]
+    return create_polygon(position, mass, vertices, isStatic)
+def validate_polygon(vertices: list) -> None:
+    """raises ValueError if the vertices are not a convex polygon in CLOCK WISE order"""
+    if len(vertices) < 3:
+        raise ValueError("a polygon needs at least 3 vertices")
+    for i in range(len(vertices)):
+        a = vertices[i]
+        b = vertices[(i+1)%len(vertices)]
+        c = vertices[(i+2)%len(vertices)]
+        if (b-a).magnitude_squared() == 0:
+            raise ValueError(f"vertex {i} and {(i+1)%len(vertices)} of the polygon are the same")
+        #every corner has to turn the same way, a straight corner is not allowed either
+        turn = (b-a).cross(c-b)
+        if turn < 0:
+            raise ValueError("the polygon vertices has to be CLOCK WISE")
+        if turn == 0:
+            raise ValueError(f"vertex {(i+1)%len(vertices)} of the polygon is on a straight line")
+    #a star turns the same way at every corner but goes around more than once
+    area = sum(vertices[i].cross(vertices[(i+1)%len(vertices)]) for i in range(len(vertices)))
+    angle = 0
+    for i in range(len(vertices)):
+        a = vertices[i]
+        b = vertices[(i+1)%len(vertices)]
+        c = vertices[(i+2)%len(vertices)]
+        angle += math.atan2((b-a).cross(c-b), (b-a).dot(c-b))
+    if area <= 0 or angle > 2*math.pi+1e-9:
+        raise ValueError("the polygon is not convex")
+def polygon_centroid(vertices: list) -> Vector2:
+    centroid = Vector2()
+    area = 0
+    for i in range(len(vertices)):
+        a = vertices[i]
+        b = vertices[(i+1)%len(vertices)]
+        cross = a.cross(b)
+        centroid += (a+b)*cross
+        area += cross
+    return centroid/(3*area)
+def create_bodies(shapeTypes, positions, masses, widths, heights, radii, rotations, isStatic) -> list:
+    """
+    makes a box or circle for every row without going through FlatBody.__init__ for each of them,
+    the mass, inertia, sine and cosine and world aabb of every body are computed together with numpy
+    shapeTypes are ShapeType values (1 for circles, 2 for boxes) and every parameter is an array (or list) with a value per body
+    """
+    shapeTypes = np.asarray(shapeTypes, np.uint8)
+    count = len(shapeTypes)
+    if count == 0:
+        return []
+    if np.any((shapeTypes != ShapeType.Circle.value) & (shapeTypes != ShapeType.Box.value)):
+        raise ValueError("only boxes and circles can be made together, use create_polygon for polygons")
+    positions = np.asarray(positions, float).reshape(count, 2)
+    widths = np.asarray(widths, float)
+    heights = np.asarray(heights, float)
+    radii = np.asarray(radii, float)
+    rotations = np.asarray(rotations, float)
+    isStatic = np.asarray(isStatic, bool)
+    isBox = shapeTypes == ShapeType.Box.value
+    #a circle has no width and height and a box no radius, like create_circle and create_box make them
+    widths = np.where(isBox, widths, 0)
+    heights = np.where(isBox, heights, 0)
+    radii = np.where(isBox, 0, radii)
+    masses = np.maximum(np.asarray(masses, float), 1)
+    inertias = masses*np.where(isBox, (widths*widths+heights*heights)/12, 0.5*radii*radii)
+    inverseMasses = np.where(isStatic, 0, 1/masses)
+    inverseInertias = np.where(isStatic, 0, 1/inertias)
+    sines = np.sin(rotations)
+    cosines = np.cos(rotations)
+    halfWidths = np.where(isBox, (np.abs(cosines)*widths+np.abs(sines)*heights)/2, radii)
+    halfHeights = np.where(isBox, (np.abs(sines)*widths+np.abs(cosines)*heights)/2, radii)
+    minima = positions-np.column_stack((halfWidths, halfHeights))
+    maxima = positions+np.column_stack((halfWidths, halfHeights))
+
+    #the bodies of the same shape and size share a prototype, it is only looked up once for every different size
+    shapeKeys = np.column_stack((shapeTypes, widths, heights, radii))
+    uniqueKeys, shapeIndices = np.unique(shapeKeys, axis=0, return_inverse=True)
+    shapes = [get_shapePrototype(ShapeType(int(shapeType)), width, height, radius) for shapeType, width, height, radius in uniqueKeys.tolist()]
+
+    bodies = []
+    for (x, y), mass, inverseMass, inertia, inverseInertia, width, height, radius, static, rotation, sine, cosine, (minX, minY), (maxX, maxY), shapeIndex in zip(
+            positions.tolist(), masses.tolist(), inverseMasses.tolist(), inertias.tolist(), inverseInertias.tolist(), widths.tolist(), heights.tolist(),
+            radii.tolist(), isStatic.tolist(), rotations.tolist(), sines.tolist(), cosines.tolist(), minima.tolist(), maxima.tolist(), shapeIndices.ravel().tolist()):
+        shape = shapes[shapeIndex]
+        position = Vector2(x, y)
+        body = FlatBody.__new__(FlatBody)
+        body.handle = None
+        body.dynamicIndex = -1
+        body.store = None
+        body.storeIndex = -1
+        body._position = position
+        body._velocity = Vector2()
+        body._force = Vector2()
+        body._rotation = rotation
+        body._rotationalVelocity = 0
+        body.IS_STATIC = static
+        body.isAwake = True
+        body.sleepTime = 0
+        body.island = None
+        body.staticIndex = None
+        body.previousPosition = None
+        body.previousRotation = rotation
+        body.MASS = mass
+        body.INVERSE_MASS = inverseMass
+        body.restitution = 0
+        body.categoryBits = DEFAULT_CATEGORY
+        body.maskBits = ALL_CATEGORIES
+        body.groupIndex = 0
+        body.RADIUS = radius
+        body.WIDTH = width
+        body.HEIGHT = height
+        body.shapeType = shape.shapeType
+        body.shape = shape
+        body.interia = inertia
+        body.inverseInteria = inverseInertia
+        body.vertices = shape.vertices
+        body.triangleIndices = shape.triangleIndices
+        body.aabb = shape.aabb
+        body._transformedVertices = [Vector2() for _ in shape.vertices]
+        body._transformedNormals = [normal.copy() for normal in shape.normals]
+        #the normals are rotated the first time they are used
+        body._normalsRotation = None
+        #the aabb is already in place, the vertices are transformed the first time they are used
+        body.transformedAABB = FlatAABB(minX, maxX, minY, maxY, position)
+        body.verticesUpdateNeeded = True
+        body.aabbUpdateNeeded = False
+        body._sine = sine
+        body._cosine = cosine
+        body._trigRotation = rotation
+        if static:
+            body.color = 'brown'
+            body.outLine = 'gray'
+        else:
+            body.color = random.choice(COLOR_OPTIONS)
+            body.outLine = 'white'
+        bodies.append(body)
+    return bodies
 def create_vectices(width: float, height:float) -> list:
     """the order of the vertices will be returned CLOCK WISE!!! THIS IS IMPORTANT!!!"""
     left = -width/2
@@ -157,6 +579,8 @@ def create_vectices(width: float, height:float) -> list:
     return vertices
     
 class FlatAABB:
+    __slots__ = ("minX", "maxX", "minY", "maxY", "position")
+
     def __init__(self, minX:float, maxX:float, minY:float, maxY:float, position:Vector2) -> None:
         self.minX = minX
         self.maxX = maxX
@@ -0,0 +1,215 @@
+import math
+import pygame
+import numpy as np
+import camera
+import stats
+import batchCollision
+from pygame import SurfaceType
+from vector import Vector2
+from flatBody import ShapeType, FlatBody, FlatAABB
+from world import World
+
+class Frontend:
+    """everything that needs pygame: the camera, drawing the world and the keyboard and mouse input"""
+    #PPM = pixel per meter
+    DEFAULT_PPM = 20
+    #how far outside the window (in meters) bodies are still drawn, the tree is a step behind the interpolated poses
+    VIEW_MARGIN = 1
+
+    def __init__(self, world: World, windowSize: Vector2) -> None:
+        self.world = world
+        #what the spawn clicks and the control keys go to, a viewer of server.py sets it to its SimulationClient
+        self.commands = world
+        self.camera = camera.Camera(windowSize)
+        self.zoom = 1
+        self.pixelsPerMeter = self.DEFAULT_PPM
+        self.mousePrevious = (False, False, False)
+        self.statsKeyPrevious = False
+        #the WASD direction of the last frame, apply_control sends it to the commands
+        self.controlDirection = Vector2()
+        #the overlay with the step times and counters, P turns it and the profiling on and off
+        self.showStats = False
+        self.font = None
+        #the static bodies are drawn once onto this layer and it is only redrawn when the camera, zoom or static bodies change
+        self.staticLayer = None
+        self.staticLayerKey = None
+        #how many dynamic bodies were drawn in the last frame
+        self.visibleBodies = 0
+
+    def render(self, display:SurfaceType, alpha: float = 1):
+        """alpha is how far the time is between the previous step and the current one, 1 draws the current state"""
+        viewAABB = self.get_viewAABB(display)
+        self.render_static_layer(display, viewAABB)
+        #only the bodies whose aabb is in the window are drawn, the aabb tree finds them without looking at the others
+        bodies = [body for body in self.world.aabbTree.query_aabb(viewAABB) if not body.IS_STATIC]
+        self.visibleBodies = len(bodies)
+        self.render_bodies(display, bodies, alpha)
+        if self.world.particles != None:
+            self.render_particles(display, viewAABB, alpha)
+        for contactInfo in self.world.collides:
+            for points in contactInfo.contactPoints:
+                #self.render_point(display, points)
+                pass
+        if self.showStats:
+            self.render_stats(display)
+
+    def render_stats(self, display:SurfaceType):
+        """draws the rolling averages of world.stats in the top left corner"""
+        if self.font == None:
+            self.font = pygame.font.Font(None, 18)
+        worldStats = self.world.stats
+        particleCount = self.world.particles.count if self.world.particles != None else 0
+        lines = [f"FPS: {self.world.FPS}  bodies: {len(self.world.flatBodies)}  particles: {particleCount}",
+                 f"step: {worldStats.average('stepTime')*1000:.2f}ms"]
+        lines += [f"{phase}: {worldStats.average(phase)*1000:.2f}ms" for phase in stats.PHASES]
+        lines += [f"{name}: {worldStats.average(name):.0f}" for name in stats.COUNTERS]
+        for i, line in enumerate(lines):
+            display.blit(self.font.render(line, True, 'white'), (5, 5+i*14))
+
+    def get_viewAABB(self, display:SurfaceType) -> FlatAABB:
+        """the part of the world that is in the window"""
+        topLeft = self.screen_to_world(Vector2(0, 0))
+        bottomRight = self.screen_to_world(Vector2(display.get_size()))
+        margin = self.VIEW_MARGIN
+        return FlatAABB(topLeft.x-margin, bottomRight.x+margin, topLeft.y-margin, bottomRight.y+margin, (topLeft+bottomRight)/2)
+
+    def render_static_layer(self, display:SurfaceType, viewAABB: FlatAABB) -> None:
+        staticIndex = self.world.staticIndex
+        #moving, adding or removing a static body only marks the index dirty, rebuilding it changes its version
+        if staticIndex.dirty:
+            staticIndex.rebuild()
+        cameraPosition = self.camera.position
+        key = (staticIndex.version, cameraPosition.x, cameraPosition.y, self.pixelsPerMeter, display.get_size())
+        if key != self.staticLayerKey:
+            if self.staticLayer == None or self.staticLayer.get_size() != display.get_size():
+                self.staticLayer = pygame.Surface(display.get_size(), pygame.SRCALPHA)
+            self.staticLayer.fill((0, 0, 0, 0))
+            for body in self.world.aabbTree.query_aabb(viewAABB):
+                if body.IS_STATIC:
+                    self.render_body(self.staticLayer, body)
+            self.staticLayerKey = key
+        display.blit(self.staticLayer, (0, 0))
+
+    def render_bodies(self, display:SurfaceType, bodies: list, alpha: float = 1) -> None:
+        """draws the bodies, the vertices of every box are moved to the screen together in one numpy pass, polygons are drawn one by one"""
+        pixelPerMeter = self.pixelsPerMeter
+        cameraPosition = self.camera.position
+        boxes = []
+        boxPoses = []
+        for body in bodies:
+            position, rotation = body.get_interpolatedPose(alpha)
+            if body.shapeType == ShapeType.Box:
+                boxes.append(body)
+                boxPoses.append((position.x, position.y, rotation, body.WIDTH, body.HEIGHT))
+                continue
+            if body.shapeType == ShapeType.Polygon:
+                sine = math.sin(rotation)
+                cosine = math.cos(rotation)
+                screenVertices = [((vertex.x*cosine-vertex.y*sine+position.x)*pixelPerMeter+cameraPosition.x,
+                                   (vertex.x*sine+vertex.y*cosine+position.y)*pixelPerMeter+cameraPosition.y) for vertex in body.vertices]
+                pygame.draw.polygon(display, body.color, screenVertices)
+                pygame.draw.polygon(display, body.outLine, screenVertices, width=1)
+                continue
+            pos = position*pixelPerMeter+cameraPosition
+            pygame.draw.circle(display, body.color, pos, body.RADIUS*pixelPerMeter)
+            pygame.draw.circle(display, body.outLine, pos, body.RADIUS*pixelPerMeter, width=1)
+        if not boxes:
+            return
+        poses = np.array(boxPoses)
+        vertices = batchCollision.transform_boxes(poses[:, :2], poses[:, 2], poses[:, 3], poses[:, 4])
+        vertices = vertices*pixelPerMeter+(cameraPosition.x, cameraPosition.y)
+        for body, screenVertices in zip(boxes, vertices.tolist()):
+            pygame.draw.polygon(display, body.color, screenVertices)
+            pygame.draw.polygon(display, body.outLine, screenVertices, width=1)
+
+    def render_particles(self, display:SurfaceType, viewAABB: FlatAABB, alpha: float = 1) -> None:
+        """draws the particles in the window, they are interpolated and moved to the screen all at once"""
+        particles = self.world.particles
+        count = particles.count
+        position = particles.previousPosition[:count]+(particles.position[:count]-particles.previousPosition[:count])*alpha
+        visible = ((position[:, 0] > viewAABB.minX) & (position[:, 0] < viewAABB.maxX) &
+                   (position[:, 1] > viewAABB.minY) & (position[:, 1] < viewAABB.maxY))
+        screenPosition = position[visible]*self.pixelsPerMeter+(self.camera.position.x, self.camera.position.y)
+        #at least a pixel so the particles don't disappear when zoomed out
+        screenRadius = np.maximum(particles.radius[:count][visible]*self.pixelsPerMeter, 1)
+        color = particles.color
+        for center, radius in zip(screenPosition.tolist(), screenRadius.tolist()):
+            pygame.draw.circle(display, color, center, radius)
+
+    def render_body(self, display:SurfaceType, body: FlatBody, alpha: float = 1) -> None:
+        pixelPerMeter = self.pixelsPerMeter
+        cameraPosition = self.camera.position
+        interpolate = alpha < 1 and body.previousPosition != None
+        position, rotation = body.get_interpolatedPose(alpha)
+        if body.shapeType != ShapeType.Circle:
+            if interpolate:
+                worldVertices = [vertex.rotate_rad(rotation)+position for vertex in body.vertices]
+            else:
+                worldVertices = body.get_transformedVertices()
+            newVertices = [worldvertex*pixelPerMeter+cameraPosition for worldvertex in worldVertices]
+            pygame.draw.polygon(display, body.color, newVertices)
+            pygame.draw.polygon(display, body.outLine, newVertices, width=1)
+        else:
+            pos = position*pixelPerMeter+cameraPosition
+            pygame.draw.circle(display, body.color, pos, body.RADIUS*pixelPerMeter)
+            pygame.draw.circle(display, body.outLine, pos, body.RADIUS*pixelPerMeter, width=1)
+
+    def render_point(self, display: SurfaceType, point:Vector2):
+        pygame.draw.circle(display, 'red', point*self.pixelsPerMeter+self.camera.position, 4)
+
+    def player_input(self, frameTime: float):
+        """reads the mouse and keys once a frame, the camera and zoom move by the real frame time, the control direction is only stored"""
+        keys = pygame.key.get_pressed()
+        mouse = pygame.mouse.get_pressed()
+        cameraMove = Vector2()
+
+        if mouse[0] and not self.mousePrevious[0]:
+            self.commands.spawn_box(self.screen_to_world(Vector2(pygame.mouse.get_pos())))
+        if mouse[2] and not self.mousePrevious[2]:
+            self.commands.spawn_circle(self.screen_to_world(Vector2(pygame.mouse.get_pos())))
+        if mouse[1] and not self.mousePrevious[1]:
+            self.commands.spawn_polygon(self.screen_to_world(Vector2(pygame.mouse.get_pos())))
+        if keys[pygame.K_EQUALS]:
+            self.zoom += 0.125*frameTime
+            self.pixelsPerMeter = self.zoom * self.DEFAULT_PPM
+        if keys[pygame.K_MINUS]:
+            self.zoom -= 0.125*frameTime
+            self.pixelsPerMeter = self.zoom * self.DEFAULT_PPM
+        if keys[pygame.K_p] and not self.statsKeyPrevious:
+            self.showStats = not self.showStats
+            self.world.stats.enabled = self.showStats
+        self.statsKeyPrevious = keys[pygame.K_p]
+        if keys[pygame.K_UP]:
+            cameraMove += Vector2(0,1)
+        if keys[pygame.K_DOWN]:
+            cameraMove += Vector2(0,-1)
+        if keys[pygame.K_RIGHT]:
+            cameraMove += Vector2(-1,0)
+        if keys[pygame.K_LEFT]:
+            cameraMove += Vector2(1,0)
+        #10 meters a second
+        self.camera.position += cameraMove*self.pixelsPerMeter*10*frameTime
+        self.controlDirection = self.control_direction(keys)
+        self.mousePrevious = mouse
+
+    def apply_control(self) -> None:
+        """pushes the control body in the direction of the keys, the game calls it before every fixed step (FixedTimestep.beforeStep)"""
+        self.commands.control_body(self.controlDirection)
+
+    def control_direction(self, keys) -> Vector2:
+        dir = Vector2()
+        if keys[pygame.K_w]:
+            dir.y -= 1
+        if keys[pygame.K_a]:
+            dir.x -= 1
+        if keys[pygame.K_s]:
+            dir.y += 1
+        if keys[pygame.K_d]:
+            dir.x += 1
+        return dir
+
+    def world_to_screen(self, world_pos:Vector2):
+        return world_pos*self.pixelsPerMeter+self.camera.position
+
+    def screen_to_world(self, screen_pos:Vector2):
+        return (screen_pos - self.camera.position)/self.pixelsPerMeter
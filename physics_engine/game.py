@@ -1,41 +1,80 @@
+import argparse
 import pygame
 import sys
 import time
 
+from vector import Vector2
 from world import World
+from frontend import Frontend
+from timestep import FixedTimestep
+from recording import Recorder
+import scene
+import particles
 
 class Game:
-    def __init__(self) -> None:
+    def __init__(self, recordPath: str = None, continuousCollision = False, scenePath: str = None, particleCount: int = 0) -> None:
         pygame.init()
         pygame.display.set_caption('physic engine')
         self.windowSize = (649, 480)
+        #the physics always steps tickPerSecond times a second, rendering can run faster or slower than that
         self.tickPerSecond = 60
-        self.subSteps = 10
-        self.MAX_SUB_STEP = 10
+        #warm starting together with the clipped box contacts lets columns of boxes settle with 2 substeps
+        self.subSteps = 2
+        self.renderPerSecond = 120
+        self.MAX_STEPS_PER_FRAME = 5
         self.screen = pygame.display.set_mode(self.windowSize)
 
         self.clock = pygame.time.Clock()
 
-        self.world = World(pygame.Vector2(self.windowSize))
+        if scenePath != None:
+            self.world = scene.load_scene(scenePath)
+        else:
+            self.world = World(Vector2(self.windowSize)/Frontend.DEFAULT_PPM)
+        #stops fast bodies at the walls instead of needing more substeps for them
+        self.world.continuousCollision = continuousCollision
+        if particleCount > 0:
+            #a block of sand poured onto the middle of the ground
+            bound = self.world.bound
+            radius = 0.1
+            columns = min(particleCount, int((bound.x-12)/(radius*2.5)))
+            self.world.add_particles(particles.grid_positions(Vector2(6+radius, 1), columns, particleCount, radius*2.5), radius)
+        self.frontend = Frontend(self.world, Vector2(self.windowSize))
+        self.timestep = FixedTimestep(self.world, self.tickPerSecond, self.subSteps, self.MAX_STEPS_PER_FRAME)
+        #the control force is applied once per step, not once per frame, so it doesn't depend on the render rate
+        self.timestep.beforeStep = self.frontend.apply_control
+        #every step is recorded so it can be played back with replay.py, bodies spawned later are not in the recording
+        self.recorder = None
+        if recordPath != None:
+            self.recorder = Recorder(recordPath, self.world, self.tickPerSecond)
+            self.timestep.onStep = self.recorder.record
 
     def run(self):
+        previouseTime = time.perf_counter()
         while True:
-            self.screen.fill((0,0,0))
+            currentTime = time.perf_counter()
+            frameTime = currentTime-previouseTime
+            previouseTime = currentTime
+
+            self.frontend.player_input(frameTime)
+            self.timestep.advance(frameTime)
 
-            self.world.render(self.screen)
-            previouseTime = time.time()
-            self.world.step(self.tickPerSecond, self.subSteps)
-            deltaTime = max(0.0001,(time.time()-previouseTime))
-            self.subSteps = self.subSteps/(deltaTime*self.tickPerSecond)
-            self.subSteps = int(min(max(1, self.subSteps), self.MAX_SUB_STEP))
-            self.world.player_input(self.tickPerSecond)
+            self.screen.fill((0,0,0))
+            self.frontend.render(self.screen, self.timestep.alpha)
 
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
+                    if self.recorder != None:
+                        self.recorder.close()
                     pygame.quit()
                     sys.exit()
             pygame.display.update()
-            self.clock.tick(self.tickPerSecond)
-            
+            self.clock.tick(self.renderPerSecond)
+
 if __name__ == "__main__":
-    Game().run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="the physics engine in a window")
+    parser.add_argument("--record", help="record every step to this file, play it back with replay.py")
+    parser.add_argument("--ccd", action="store_true", help="turn on continuous collision detection")
+    parser.add_argument("--scene", help="start with the bodies of this .json or binary scene file instead of the default scene")
+    parser.add_argument("--particles", type=int, default=0, help="drop this many sand particles into the world")
+    args = parser.parse_args()
+    Game(args.record, args.ccd, args.scene, args.particles).run()
@@ -0,0 +1,57 @@
+def _find(parent: dict, body):
+    #path halving so the trees stay flat
+    while parent[body] is not body:
+        parent[body] = parent[parent[body]]
+        body = parent[body]
+    return body
+
+def build_islands(flatBodies: list, collides: list) -> list:
+    """
+    groups the dynamic bodies that are touching each other (directly or through other dynamic bodies) with union find
+    static bodies never join islands together, so two piles on the same ground are two islands
+    returns a list of islands where every island is a list of bodies in the same order as flatBodies
+    """
+    parent = {}
+    for body in flatBodies:
+        if not body.IS_STATIC:
+            parent[body] = body
+    for collideInfo in collides:
+        bodyA = collideInfo.bodyA
+        bodyB = collideInfo.bodyB
+        if bodyA not in parent or bodyB not in parent:
+            continue
+        rootA = _find(parent, bodyA)
+        rootB = _find(parent, bodyB)
+        if rootA is not rootB:
+            parent[rootB] = rootA
+
+    islands = {}
+    for body in parent:
+        islands.setdefault(_find(parent, body), []).append(body)
+    return list(islands.values())
+
+def group_by_island(collides: list) -> list:
+    """
+    groups collides (or anything else with bodyA and bodyB) by the island of their dynamic bodies
+    a collide with a static body goes with the island of its other body, the collides keep their order in every group
+    """
+    parent = {}
+    for collideInfo in collides:
+        for body in (collideInfo.bodyA, collideInfo.bodyB):
+            if not body.IS_STATIC and body not in parent:
+                parent[body] = body
+    for collideInfo in collides:
+        bodyA = collideInfo.bodyA
+        bodyB = collideInfo.bodyB
+        if bodyA.IS_STATIC or bodyB.IS_STATIC:
+            continue
+        rootA = _find(parent, bodyA)
+        rootB = _find(parent, bodyB)
+        if rootA is not rootB:
+            parent[rootB] = rootA
+
+    groups = {}
+    for collideInfo in collides:
+        body = collideInfo.bodyA if not collideInfo.bodyA.IS_STATIC else collideInfo.bodyB
+        groups.setdefault(_find(parent, body), []).append(collideInfo)
+    return list(groups.values())
@@ -0,0 +1,417 @@
+"""
+circle particles for granular flows with tens of thousands of grains (World.add_particles)
+
+the particles are not FlatBodies, their state is kept in numpy arrays and every substep is a handful of vectorized passes:
+the particles are sorted by the cell of a uniform grid they are in, so the particles of a cell are next to each other
+and the particles that can touch are found with searchsorted, then they are moved and pushed out of each other and out of
+the static boxes, circles and polygons of the world with corrections that are summed per particle with bincount,
+a static body only tests the particles in the cells its AABB covers, found with searchsorted in the same sorted cell keys,
+their new velocity is how far they moved (position based like the particles of a cloth or sand simulation)
+the particles don't collide with the dynamic bodies
+"""
+import numpy as np
+import flatBody
+from broadphase import should_collide
+from flatBody import ShapeType
+
+#the arrays with a row for every particle, (name, columns)
+ARRAYS = (("position", 2), ("velocity", 2), ("previousPosition", 2), ("startPosition", 2), ("radius", 1), ("inverseMass", 1))
+
+class ParticleSystem:
+    """
+    the position, velocity, radius and inverse mass of every particle in arrays with room for capacity particles,
+    the arrays are doubled when they are full and removing particles moves the ones after them down
+    the particles have no identity, the arrays are sorted by cell every substep so the particles that touch are close together in memory
+    """
+    #how much of the sliding of a contact friction can take back, times how deep the contact is
+    FRICTION = 0.3
+    #the contacts of a substep are solved this many times, every pass only moves a particle by the average of its contacts
+    ITERATIONS = 4
+    LINEAR_SLOP = 0.005
+    #a particle hitting a pile can be pushed deeper than a few passes can undo, the rest of the overlap is pushed out at most this fast
+    MAX_DEPENETRATION_SPEED = 2
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self.count = 0
+        self.capacity = 0
+        self.position = np.zeros((0, 2))
+        self.velocity = np.zeros((0, 2))
+        #where the particles were at the start of the last step so the frontend can interpolate them
+        self.previousPosition = np.zeros((0, 2))
+        #where the particles were at the start of the substep, their velocity is how far they got from it
+        self.startPosition = np.zeros((0, 2))
+        self.radius = np.zeros(0)
+        self.inverseMass = np.zeros(0)
+        self.color = 'yellow'
+        #the collision filter of every particle against the static bodies (see broadphase.should_collide)
+        self.categoryBits = flatBody.DEFAULT_CATEGORY
+        self.maskBits = flatBody.ALL_CATEGORIES
+        self.groupIndex = 0
+        #the static shapes as arrays, made again when the static index changes
+        self.staticVersion = None
+        self.staticBoxes = None
+        self.staticCircles = None
+        self.staticPolygons = None
+        #(minX, maxX, minY, maxY) of every static shape in the order boxes, circles, polygons
+        self.staticBounds = None
+        #the grid find_pairs sorted the particles by, the static bodies look up the particles near them in it
+        self.cellSize = 1
+        self.cellOrigin = np.zeros(2, np.int64)
+        self.rowLength = 1
+        self.rowCount = 1
+        self.sortedKeys = np.zeros(0, np.int64)
+        #how many particle pairs and particle-static pairs touched in the substeps of the last step
+        self.contactCount = 0
+        self._grow(max(capacity, 1))
+
+    def _grow(self, capacity: int) -> None:
+        count = self.count
+        for name, columns in ARRAYS:
+            array = np.zeros((capacity, columns) if columns > 1 else capacity)
+            array[:count] = getattr(self, name)[:count]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def add(self, positions, radii, masses = None, velocities = None) -> None:
+        """adds a particle for every position, radii and masses can be one value for all of them"""
+        positions = np.asarray(positions, float).reshape(-1, 2)
+        added = len(positions)
+        if self.count+added > self.capacity:
+            self._grow(max(self.count+added, self.capacity*2))
+        radii = np.broadcast_to(np.asarray(radii, float), added)
+        #the mass of a particle is the area of its circle when it isn't given like create_circle bodies in the game
+        masses = np.pi*radii**2 if masses is None else np.broadcast_to(np.asarray(masses, float), added)
+        if np.any(radii <= 0) or np.any(masses <= 0):
+            raise ValueError("the radius and mass of a particle have to be positive")
+        indices = np.arange(self.count, self.count+added)
+        self.position[indices] = positions
+        self.previousPosition[indices] = positions
+        self.velocity[indices] = 0 if velocities is None else np.asarray(velocities, float).reshape(-1, 2)
+        self.radius[indices] = radii
+        self.inverseMass[indices] = 1/masses
+        self.count += added
+
+    def remove(self, keep: np.ndarray) -> None:
+        """keeps only the particles where the (count,) bool array keep is True"""
+        kept = int(np.count_nonzero(keep))
+        if kept == self.count:
+            return
+        for name, _ in ARRAYS:
+            array = getattr(self, name)
+            array[:kept] = array[:self.count][keep]
+        self.count = kept
+
+    def clear(self) -> None:
+        self.count = 0
+
+    def step(self, tickPerSec: int, subSteps: int, gravity, staticIndex, bound) -> None:
+        """moves the particles by a step of 1/tickPerSec seconds and removes the ones that fell below the world"""
+        count = self.count
+        self.contactCount = 0
+        if count == 0:
+            return
+        self.previousPosition[:count] = self.position[:count]
+        self.update_statics(staticIndex)
+        deltaTime = 1/(tickPerSec*subSteps)
+        gravity = np.array((gravity.x, gravity.y))
+        position = self.position[:count]
+        velocity = self.velocity[:count]
+        startPosition = self.startPosition[:count]
+        for _ in range(subSteps):
+            #the particles are moved first and then pushed out of each other, their velocity is how far they went in the end
+            startPosition[:] = position
+            velocity += gravity*deltaTime
+            position += velocity*deltaTime
+            indexA, indexB = self.find_pairs()
+            #the contacts can't make a particle faster than it was going, but overlaps left from the last substep can push it up to MAX_DEPENETRATION_SPEED
+            speedLimit = np.maximum(np.sqrt(np.einsum('ij,ij->i', velocity, velocity)), self.MAX_DEPENETRATION_SPEED)
+            self.solve(indexA, indexB)
+            velocity[:] = (position-startPosition)/deltaTime
+            speed = np.sqrt(np.einsum('ij,ij->i', velocity, velocity))
+            tooFast = speed > speedLimit
+            velocity[tooFast] *= (speedLimit[tooFast]/speed[tooFast])[:, None]
+        #like World.void_bodyPos
+        self.remove(self.position[:count, 1] <= bound.y)
+
+    def find_pairs(self) -> tuple:
+        """sorts the particles by cell and returns (indexA, indexB) arrays of the pairs of particles whose circles overlap"""
+        count = self.count
+        position = self.position[:count]
+        radius = self.radius[:count]
+        #a cell is as big as the biggest particle so touching particles are always in neighboring cells
+        cellSize = 2*radius.max()
+        cells = np.floor(position/cellSize).astype(np.int64)
+        cellOrigin = cells.min(axis=0)
+        cells -= cellOrigin
+        #one empty column on the right so the cell after the last one of a row is never the first one of the next row
+        rowLength = int(cells[:, 0].max())+2
+        keys = cells[:, 0]+cells[:, 1]*rowLength
+        order = np.argsort(keys, kind='stable')
+        sortedKeys = keys[order]
+        self.cellSize = cellSize
+        self.cellOrigin = cellOrigin
+        self.rowLength = rowLength
+        self.rowCount = int(cells[:, 1].max())+1
+        self.sortedKeys = sortedKeys
+        #the particles barely move between substeps so most of the time only a few of them change places
+        for name, _ in ARRAYS:
+            array = getattr(self, name)
+            array[:count] = array[:count][order]
+        #a particle is tested against the particles after it in its own cell, the next cell of its row and the three cells below it
+        #so every pair is found once, the next cell comes right after its own and the three cells below are next to each other in the keys
+        #so they are two ranges of the arrays
+        sortedIndex = np.arange(count)
+        starts = np.concatenate((sortedIndex+1, np.searchsorted(sortedKeys, sortedKeys+(rowLength-1), 'left')))
+        ends = np.concatenate((np.searchsorted(sortedKeys, sortedKeys+1, 'right'), np.searchsorted(sortedKeys, sortedKeys+(rowLength+1), 'right')))
+        indexA, indexB = expand_ranges(np.tile(sortedIndex, 2), starts, ends-starts)
+        delta = position[indexB]-position[indexA]
+        reach = radius[indexA]+radius[indexB]
+        touching = np.einsum('ij,ij->i', delta, delta) < reach*reach
+        return indexA[touching], indexB[touching]
+
+    def update_statics(self, staticIndex) -> None:
+        """
+        the boxes (center, axes, half size), circles (center, radius) and polygons (bounds, world vertices and normals)
+        of the static bodies the particles collide with
+        """
+        if staticIndex.dirty:
+            staticIndex.rebuild()
+        if self.staticVersion == staticIndex.version:
+            return
+        boxes = []
+        circles = []
+        polygons = []
+        polygonBounds = []
+        for body in staticIndex.staticBodies:
+            if not should_collide(self, body):
+                continue
+            position = body.position
+            if body.shapeType == ShapeType.Box:
+                boxes.append((position.x, position.y, np.cos(body.rotation), np.sin(body.rotation), body.WIDTH/2, body.HEIGHT/2))
+            elif body.shapeType == ShapeType.Circle:
+                circles.append((position.x, position.y, body.RADIUS))
+            else:
+                aabb = body.get_transformedAABB()
+                vertices = np.array([(vertex.x, vertex.y) for vertex in body.get_transformedVertices()])
+                normals = np.array([(normal.x, normal.y) for normal in body.get_transformedNormals()])
+                polygons.append((vertices, normals))
+                polygonBounds.append((aabb.minX, aabb.maxX, aabb.minY, aabb.maxY))
+        self.staticBoxes = np.array(boxes).reshape(-1, 6)
+        self.staticCircles = np.array(circles).reshape(-1, 3)
+        self.staticPolygons = polygons
+        boxes = self.staticBoxes
+        circles = self.staticCircles
+        #the extents of the rotated boxes
+        boxExtentX = np.abs(boxes[:, 2])*boxes[:, 4]+np.abs(boxes[:, 3])*boxes[:, 5]
+        boxExtentY = np.abs(boxes[:, 3])*boxes[:, 4]+np.abs(boxes[:, 2])*boxes[:, 5]
+        self.staticBounds = np.concatenate((
+            np.column_stack((boxes[:, 0]-boxExtentX, boxes[:, 0]+boxExtentX, boxes[:, 1]-boxExtentY, boxes[:, 1]+boxExtentY)),
+            np.column_stack((circles[:, 0]-circles[:, 2], circles[:, 0]+circles[:, 2], circles[:, 1]-circles[:, 2], circles[:, 1]+circles[:, 2])),
+            np.array(polygonBounds).reshape(-1, 4)))
+        self.staticVersion = staticIndex.version
+
+    def find_near_particles(self) -> list:
+        """
+        for every static shape (staticBounds) the sorted indices of the particles in the cells its AABB covers,
+        the cells of a row are next to each other in the keys find_pairs sorted the particles by so every row is one searchsorted range
+        """
+        bounds = self.staticBounds
+        if len(bounds) == 0:
+            return []
+        cellSize = self.cellSize
+        rowLength = self.rowLength
+        sortedKeys = self.sortedKeys
+        #a cell more on every side for the radius of the particles and how far the passes move them in the substep
+        minCell = np.floor((bounds[:, (0, 2)]-cellSize)/cellSize).astype(np.int64)-self.cellOrigin
+        maxCell = np.floor((bounds[:, (1, 3)]+cellSize)/cellSize).astype(np.int64)-self.cellOrigin
+        np.maximum(minCell, 0, out=minCell)
+        np.minimum(maxCell, (rowLength-2, self.rowCount-1), out=maxCell)
+        near = []
+        empty = np.zeros(0, np.int64)
+        for minCellX, minCellY, maxCellX, maxCellY in np.column_stack((minCell, maxCell)).tolist():
+            if minCellX > maxCellX or minCellY > maxCellY:
+                near.append(empty)
+                continue
+            rows = np.arange(minCellY, maxCellY+1)*rowLength
+            starts = np.searchsorted(sortedKeys, rows+minCellX, 'left')
+            ends = np.searchsorted(sortedKeys, rows+maxCellX, 'right')
+            near.append(expand_ranges(starts, starts, ends-starts)[1])
+        return near
+
+    def find_static_contacts(self, near: list) -> tuple:
+        """
+        (particle index, normal, depth) arrays of the particles that overlap a static body, the normals point out of the static body
+        near are the particles every static shape is tested against (find_near_particles)
+        """
+        count = self.count
+        position = self.position[:count]
+        radius = self.radius[:count]
+        indices = []
+        normals = []
+        depths = []
+        boxCount = len(self.staticBoxes)
+        circleCount = len(self.staticCircles)
+        for (centerX, centerY, cosine, sine, halfWidth, halfHeight), candidates in zip(self.staticBoxes.tolist(), near):
+            if len(candidates) == 0:
+                continue
+            #the particles are moved into the frame of the box
+            relativeX = position[candidates, 0]-centerX
+            relativeY = position[candidates, 1]-centerY
+            localX = relativeX*cosine+relativeY*sine
+            localY = relativeY*cosine-relativeX*sine
+            particleRadius = radius[candidates]
+            inRange = (np.abs(localX) < halfWidth+particleRadius) & (np.abs(localY) < halfHeight+particleRadius)
+            if not inRange.any():
+                continue
+            index = candidates[inRange]
+            localX = localX[inRange]
+            localY = localY[inRange]
+            particleRadius = particleRadius[inRange]
+            #outside the box the normal goes from the closest point of the box to the center of the particle
+            offsetX = localX-np.clip(localX, -halfWidth, halfWidth)
+            offsetY = localY-np.clip(localY, -halfHeight, halfHeight)
+            distance = np.hypot(offsetX, offsetY)
+            inside = distance == 0
+            #inside the box it goes out through the closest side
+            depthX = halfWidth-np.abs(localX)
+            depthY = halfHeight-np.abs(localY)
+            throughX = inside & (depthX < depthY)
+            throughY = inside & ~throughX
+            safeDistance = np.where(inside, 1, distance)
+            normalX = np.where(throughX, np.sign(localX)+(localX == 0), offsetX/safeDistance)
+            normalY = np.where(throughY, np.sign(localY)+(localY == 0), np.where(inside, 0, offsetY/safeDistance))
+            depth = np.where(inside, particleRadius+np.minimum(depthX, depthY), particleRadius-distance)
+            touching = depth > 0
+            indices.append(index[touching])
+            #back into the world frame
+            normals.append(np.column_stack((normalX*cosine-normalY*sine, normalX*sine+normalY*cosine))[touching])
+            depths.append(depth[touching])
+        for (centerX, centerY, staticRadius), candidates in zip(self.staticCircles.tolist(), near[boxCount:]):
+            if len(candidates) == 0:
+                continue
+            delta = position[candidates]-(centerX, centerY)
+            distanceSquared = np.einsum('ij,ij->i', delta, delta)
+            inRange = np.flatnonzero(distanceSquared < (radius[candidates]+staticRadius)**2)
+            if len(inRange) == 0:
+                continue
+            index = candidates[inRange]
+            distance = np.sqrt(distanceSquared[inRange])
+            safeDistance = np.where(distance == 0, 1, distance)
+            normal = delta[inRange]/safeDistance[:, None]
+            normal[distance == 0] = (0, -1)
+            indices.append(index)
+            normals.append(normal)
+            depths.append(radius[index]+staticRadius-distance)
+        for (vertices, faceNormals), candidates in zip(self.staticPolygons, near[boxCount+circleCount:]):
+            if len(candidates) == 0:
+                continue
+            point = position[candidates]
+            particleRadius = radius[candidates]
+            #how far every particle is in front of the line of every face, faceNormals[i] belongs to the face from vertex i to vertex i+1
+            faceDistance = point@faceNormals.T-np.einsum('ij,ij->i', faceNormals, vertices)
+            separation = faceDistance.max(axis=1)
+            inRange = separation < particleRadius
+            if not inRange.any():
+                continue
+            index = candidates[inRange]
+            point = point[inRange]
+            particleRadius = particleRadius[inRange]
+            faceDistance = faceDistance[inRange]
+            separation = separation[inRange]
+            inside = separation <= 0
+            #outside the polygon the normal goes from the closest point of its faces to the center of the particle
+            edges = np.roll(vertices, -1, axis=0)-vertices
+            toPoint = point[:, None, :]-vertices
+            along = np.clip(np.einsum('ikj,kj->ik', toPoint, edges)/np.einsum('ij,ij->i', edges, edges), 0, 1)
+            offset = toPoint-along[:, :, None]*edges
+            distanceSquared = np.einsum('ikj,ikj->ik', offset, offset)
+            rows = np.arange(len(index))
+            closest = distanceSquared.argmin(axis=1)
+            offset = offset[rows, closest]
+            distance = np.sqrt(distanceSquared[rows, closest])
+            #inside it goes out through the face it is closest to, like the boxes
+            safeDistance = np.where(inside, 1, distance)
+            normal = np.where(inside[:, None], faceNormals[faceDistance.argmax(axis=1)], offset/safeDistance[:, None])
+            depth = np.where(inside, particleRadius-separation, particleRadius-distance)
+            touching = depth > 0
+            indices.append(index[touching])
+            normals.append(normal[touching])
+            depths.append(depth[touching])
+        if not indices:
+            return np.zeros(0, np.int64), np.zeros((0, 2)), np.zeros(0)
+        return np.concatenate(indices), np.concatenate(normals), np.concatenate(depths)
+
+    def solve(self, indexA: np.ndarray, indexB: np.ndarray) -> None:
+        """
+        pushes the overlapping particles apart and out of the static bodies, every pass the corrections of all contacts are computed
+        from the same positions and averaged over the contacts of every particle, friction takes back the sliding of the substep
+        """
+        count = self.count
+        position = self.position[:count]
+        startPosition = self.startPosition[:count]
+        inverseMass = self.inverseMass[:count]
+        radius = self.radius[:count]
+        inverseMassSum = inverseMass[indexA]+inverseMass[indexB]
+        #how much of a correction each particle of a pair takes
+        shareA = (inverseMass[indexA]/inverseMassSum)[:, None]
+        shareB = (inverseMass[indexB]/inverseMassSum)[:, None]
+        reach = radius[indexA]+radius[indexB]
+        slop = self.LINEAR_SLOP
+        friction = self.FRICTION
+        #the particles near every static body are looked up once, the passes only move them a little
+        near = self.find_near_particles()
+        for iteration in range(self.ITERATIONS):
+            #the static contacts are found again every pass since the other contacts push the particles into the static bodies
+            staticIndex, staticNormal, staticDepth = self.find_static_contacts(near)
+            if iteration == 0:
+                self.contactCount += len(indexA)+len(staticIndex)
+            if len(indexA) == 0 and len(staticIndex) == 0:
+                return
+            #the normal goes from A to B like the collide vector of a CollideInfo
+            delta = position[indexB]-position[indexA]
+            distance = np.sqrt(np.einsum('ij,ij->i', delta, delta))
+            normal = delta/np.where(distance == 0, 1, distance)[:, None]
+            normal[distance == 0] = (0, 1)
+            #a little overlap is left so the particles keep touching
+            depth = np.maximum(reach-distance-slop, 0)
+            #coulomb friction, how far B slid along A in this substep is taken back up to friction times the depth
+            motion = (position[indexB]-startPosition[indexB])-(position[indexA]-startPosition[indexA])
+            sliding = motion-np.einsum('ij,ij->i', motion, normal)[:, None]*normal
+            slidingDistance = np.sqrt(np.einsum('ij,ij->i', sliding, sliding))
+            slip = np.minimum(slidingDistance, friction*depth)/np.where(slidingDistance == 0, 1, slidingDistance)
+            #how far B has to move away from A
+            correction = normal*depth[:, None]-sliding*slip[:, None]
+            change = self._sum_per_particle(indexB, correction*shareB)-self._sum_per_particle(indexA, correction*shareA)
+            touching = depth > 0
+            contacts = np.bincount(indexA[touching], minlength=count)+np.bincount(indexB[touching], minlength=count)
+            if len(staticIndex):
+                #static bodies don't move so the particle takes the whole correction
+                staticDepth = np.maximum(staticDepth-slop, 0)
+                staticMotion = position[staticIndex]-startPosition[staticIndex]
+                staticSliding = staticMotion-np.einsum('ij,ij->i', staticMotion, staticNormal)[:, None]*staticNormal
+                staticSlidingDistance = np.sqrt(np.einsum('ij,ij->i', staticSliding, staticSliding))
+                staticSlip = np.minimum(staticSlidingDistance, friction*staticDepth)/np.where(staticSlidingDistance == 0, 1, staticSlidingDistance)
+                change += self._sum_per_particle(staticIndex, staticNormal*staticDepth[:, None]-staticSliding*staticSlip[:, None])
+                contacts += np.bincount(staticIndex[staticDepth > 0], minlength=count)
+            #every contact was solved as if it was the only one so the sum is averaged, pushing a particle out of all of them would overshoot
+            position += change/np.maximum(contacts, 1)[:, None]
+
+    def _sum_per_particle(self, indices: np.ndarray, values: np.ndarray) -> np.ndarray:
+        #bincount is a lot faster than np.add.at for summing the (n, 2) values of the contacts into every particle
+        count = self.count
+        #without any contacts bincount gives integers
+        return np.column_stack((np.bincount(indices, values[:, 0], count), np.bincount(indices, values[:, 1], count))).astype(float, copy=False)
+
+def expand_ranges(first: np.ndarray, starts: np.ndarray, lengths: np.ndarray) -> tuple:
+    """for every i the pairs (first[i], starts[i]), (first[i], starts[i]+1)... with lengths[i] pairs, as two arrays"""
+    lengths = np.maximum(lengths, 0)
+    total = int(lengths.sum())
+    repeatedFirst = np.repeat(first, lengths)
+    #the position of every pair inside its range
+    offsets = np.arange(total)-np.repeat(np.cumsum(lengths)-lengths, lengths)
+    return repeatedFirst, np.repeat(starts, lengths)+offsets
+
+def grid_positions(origin, columns: int, count: int, spacing: float) -> np.ndarray:
+    """the positions of count particles in rows of columns particles spacing apart, going right and down from origin"""
+    index = np.arange(count)
+    return np.column_stack((origin.x+index%columns*spacing, origin.y+index//columns*spacing))
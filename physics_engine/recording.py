@@ -0,0 +1,204 @@
+"""
+records the bodies of a world into a binary file and reads it back without loading the whole file
+
+the file is a header, a table with the shape of every body, the local vertices of the polygons and then one fixed size record per step:
+the step number, how many colliding pairs and contact points there were and x, y, rotation, velocity x, velocity y and rotational velocity of every body
+only the bodies in the world when the recording started are recorded, the pose of a body that was removed is NaN
+"""
+import math
+import struct
+import numpy as np
+import flatBody
+from vector import Vector2
+from flatBody import ShapeType, FlatBody
+from world import World
+
+MAGIC = b"PHYSREC\0"
+VERSION = 2
+#magic, version, body count, tick per second, precision ("f4" or "f8"), bound x, bound y
+HEADER = struct.Struct("<8sIII2sdd")
+#version 1 had no polygons so its table has no vertex count and there is no vertex block
+BODY_DTYPE_V1 = np.dtype([("shape", "u1"), ("static", "u1"), ("width", "<f8"), ("height", "<f8"), ("radius", "<f8"), ("mass", "<f8"),
+                          ("color", "S16"), ("outLine", "S16")])
+#vertexCount is how many vertices of the vertex block after the table belong to the body, only polygons have any
+BODY_DTYPE = np.dtype(BODY_DTYPE_V1.descr+[("vertexCount", "<u4")])
+VERTEX_DTYPE = np.dtype("<f8")
+#the columns of the state of a body in a record
+X, Y, ROTATION, VELOCITY_X, VELOCITY_Y, ROTATIONAL_VELOCITY = range(6)
+REMOVED = (math.nan,)*6
+
+def frame_dtype(bodyCount: int, precision: str) -> np.dtype:
+    return np.dtype([("step", "<u4"), ("collides", "<u4"), ("contacts", "<u4"), ("state", "<"+precision, (bodyCount, 6))])
+
+def get_bodyTable(bodies: list) -> tuple:
+    """(table, vertices) with the shape and colors of the bodies, a BODY_DTYPE row for every body and the local vertices of the polygons"""
+    table = np.zeros(len(bodies), BODY_DTYPE)
+    polygonVertices = []
+    for i, body in enumerate(bodies):
+        vertices = body.vertices if body.shapeType == ShapeType.Polygon else ()
+        table[i] = (body.shapeType.value, body.IS_STATIC, body.WIDTH, body.HEIGHT, body.RADIUS, body.MASS,
+                    str(body.color).encode()[:16], str(body.outLine).encode()[:16], len(vertices))
+        for vertex in vertices:
+            polygonVertices += (vertex.x, vertex.y)
+    return table, np.array(polygonVertices, VERTEX_DTYPE)
+
+def create_tableBodies(table, vertices) -> list:
+    """a FlatBody at the origin for every row of a table made by get_bodyTable, vertices is the array of x, y rows of the polygons"""
+    bodies = []
+    vertexIndex = 0
+    for row in table:
+        shapeType = ShapeType(row["shape"])
+        if shapeType == ShapeType.Circle:
+            body = flatBody.create_circle(Vector2(), float(row["mass"]), float(row["radius"]), bool(row["static"]))
+        elif shapeType == ShapeType.Polygon:
+            vertexCount = int(row["vertexCount"])
+            polygonVertices = [Vector2(float(x), float(y)) for x, y in vertices[vertexIndex:vertexIndex+vertexCount]]
+            vertexIndex += vertexCount
+            #the vertices are already centered so the body ends up at the origin like the others
+            body = flatBody.create_polygon(Vector2(), float(row["mass"]), polygonVertices, bool(row["static"]))
+        else:
+            body = flatBody.create_box(Vector2(), float(row["mass"]), float(row["width"]), float(row["height"]), bool(row["static"]))
+        body.color = row["color"].decode()
+        body.outLine = row["outLine"].decode()
+        bodies.append(body)
+    return bodies
+
+class Recorder:
+    """
+    appends a record of the world every time record is called, the file can be read while it is still being written
+    precision "f4" makes the records half the size of "f8" but the poses are only kept to about 7 digits
+    """
+    def __init__(self, path: str, world: World, tickPerSecond: int = 60, precision: str = "f4") -> None:
+        if precision not in ("f4", "f8"):
+            raise ValueError("precision has to be f4 or f8")
+        self.world = world
+        self.bodies = list(world.flatBodies)
+        self.dtype = frame_dtype(len(self.bodies), precision)
+        self.stepCount = 0
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, len(self.bodies), tickPerSecond, precision.encode(), world.bound.x, world.bound.y))
+        table, vertices = get_bodyTable(self.bodies)
+        self.file.write(table.tobytes())
+        self.file.write(vertices.tobytes())
+        #the buffer every record is written from
+        self.frame = np.zeros(1, self.dtype)
+
+    def record(self) -> None:
+        world = self.world
+        frame = self.frame[0]
+        frame["step"] = self.stepCount
+        frame["collides"] = world.stats.counts["narrowphaseHits"]
+        frame["contacts"] = world.stats.counts["contacts"]
+        #every body in the world has a proxy in the aabb tree, removed bodies don't
+        present = world.treeProxies
+        rows = []
+        for body in self.bodies:
+            if body not in present:
+                rows.append(REMOVED)
+                continue
+            position = body.position
+            velocity = body.velocity
+            rows.append((position.x, position.y, body.rotation, velocity.x, velocity.y, body.rotationalVelocity))
+        frame["state"] = rows
+        self.file.write(self.frame.tobytes())
+        self.stepCount += 1
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.close()
+
+class Recording:
+    """
+    a recording written by Recorder, the records are memory mapped so any frame can be read without reading the ones before it
+    frames[i]["state"] is an array of [x, y, rotation, velocity x, velocity y, rotational velocity] of every body
+    """
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as file:
+            header = file.read(HEADER.size)
+            if len(header) < HEADER.size:
+                raise ValueError(f"{path} is not a recording")
+            magic, version, bodyCount, tickPerSecond, precision, boundX, boundY = HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a recording")
+            if version not in (1, VERSION):
+                raise ValueError(f"{path} is version {version} and only version 1 to {VERSION} can be read")
+            bodyDtype = BODY_DTYPE if version == VERSION else BODY_DTYPE_V1
+            self.bodyTable = np.frombuffer(file.read(bodyDtype.itemsize*bodyCount), bodyDtype)
+            vertexCount = int(self.bodyTable["vertexCount"].sum()) if version == VERSION else 0
+            #x, y of the local vertices of every polygon one after the other
+            self.vertices = np.frombuffer(file.read(VERTEX_DTYPE.itemsize*2*vertexCount), VERTEX_DTYPE).reshape(-1, 2)
+        self.tickPerSecond = tickPerSecond
+        self.bound = Vector2(boundX, boundY)
+        self.dtype = frame_dtype(bodyCount, precision.decode())
+        offset = HEADER.size+self.bodyTable.nbytes+self.vertices.nbytes
+        with open(path, "rb") as file:
+            size = file.seek(0, 2)
+        #a record that is only partly written (the recorder is still running) is left out
+        frameCount = (size-offset)//self.dtype.itemsize
+        if frameCount > 0:
+            self.frames = np.memmap(path, self.dtype, mode="r", offset=offset, shape=(frameCount,))
+        else:
+            self.frames = np.zeros(0, self.dtype)
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def create_bodies(self) -> list:
+        """a FlatBody for every recorded body with the shape and colors it had"""
+        return create_tableBodies(self.bodyTable, self.vertices)
+
+class Replay:
+    """
+    puts the bodies of a recording into a world that is never stepped, so it can be drawn with Frontend.render
+    show_frame moves the bodies to a frame and keeps the frame before it as the previous pose for interpolation
+    """
+    def __init__(self, recording: Recording) -> None:
+        self.recording = recording
+        self.world = World(recording.bound.copy(), createScene=False)
+        self.bodies = recording.create_bodies()
+        self.frameIndex = -1
+
+    def show_frame(self, index: int) -> None:
+        frames = self.recording.frames
+        state = frames[index]["state"]
+        previous = frames[index-1]["state"] if index > 0 else state
+        world = self.world
+        for i, body in enumerate(self.bodies):
+            x, y, rotation, velocityX, velocityY, rotationalVelocity = (float(value) for value in state[i])
+            present = body in world.treeProxies
+            if x != x:
+                #NaN, the body was removed
+                if present:
+                    world.remove_body(body)
+                continue
+            set_state(body, Vector2(x, y), rotation, Vector2(velocityX, velocityY), rotationalVelocity)
+            previousX, previousY, previousRotation = (float(value) for value in previous[i][:3])
+            if previousX == previousX:
+                body.previousPosition = Vector2(previousX, previousY)
+                body.previousRotation = previousRotation
+            else:
+                body.previousPosition = None
+            if not present:
+                world.add_body(body)
+        #the frontend finds the bodies to draw with the aabb tree
+        world.update_aabbTree()
+        self.frameIndex = index
+
+def set_state(body: FlatBody, position: Vector2, rotation: float, velocity: Vector2, rotationalVelocity: float) -> None:
+    if body.IS_STATIC:
+        #this is called for every body every frame, a static body that didn't move must not make the static index rebuild
+        current = body.position
+        if current.x == position.x and current.y == position.y and body.rotation == rotation:
+            return
+    body.position = position
+    body.rotation = rotation
+    body.velocity = velocity
+    body.rotationalVelocity = rotationalVelocity
+    body.transformUpdateNeeded = True
+    if body.IS_STATIC and body.staticIndex != None:
+        body.staticIndex.dirty = True
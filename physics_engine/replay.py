@@ -0,0 +1,69 @@
+"""
+plays a recording made with recording.Recorder through the frontend without running the physics
+
+    python replay.py run.rec
+
+space pauses, left and right step one frame while paused, the camera keys and zoom work like in the game
+"""
+import sys
+import time
+import pygame
+from vector import Vector2
+from frontend import Frontend
+from recording import Recording, Replay
+
+class Player:
+    def __init__(self, path: str) -> None:
+        pygame.init()
+        pygame.display.set_caption(f'replay {path}')
+        self.windowSize = (649, 480)
+        self.screen = pygame.display.set_mode(self.windowSize)
+        self.clock = pygame.time.Clock()
+        self.recording = Recording(path)
+        self.replay = Replay(self.recording)
+        self.frontend = Frontend(self.replay.world, Vector2(self.windowSize))
+        self.paused = False
+
+    def run(self):
+        recording = self.recording
+        if len(recording) == 0:
+            print("the recording has no frames")
+            return
+        deltaTime = 1/recording.tickPerSecond
+        frameTime = 0
+        frame = 0
+        self.replay.show_frame(frame)
+        previouseTime = time.perf_counter()
+        while True:
+            currentTime = time.perf_counter()
+            if not self.paused:
+                frameTime += currentTime-previouseTime
+            previouseTime = currentTime
+            #the same accumulator as FixedTimestep so the replay runs at the speed it was recorded at
+            while frameTime >= deltaTime and frame < len(recording)-1:
+                frameTime -= deltaTime
+                frame += 1
+            if frame != self.replay.frameIndex:
+                self.replay.show_frame(frame)
+
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    sys.exit()
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_SPACE:
+                        self.paused = not self.paused
+                    elif self.paused and event.key == pygame.K_RIGHT:
+                        frame = min(frame+1, len(recording)-1)
+                    elif self.paused and event.key == pygame.K_LEFT:
+                        frame = max(frame-1, 0)
+            self.screen.fill((0,0,0))
+            self.frontend.render(self.screen, 1 if self.paused else min(frameTime/deltaTime, 1))
+            pygame.display.update()
+            self.clock.tick(120)
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("usage: python replay.py recording")
+        sys.exit(1)
+    Player(sys.argv[1]).run()
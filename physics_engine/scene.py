@@ -0,0 +1,223 @@
+"""
+scene files, the bodies of a world and its size and gravity
+
+a .json scene is written by hand:
+
+    {"bound": [32, 24], "gravity": [0, 9.8], "controlBody": 0,
+     "bodies": [{"shape": "box", "position": [16, 12], "size": [1, 1]},
+                {"shape": "box", "position": [16, 23.5], "size": [22, 1], "static": true},
+                {"shape": "circle", "position": [10, 5], "radius": 0.5, "mass": 0.25, "velocity": [2, 0]},
+                {"shape": "polygon", "position": [20, 5], "vertices": [[0, -1], [1, 1], [-1, 1]]}]}
+
+mass (default 1), static, rotation, velocity, rotationalVelocity, restitution, color, outLine and the collision filter
+(categoryBits, maskBits and groupIndex, see broadphase.should_collide) can be left out
+any other file is the binary format: a header and then every column of the bodies one after the other,
+so a big scene is read with one numpy call per column, followed by the local vertices of the polygons
+"""
+import gc
+import json
+import struct
+import numpy as np
+import flatBody
+from vector import Vector2
+from flatBody import ShapeType
+from world import World
+
+MAGIC = b"PHYSCEN\0"
+VERSION = 2
+#magic, version, body count, index of the control body (-1 for none), bound x, bound y, gravity x, gravity y
+HEADER = struct.Struct("<8sIIidddd")
+#the columns in the order they are in the file
+COLUMNS = (("shape", "u1"), ("static", "u1"), ("x", "<f8"), ("y", "<f8"), ("rotation", "<f8"), ("velocityX", "<f8"), ("velocityY", "<f8"),
+           ("rotationalVelocity", "<f8"), ("width", "<f8"), ("height", "<f8"), ("radius", "<f8"), ("mass", "<f8"), ("restitution", "<f8"),
+           ("color", "S16"), ("outLine", "S16"), ("vertexCount", "<u4"), ("categoryBits", "<u4"), ("maskBits", "<u4"), ("groupIndex", "<i4"))
+#version 1 scenes have no collision filter columns, their bodies get the default filter
+FILTER_COLUMNS = {"categoryBits": flatBody.DEFAULT_CATEGORY, "maskBits": flatBody.ALL_CATEGORIES, "groupIndex": 0}
+SHAPE_NAMES = {"circle": ShapeType.Circle, "box": ShapeType.Box, "polygon": ShapeType.Polygon}
+
+def load_scene(path: str, useBodyStore = False) -> World:
+    """a world with the bodies of a .json or binary scene file"""
+    if path.endswith(".json"):
+        with open(path) as file:
+            return from_dict(json.load(file), useBodyStore)
+    return from_columns(*read_columns(path), useBodyStore=useBodyStore)
+
+def save_scene(world: World, path: str) -> None:
+    """writes the bodies of the world to a .json or binary scene file, the pose and velocity they have now are saved"""
+    if path.endswith(".json"):
+        with open(path, "w") as file:
+            json.dump(to_dict(world), file, indent=1)
+        return
+    columns, vertices = get_columns(world)
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(columns["shape"]), _control_index(world), world.bound.x, world.bound.y, world.GRAVITY.x, world.GRAVITY.y))
+        for name, dtype in COLUMNS:
+            file.write(np.asarray(columns[name], dtype).tobytes())
+        file.write(np.asarray(vertices, "<f8").tobytes())
+
+def read_columns(path: str) -> tuple:
+    """(columns, vertices, header) of a binary scene, columns maps the name of every column to a numpy array"""
+    with open(path, "rb") as file:
+        data = file.read()
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path} is not a scene")
+    magic, version, bodyCount, controlBody, boundX, boundY, gravityX, gravityY = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a scene")
+    if version not in (1, VERSION):
+        raise ValueError(f"{path} is version {version} and only versions 1 to {VERSION} can be read")
+    columns = {}
+    offset = HEADER.size
+    for name, dtype in COLUMNS:
+        if version == 1 and name in FILTER_COLUMNS:
+            columns[name] = np.full(bodyCount, FILTER_COLUMNS[name], dtype)
+            continue
+        column = np.frombuffer(data, dtype, bodyCount, offset)
+        columns[name] = column
+        offset += column.nbytes
+    vertexCount = int(columns["vertexCount"].sum())
+    vertices = np.frombuffer(data, "<f8", vertexCount*2, offset).reshape(-1, 2)
+    header = {"bound": (boundX, boundY), "gravity": (gravityX, gravityY), "controlBody": controlBody}
+    return columns, vertices, header
+
+def from_columns(columns: dict, vertices, header: dict, useBodyStore = False) -> World:
+    """builds the world of a scene, the boxes and circles are made together with flatBody.create_bodies and put into the world with add_bodies"""
+    world = World(Vector2(header["bound"]), useBodyStore=useBodyStore, createScene=False)
+    world.GRAVITY = Vector2(header["gravity"])
+    #the garbage collector would go over all the new bodies again and again while they are made, it is paused until they are in the world
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        bodies = create_bodies(columns, vertices)
+        world.add_bodies(bodies)
+    finally:
+        if collecting:
+            gc.enable()
+    controlBody = header["controlBody"]
+    if controlBody != None and controlBody >= 0:
+        world.controlBody = bodies[controlBody]
+    return world
+
+def create_bodies(columns: dict, vertices) -> list:
+    """a FlatBody for every row of the columns"""
+    shapes = np.asarray(columns["shape"])
+    count = len(shapes)
+    isPolygon = shapes == ShapeType.Polygon.value
+    bodies = [None]*count
+    simple = np.flatnonzero(~isPolygon)
+    made = flatBody.create_bodies(shapes[simple], np.column_stack((columns["x"][simple], columns["y"][simple])), columns["mass"][simple],
+                                  columns["width"][simple], columns["height"][simple], columns["radius"][simple], columns["rotation"][simple],
+                                  columns["static"][simple].astype(bool))
+    for index, body in zip(simple.tolist(), made):
+        bodies[index] = body
+    #polygons have their own vertices so they are made one by one
+    vertexStarts = np.concatenate(([0], np.cumsum(columns["vertexCount"], dtype=np.int64)))
+    for index in np.flatnonzero(isPolygon).tolist():
+        polygonVertices = [Vector2(x, y) for x, y in vertices[vertexStarts[index]:vertexStarts[index+1]].tolist()]
+        body = flatBody.create_polygon(Vector2(), float(columns["mass"][index]), polygonVertices, bool(columns["static"][index]))
+        #the saved vertices are already centered so the body goes where its column says
+        body.move_body(Vector2(float(columns["x"][index]), float(columns["y"][index])))
+        body.rotate_body(float(columns["rotation"][index]))
+        bodies[index] = body
+
+    for body, velocityX, velocityY, rotationalVelocity, restitution, color, outLine, categoryBits, maskBits, groupIndex in zip(
+            bodies, columns["velocityX"].tolist(), columns["velocityY"].tolist(), columns["rotationalVelocity"].tolist(),
+            columns["restitution"].tolist(), columns["color"].tolist(), columns["outLine"].tolist(),
+            columns["categoryBits"].tolist(), columns["maskBits"].tolist(), columns["groupIndex"].tolist()):
+        if velocityX != 0 or velocityY != 0:
+            body.velocity = Vector2(velocityX, velocityY)
+        body.rotationalVelocity = rotationalVelocity
+        body.restitution = restitution
+        if color:
+            body.color = color.decode()
+        if outLine:
+            body.outLine = outLine.decode()
+        body.categoryBits = categoryBits
+        body.maskBits = maskBits
+        body.groupIndex = groupIndex
+    return bodies
+
+def get_columns(world: World) -> tuple:
+    """(columns, vertices) of the bodies of the world, columns maps the name of every column to a list"""
+    columns = {name: [] for name, _ in COLUMNS}
+    vertices = []
+    for body in world.flatBodies:
+        position = body.position
+        velocity = body.velocity
+        isPolygon = body.shapeType == ShapeType.Polygon
+        for name, value in (("shape", body.shapeType.value), ("static", body.IS_STATIC), ("x", position.x), ("y", position.y), ("rotation", body.rotation),
+                            ("velocityX", velocity.x), ("velocityY", velocity.y), ("rotationalVelocity", body.rotationalVelocity),
+                            ("width", body.WIDTH), ("height", body.HEIGHT), ("radius", body.RADIUS), ("mass", body.MASS),
+                            ("restitution", body.restitution), ("color", str(body.color).encode()[:16]), ("outLine", str(body.outLine).encode()[:16]),
+                            ("vertexCount", len(body.vertices) if isPolygon else 0), ("categoryBits", body.categoryBits),
+                            ("maskBits", body.maskBits), ("groupIndex", body.groupIndex)):
+            columns[name].append(value)
+        if isPolygon:
+            vertices += [(vertex.x, vertex.y) for vertex in body.vertices]
+    return columns, vertices
+
+def from_dict(data: dict, useBodyStore = False) -> World:
+    """builds the world of a scene read from JSON, the bodies are turned into columns and built like a binary scene"""
+    columns = {name: [] for name, _ in COLUMNS}
+    vertices = []
+    for i, description in enumerate(data.get("bodies", [])):
+        shapeName = description.get("shape")
+        if shapeName not in SHAPE_NAMES:
+            raise ValueError(f"body {i} has the unknown shape {shapeName}, it has to be one of {', '.join(SHAPE_NAMES)}")
+        shapeType = SHAPE_NAMES[shapeName]
+        x, y = description["position"]
+        width, height = description.get("size", (0, 0))
+        polygonVertices = description.get("vertices", []) if shapeType == ShapeType.Polygon else []
+        if shapeType == ShapeType.Polygon:
+            #the vertices are relative to the position, create_polygon moves the body onto their centroid
+            body = flatBody.create_polygon(Vector2(x, y), 1, [Vector2(vertexX, vertexY) for vertexX, vertexY in polygonVertices])
+            x, y = body.position.x, body.position.y
+            width, height = body.WIDTH, body.HEIGHT
+            polygonVertices = [(vertex.x, vertex.y) for vertex in body.vertices]
+        velocityX, velocityY = description.get("velocity", (0, 0))
+        for name, value in (("shape", shapeType.value), ("static", description.get("static", False)), ("x", x), ("y", y),
+                            ("rotation", description.get("rotation", 0)), ("velocityX", velocityX), ("velocityY", velocityY),
+                            ("rotationalVelocity", description.get("rotationalVelocity", 0)), ("width", width), ("height", height),
+                            ("radius", description.get("radius", 0)), ("mass", description.get("mass", 1)), ("restitution", description.get("restitution", 0)),
+                            ("color", description.get("color", "").encode()), ("outLine", description.get("outLine", "").encode()),
+                            ("vertexCount", len(polygonVertices)), ("categoryBits", description.get("categoryBits", flatBody.DEFAULT_CATEGORY)),
+                            ("maskBits", description.get("maskBits", flatBody.ALL_CATEGORIES)), ("groupIndex", description.get("groupIndex", 0))):
+            columns[name].append(value)
+        vertices += polygonVertices
+    columns = {name: np.asarray(values, dtype) for (name, dtype), values in zip(COLUMNS, columns.values())}
+    header = {"bound": tuple(data["bound"]), "gravity": tuple(data.get("gravity", (0, 9.8))), "controlBody": data.get("controlBody")}
+    return from_columns(columns, np.asarray(vertices, float).reshape(-1, 2), header, useBodyStore)
+
+def to_dict(world: World) -> dict:
+    bodies = []
+    for body in world.flatBodies:
+        position = body.position
+        velocity = body.velocity
+        description = {"shape": body.shapeType.name.lower(), "position": [position.x, position.y]}
+        if body.shapeType == ShapeType.Box:
+            description["size"] = [body.WIDTH, body.HEIGHT]
+        elif body.shapeType == ShapeType.Circle:
+            description["radius"] = body.RADIUS
+        else:
+            #the vertices are relative to the centroid, which is the position
+            description["vertices"] = [[vertex.x, vertex.y] for vertex in body.vertices]
+        description["mass"] = body.MASS
+        if body.IS_STATIC:
+            description["static"] = True
+        for name, value, default in (("rotation", body.rotation, 0), ("velocity", [velocity.x, velocity.y], [0, 0]),
+                                     ("rotationalVelocity", body.rotationalVelocity, 0), ("restitution", body.restitution, 0),
+                                     ("categoryBits", body.categoryBits, flatBody.DEFAULT_CATEGORY), ("maskBits", body.maskBits, flatBody.ALL_CATEGORIES),
+                                     ("groupIndex", body.groupIndex, 0)):
+            if value != default:
+                description[name] = value
+        description["color"] = str(body.color)
+        description["outLine"] = str(body.outLine)
+        bodies.append(description)
+    return {"bound": [world.bound.x, world.bound.y], "gravity": [world.GRAVITY.x, world.GRAVITY.y], "controlBody": _control_index(world), "bodies": bodies}
+
+def _control_index(world: World) -> int:
+    #the index of the control body in world.flatBodies, -1 if there is none
+    controlBody = world.controlBody
+    if controlBody == None or controlBody.handle == None:
+        return -1
+    return world.flatBodies.index(controlBody)
@@ -0,0 +1,356 @@
+"""
+steps a world without a window and streams it to any number of clients over a local TCP or Unix socket
+
+    python server.py --port 5600                 (or --unix /tmp/physics.sock, --scene level.json)
+    python viewer.py --port 5600
+
+every message is a MESSAGE header (the type and the size of the payload) followed by the payload, everything is little endian
+the server sends:
+    HELLO   the protocol version, tick per second, bound and the size of one step of the quantized positions
+    ADD     bodies the client doesn't have yet: their handles, a recording.BODY_DTYPE row for each and the local vertices of the polygons
+    REMOVE  the handles of bodies that are gone
+    FRAME   the step and then the slot (handle & INDEX_MASK), quantized x, y and rotation of every body whose quantized pose changed,
+            as four columns one after the other
+a client sends the commands the frontend gives the world: SPAWN_BOX, SPAWN_CIRCLE and SPAWN_POLYGON at a position
+and CONTROL with the direction the control body is pushed in until the next CONTROL
+
+the poses are compared against what each client was sent last, so a client whose socket buffer is full is simply skipped
+and the next frame it gets has everything it missed, a slow client never makes the simulation wait
+"""
+import argparse
+import asyncio
+import math
+import struct
+import time
+import numpy as np
+import recording
+import scene
+from bodyRegistry import INDEX_MASK
+from vector import Vector2
+from world import World
+from timestep import FixedTimestep
+
+VERSION = 1
+#type, payload size
+MESSAGE = struct.Struct("<BI")
+HELLO, ADD, REMOVE, FRAME = 1, 2, 3, 4
+SPAWN_BOX, SPAWN_CIRCLE, SPAWN_POLYGON, CONTROL = 16, 17, 18, 19
+#version, tick per second, bound x, bound y, position step
+HELLO_PAYLOAD = struct.Struct("<IIddd")
+#step, body count
+FRAME_HEADER = struct.Struct("<II")
+#x, y of the position or the direction
+COMMAND = struct.Struct("<dd")
+#a body is only sent again when it moved by a step of this many meters or 1/ROTATION_STEPS of a turn
+POSITION_STEP = 0.001
+ROTATION_STEPS = 65536
+#a client whose socket has more bytes than this waiting to be sent gets no frame this tick
+MAX_BUFFER_SIZE = 1 << 18
+#what a client was sent for a slot it has no body in, never equal to a real handle or pose
+UNKNOWN = -1
+
+def quantize_poses(world: World) -> tuple:
+    """(handles, poses) of every body of the world, poses has a row of quantized x, y and rotation for every handle"""
+    bodies = world.flatBodies
+    handles = np.fromiter((body.handle for body in bodies), np.int64, len(bodies))
+    poses = np.array([(body.position.x, body.position.y, body.rotation) for body in bodies], float).reshape(-1, 3)
+    quantized = np.empty((len(bodies), 3), np.int64)
+    np.round(poses[:, :2]/POSITION_STEP, out=poses[:, :2])
+    quantized[:, :2] = poses[:, :2]
+    quantized[:, 2] = np.round(poses[:, 2]/(2*math.pi)*ROTATION_STEPS).astype(np.int64) % ROTATION_STEPS
+    return handles, quantized
+
+def pack_message(messageType: int, *payload: bytes) -> bytes:
+    size = sum(len(part) for part in payload)
+    return b"".join((MESSAGE.pack(messageType, size),)+payload)
+
+class ServerClient:
+    """a connected client and the handles and quantized poses it was sent last, indexed by slot"""
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.handles = np.full(0, UNKNOWN, np.int64)
+        self.poses = np.full((0, 3), UNKNOWN, np.int64)
+        self.controlDirection = Vector2()
+        #how many frames were not sent because the client was behind
+        self.skippedFrames = 0
+        self.sentFrames = 0
+
+    def is_behind(self) -> bool:
+        transport = self.writer.transport
+        return transport.is_closing() or transport.get_write_buffer_size() > MAX_BUFFER_SIZE
+
+    def update(self, world: World, step: int, handles, poses) -> None:
+        """sends the bodies that were added, removed or moved since the last frame this client got"""
+        slotCount = len(world.registry.generations)
+        if len(self.handles) < slotCount:
+            grow = slotCount-len(self.handles)
+            self.handles = np.concatenate((self.handles, np.full(grow, UNKNOWN, np.int64)))
+            self.poses = np.concatenate((self.poses, np.full((grow, 3), UNKNOWN, np.int64)))
+        slots = handles & INDEX_MASK
+        messages = []
+        current = np.full(slotCount, UNKNOWN, np.int64)
+        current[slots] = handles
+        removed = (self.handles != UNKNOWN) & (self.handles != current)
+        if removed.any():
+            messages.append(pack_message(REMOVE, self.handles[removed].astype("<u8").tobytes()))
+            self.handles[removed] = UNKNOWN
+        added = np.flatnonzero(self.handles[slots] != handles)
+        if len(added):
+            bodies = world.flatBodies
+            table, vertices = recording.get_bodyTable([bodies[i] for i in added.tolist()])
+            messages.append(pack_message(ADD, struct.pack("<I", len(added)), handles[added].astype("<u8").tobytes(), table.tobytes(), vertices.tobytes()))
+            self.handles[slots[added]] = handles[added]
+            self.poses[slots[added]] = UNKNOWN
+        changed = np.flatnonzero((self.poses[slots] != poses).any(axis=1))
+        changedSlots = slots[changed]
+        changedPoses = poses[changed]
+        messages.append(pack_message(FRAME, FRAME_HEADER.pack(step, len(changed)), changedSlots.astype("<u4").tobytes(),
+                                     changedPoses[:, 0].astype("<i4").tobytes(), changedPoses[:, 1].astype("<i4").tobytes(),
+                                     changedPoses[:, 2].astype("<u2").tobytes()))
+        self.poses[changedSlots] = changedPoses
+        self.writer.write(b"".join(messages))
+        self.sentFrames += 1
+
+class SimulationServer:
+    """
+    steps the world tickPerSecond times a second with a FixedTimestep and sends every client the changes after each tick
+    the commands of the clients are run between ticks, the control body is pushed by the sum of the directions of every client
+    """
+    def __init__(self, world: World, tickPerSecond: int = 60, subSteps: int = 2, maxStepsPerFrame: int = 5) -> None:
+        self.world = world
+        self.tickPerSecond = tickPerSecond
+        self.timestep = FixedTimestep(world, tickPerSecond, subSteps, maxStepsPerFrame)
+        self.clients = []
+        self.stepCount = 0
+        self.server = None
+        self.tickTask = None
+        #the handle_client task of every connection, close cancels them and waits for them to end
+        self.clientTasks = set()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0, unixPath: str = None) -> None:
+        """listens on the Unix socket at unixPath or else on host and port (0 picks a free port) and starts stepping"""
+        if unixPath != None:
+            self.server = await asyncio.start_unix_server(self.accept_client, unixPath)
+        else:
+            self.server = await asyncio.start_server(self.accept_client, host, port)
+        self.tickTask = asyncio.create_task(self.run())
+
+    @property
+    def address(self):
+        #the (host, port) or path the server listens on
+        return self.server.sockets[0].getsockname()
+
+    async def close(self) -> None:
+        if self.tickTask != None:
+            self.tickTask.cancel()
+            try:
+                await self.tickTask
+            except asyncio.CancelledError:
+                pass
+        tasks = list(self.clientTasks)
+        for task in tasks:
+            task.cancel()
+        #the handlers close their writers when they are cancelled
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.server.close()
+        await self.server.wait_closed()
+
+    def accept_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        #a plain function so the server owns the handler task and close can cancel it, asyncio would make its own task for a coroutine
+        task = asyncio.create_task(self.handle_client(reader, writer))
+        self.clientTasks.add(task)
+        task.add_done_callback(self.clientTasks.discard)
+
+    async def run(self) -> None:
+        deltaTime = 1/self.tickPerSecond
+        previousTime = nextTick = time.perf_counter()
+        while True:
+            nextTick += deltaTime
+            await asyncio.sleep(max(nextTick-time.perf_counter(), 0))
+            currentTime = time.perf_counter()
+            self.world.control_body(sum((client.controlDirection for client in self.clients), Vector2()))
+            steps = self.timestep.advance(currentTime-previousTime)
+            previousTime = currentTime
+            self.stepCount += steps
+            if steps > 0:
+                self.broadcast()
+            #after a tick that took too long the next one starts from now instead of trying to catch up on every missed tick
+            if currentTime-nextTick > deltaTime:
+                nextTick = currentTime
+
+    def broadcast(self) -> None:
+        clients = [client for client in self.clients if not client.is_behind()]
+        for client in self.clients:
+            if client not in clients:
+                client.skippedFrames += 1
+        if not clients:
+            return
+        #the poses are quantized once and every client gets what changed since its own last frame
+        handles, poses = quantize_poses(self.world)
+        for client in clients:
+            client.update(self.world, self.stepCount, handles, poses)
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        client = ServerClient(reader, writer)
+        bound = self.world.bound
+        writer.write(pack_message(HELLO, HELLO_PAYLOAD.pack(VERSION, self.tickPerSecond, bound.x, bound.y, POSITION_STEP)))
+        self.clients.append(client)
+        try:
+            while True:
+                messageType, size = MESSAGE.unpack(await reader.readexactly(MESSAGE.size))
+                self.run_command(client, messageType, await reader.readexactly(size))
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, struct.error):
+            #the client disconnected or sent something that isn't a command
+            pass
+        finally:
+            self.clients.remove(client)
+            writer.close()
+
+    def run_command(self, client: ServerClient, messageType: int, payload: bytes) -> None:
+        x, y = COMMAND.unpack(payload)
+        if messageType == SPAWN_BOX:
+            self.world.spawn_box(Vector2(x, y))
+        elif messageType == SPAWN_CIRCLE:
+            self.world.spawn_circle(Vector2(x, y))
+        elif messageType == SPAWN_POLYGON:
+            self.world.spawn_polygon(Vector2(x, y))
+        elif messageType == CONTROL:
+            client.controlDirection = Vector2(x, y)
+        else:
+            raise ValueError(f"unknown command {messageType}")
+
+class SimulationClient:
+    """
+    connects to a SimulationServer and keeps a copy of its world that is never stepped, so it can be drawn with Frontend.render
+    spawn_box, spawn_circle, spawn_polygon and control_body have the names of the World methods so the frontend input can be sent to the server
+    """
+    def __init__(self) -> None:
+        self.reader = None
+        self.writer = None
+        self.world = None
+        self.tickPerSecond = 0
+        self.positionStep = POSITION_STEP
+        #slot -> body in the copy of the world
+        self.bodies = {}
+        self.step = 0
+        self.controlDirection = Vector2()
+
+    async def connect(self, host: str = "127.0.0.1", port: int = 5600, unixPath: str = None) -> None:
+        if unixPath != None:
+            self.reader, self.writer = await asyncio.open_unix_connection(unixPath)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(host, port)
+        messageType, payload = await self.read_message()
+        if messageType != HELLO:
+            raise ValueError("the server didn't start with a hello")
+        version, self.tickPerSecond, boundX, boundY, self.positionStep = HELLO_PAYLOAD.unpack(payload)
+        if version != VERSION:
+            raise ValueError(f"the server speaks version {version} and only version {VERSION} is understood")
+        self.world = World(Vector2(boundX, boundY), createScene=False)
+
+    async def read_message(self) -> tuple:
+        messageType, size = MESSAGE.unpack(await self.reader.readexactly(MESSAGE.size))
+        return messageType, await self.reader.readexactly(size)
+
+    async def receive(self) -> int:
+        """reads and applies the next message, returns its type"""
+        messageType, payload = await self.read_message()
+        if messageType == ADD:
+            self.add_bodies(payload)
+        elif messageType == REMOVE:
+            for handle in np.frombuffer(payload, "<u8").tolist():
+                self.world.remove_body(self.bodies.pop(handle & INDEX_MASK))
+        elif messageType == FRAME:
+            self.apply_frame(payload)
+        return messageType
+
+    async def run(self, onFrame = None) -> None:
+        """applies messages until the server closes the connection, onFrame is called after every frame"""
+        try:
+            while True:
+                if await self.receive() == FRAME and onFrame != None:
+                    onFrame()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+    def add_bodies(self, payload: bytes) -> None:
+        count = struct.unpack_from("<I", payload)[0]
+        offset = 4
+        handles = np.frombuffer(payload, "<u8", count, offset)
+        offset += handles.nbytes
+        table = np.frombuffer(payload, recording.BODY_DTYPE, count, offset)
+        offset += table.nbytes
+        vertices = np.frombuffer(payload, recording.VERTEX_DTYPE, offset=offset).reshape(-1, 2)
+        bodies = recording.create_tableBodies(table, vertices)
+        for handle, body in zip(handles.tolist(), bodies):
+            self.bodies[handle & INDEX_MASK] = body
+        self.world.add_bodies(bodies)
+
+    def apply_frame(self, payload: bytes) -> None:
+        step, count = FRAME_HEADER.unpack_from(payload)
+        offset = FRAME_HEADER.size
+        columns = []
+        for dtype in ("<u4", "<i4", "<i4", "<u2"):
+            column = np.frombuffer(payload, dtype, count, offset)
+            offset += column.nbytes
+            columns.append(column)
+        slots, xs, ys, rotations = columns
+        positionStep = self.positionStep
+        rotationStep = 2*math.pi/ROTATION_STEPS
+        bodies = self.bodies
+        for slot, x, y, rotation in zip(slots.tolist(), (xs*positionStep).tolist(), (ys*positionStep).tolist(), (rotations*rotationStep).tolist()):
+            body = bodies[slot]
+            recording.set_state(body, Vector2(x, y), rotation, body.velocity, 0)
+        #the frontend finds the bodies to draw with the aabb tree
+        self.world.update_aabbTree()
+        self.step = step
+
+    def send_command(self, messageType: int, vector: Vector2) -> None:
+        self.writer.write(pack_message(messageType, COMMAND.pack(vector.x, vector.y)))
+
+    def spawn_box(self, position: Vector2) -> None:
+        self.send_command(SPAWN_BOX, position)
+
+    def spawn_circle(self, position: Vector2) -> None:
+        self.send_command(SPAWN_CIRCLE, position)
+
+    def spawn_polygon(self, position: Vector2) -> None:
+        self.send_command(SPAWN_POLYGON, position)
+
+    def control_body(self, dir: Vector2) -> None:
+        #only sent when it changes, the server keeps pushing in the last direction
+        if dir != self.controlDirection:
+            self.controlDirection = Vector2(dir.x, dir.y)
+            self.send_command(CONTROL, dir)
+
+    def close(self) -> None:
+        self.writer.close()
+
+async def serve(args) -> None:
+    if args.scene != None:
+        world = scene.load_scene(args.scene)
+    else:
+        world = World(Vector2(649, 480)/20)
+    server = SimulationServer(world, args.tick, args.substeps)
+    await server.start(args.host, args.port, args.unix)
+    print(f"serving on {server.address}")
+    try:
+        await server.tickTask
+    finally:
+        await server.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="steps a world without a window and streams it to viewer.py or other clients")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5600)
+    parser.add_argument("--unix", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--scene", help="a .json or binary scene file to start with instead of the default scene")
+    parser.add_argument("--tick", type=int, default=60)
+    parser.add_argument("--substeps", type=int, default=2)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        #ctrl+c is how the server is stopped
+        pass
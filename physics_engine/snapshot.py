@@ -0,0 +1,132 @@
+"""
+keeps the state of the bodies of the last few hundred steps so the world can be rewound (World.snapshot and World.restore)
+
+every frame is a row of arrays that are allocated once with the state columns and the handle of every body, a list of the bodies
+and the warm starting impulses of the solver, so taking a snapshot only copies numbers and references and restoring one writes them
+back into the vectors the bodies already have
+"""
+import numpy as np
+
+#the columns of the state of a body in a frame
+X, Y, ROTATION, VELOCITY_X, VELOCITY_Y, ROTATIONAL_VELOCITY, FORCE_X, FORCE_Y, SLEEP_TIME, AWAKE = range(10)
+COLUMN_COUNT = 10
+
+class SnapshotBuffer:
+    """
+    a ring buffer of the last frameCapacity snapshots of a world, frames are numbered from 0 up and the oldest one is overwritten when it is full
+    the arrays have room for bodyCapacity bodies per frame and are doubled (keeping the frames) when the world has more bodies than that
+    """
+    def __init__(self, frameCapacity: int = 300, bodyCapacity: int = 64) -> None:
+        self.frameCapacity = frameCapacity
+        self.bodyCapacity = 0
+        self.state = np.zeros((frameCapacity, 0, COLUMN_COUNT))
+        self.handles = np.zeros((frameCapacity, 0), np.int64)
+        #a list of the bodies of every frame so a body that was removed after the frame can be put back,
+        #and of their islands so a sleeping body wakes up with the same bodies again
+        self.bodies = [[] for _ in range(frameCapacity)]
+        self.islands = [[] for _ in range(frameCapacity)]
+        #the warm starting impulses of the solver (SequentialImpulseSolver.get_impulses) so a rewound world steps the same way again
+        self.impulses = [{} for _ in range(frameCapacity)]
+        self.counts = np.zeros(frameCapacity, np.int64)
+        #the frames nextFrame-frameCount to nextFrame-1 are in the buffer
+        self.nextFrame = 0
+        self.frameCount = 0
+        self._grow(bodyCapacity)
+
+    def _grow(self, bodyCapacity: int) -> None:
+        capacity = self.bodyCapacity
+        for name in ("state", "handles"):
+            old = getattr(self, name)
+            array = np.zeros((self.frameCapacity, bodyCapacity)+old.shape[2:], old.dtype)
+            array[:, :capacity] = old
+            setattr(self, name, array)
+        self.bodyCapacity = bodyCapacity
+
+    def __contains__(self, frame: int) -> bool:
+        return self.nextFrame-self.frameCount <= frame < self.nextFrame
+
+    def capture(self, bodies: list, impulses: dict = None) -> int:
+        """stores the state of the bodies (World.flatBodies) and the impulses of the solver as the next frame and returns its number"""
+        count = len(bodies)
+        if count > self.bodyCapacity:
+            self._grow(max(count, self.bodyCapacity*2))
+        frame = self.nextFrame
+        row = frame%self.frameCapacity
+        rows = []
+        for body in bodies:
+            position = body.position
+            velocity = body.velocity
+            force = body.force
+            rows.append((position.x, position.y, body.rotation, velocity.x, velocity.y, body.rotationalVelocity, force.x, force.y, body.sleepTime, body.isAwake))
+        if count:
+            self.state[row, :count] = rows
+        self.handles[row, :count] = [body.handle for body in bodies]
+        self.bodies[row] = list(bodies)
+        self.islands[row] = [body.island for body in bodies]
+        self.impulses[row] = impulses or {}
+        self.counts[row] = count
+        self.nextFrame = frame+1
+        self.frameCount = min(self.frameCount+1, self.frameCapacity)
+        return frame
+
+    def get_frame(self, frame: int) -> tuple:
+        """(state, handles, bodies, islands) of the frame, views into the buffer"""
+        if frame not in self:
+            raise ValueError(f"frame {frame} is not in the snapshot buffer, it has frames {self.nextFrame-self.frameCount} to {self.nextFrame-1}")
+        row = frame%self.frameCapacity
+        count = self.counts[row]
+        return self.state[row, :count], self.handles[row, :count], self.bodies[row], self.islands[row]
+
+    def get_impulses(self, frame: int) -> dict:
+        """the impulses of the solver when the frame was taken"""
+        if frame not in self:
+            raise ValueError(f"frame {frame} is not in the snapshot buffer, it has frames {self.nextFrame-self.frameCount} to {self.nextFrame-1}")
+        return self.impulses[frame%self.frameCapacity]
+
+    def discard_after(self, frame: int) -> None:
+        #the frames after frame belong to the timeline that was rewound
+        self.frameCount -= self.nextFrame-frame-1
+        self.nextFrame = frame+1
+
+def write_state(bodies: list, state, islands, store) -> bool:
+    """writes the state rows back into the bodies, returns whether a static body moved"""
+    staticMoved = False
+    for body, (x, y, rotation, velocityX, velocityY, rotationalVelocity, forceX, forceY, sleepTime, awake), island in zip(bodies, state.tolist(), islands):
+        if body.IS_STATIC:
+            position = body.position
+            if position.x != x or position.y != y or body.rotation != rotation:
+                staticMoved = True
+        if body.store == None:
+            #the vectors the body already has are changed in place like the integration does
+            position = body.position
+            position.x = x
+            position.y = y
+            velocity = body.velocity
+            velocity.x = velocityX
+            velocity.y = velocityY
+            force = body.force
+            force.x = forceX
+            force.y = forceY
+            body.rotation = rotation
+            body.rotationalVelocity = rotationalVelocity
+        body.sleepTime = sleepTime
+        body.isAwake = awake == 1
+        body.island = island
+        #a restore is a teleport so it is not interpolated
+        body.previousPosition = None
+        body.previousRotation = rotation
+        body.verticesUpdateNeeded = True
+        body.aabbUpdateNeeded = True
+    if store != None and store.count:
+        #the bodies in the store are written with a few vectorized assignments
+        storeIndices = np.fromiter((body.storeIndex for body in bodies), np.int64, len(bodies))
+        inStore = storeIndices >= 0
+        storeIndices = storeIndices[inStore]
+        stored = state[inStore]
+        store.position[storeIndices] = stored[:, X:Y+1]
+        store.velocity[storeIndices] = stored[:, VELOCITY_X:VELOCITY_Y+1]
+        store.force[storeIndices] = stored[:, FORCE_X:FORCE_Y+1]
+        store.rotation[storeIndices] = stored[:, ROTATION]
+        store.rotationalVelocity[storeIndices] = stored[:, ROTATIONAL_VELOCITY]
+        store.awake[storeIndices] = stored[:, AWAKE]
+    return staticMoved
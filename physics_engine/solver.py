@@ -0,0 +1,294 @@
+import os
+import island
+from vector import Vector2
+from flatBody import FlatBody
+from collision import CollideInfo
+
+class ContactPoint:
+    def __init__(self, point: Vector2, featureId, depth: float = 0) -> None:
+        self.point = point
+        #how far the bodies overlap at the point
+        self.depth = depth
+        #which vertex and edge made the point, used to find the same contact in the next step
+        self.featureId = featureId
+        #the accumulated impulse along the normal, it is kept between steps for warm starting
+        self.normalImpulse = 0
+        #filled in by the solver before the iterations
+        self.radiusA = Vector2()
+        self.radiusB = Vector2()
+        self.normalMass = 0
+        self.velocityBias = 0
+
+class ContactManifold:
+    """the contact points between two bodies, it lives as long as the bodies keep touching"""
+    def __init__(self, bodyA: FlatBody, bodyB: FlatBody) -> None:
+        self.bodyA = bodyA
+        self.bodyB = bodyB
+        #points from bodyA to bodyB
+        self.normal = Vector2()
+        self.depth = 0
+        self.contacts = []
+        #the last step the bodies touched in, manifolds that weren't touched in a step are removed
+        self.lastStep = -1
+
+    def update(self, collideInfo: CollideInfo, step: int) -> None:
+        """replaces the contact points, points with the same feature id as an old point keep its impulse"""
+        oldImpulses = {contact.featureId: contact.normalImpulse for contact in self.contacts}
+        collide = collideInfo.collide
+        self.depth = collide.magnitude()
+        self.normal = collide/self.depth
+        self.contacts = []
+        depths = collideInfo.contactDepths or [0]*len(collideInfo.contactPoints)
+        for point, featureId, depth in zip(collideInfo.contactPoints, collideInfo.contactFeatures, depths):
+            contact = ContactPoint(point, featureId, depth)
+            contact.normalImpulse = oldImpulses.get(featureId, 0)
+            self.contacts.append(contact)
+        self.lastStep = step
+
+class SequentialImpulseSolver:
+    """
+    solves every contact a few times in a row, each time with the velocities the other contacts left behind
+    the impulse of every contact is accumulated and clamped to be pushing, and the manifolds are kept between steps
+    so the solver can start from the impulses of the last step (warm starting) instead of from zero
+    """
+    #below this approach speed contacts don't bounce, this keeps resting contacts from jittering
+    RESTITUTION_THRESHOLD = 0.5
+    #how deep the world leaves touching bodies in each other so their contacts don't break every other step
+    LINEAR_SLOP = 0.005
+
+    #below this many contacts a substep is solved on the calling thread, sending it to the workers would cost more
+    #pickling a contact there and back costs about 8us against about 12us to solve it, and every task costs about 0.4ms more
+    #so the workers only win on very large scenes and with 4 or more cores, with 2 cores they are never faster
+    MIN_PARALLEL_CONTACTS = 4096
+
+    def __init__(self, iterations: int = 8, warmStarting: bool = True, executor = None, taskCount: int = None) -> None:
+        self.iterations = iterations
+        self.warmStarting = warmStarting
+        #a concurrent.futures executor the islands are solved on, None solves everything on the calling thread
+        #a ProcessPoolExecutor uses every core, a ThreadPoolExecutor only does on a free threaded python
+        self.executor = executor
+        #how many tasks the islands are split into, by default one per core
+        self.taskCount = taskCount or os.cpu_count() or 1
+        #(bodyA, bodyB) -> ContactManifold
+        self.manifolds = {}
+        #body -> the keys of its manifolds, so removing a body only touches its own pairs
+        self.bodyManifolds = {}
+        self.stepCount = 0
+
+    def begin_step(self) -> None:
+        self.stepCount += 1
+
+    def end_step(self) -> None:
+        """removes the manifolds of the bodies that stopped touching"""
+        step = self.stepCount
+        for key in [key for key, manifold in self.manifolds.items() if manifold.lastStep != step]:
+            self._remove_manifold(key)
+
+    def clear(self) -> None:
+        self.manifolds = {}
+        self.bodyManifolds = {}
+
+    def _add_manifold(self, key: tuple, manifold: ContactManifold) -> None:
+        self.manifolds[key] = manifold
+        for body in key:
+            keys = self.bodyManifolds.get(body)
+            if keys == None:
+                self.bodyManifolds[body] = keys = set()
+            keys.add(key)
+
+    def _remove_manifold(self, key: tuple) -> None:
+        del self.manifolds[key]
+        for body in key:
+            keys = self.bodyManifolds.get(body)
+            if keys != None:
+                keys.discard(key)
+                if not keys:
+                    del self.bodyManifolds[body]
+
+    def get_impulses(self) -> dict:
+        """(bodyA, bodyB) -> ((featureId, normalImpulse), ...) of every manifold, what warm starting needs to carry on from this step"""
+        return {key: tuple((contact.featureId, contact.normalImpulse) for contact in manifold.contacts) for key, manifold in self.manifolds.items()}
+
+    def set_impulses(self, impulses: dict) -> None:
+        """replaces the manifolds with ones that only have the impulses from get_impulses, the next step fills in their contacts"""
+        self.clear()
+        for (bodyA, bodyB), contacts in impulses.items():
+            manifold = ContactManifold(bodyA, bodyB)
+            for featureId, normalImpulse in contacts:
+                contact = ContactPoint(Vector2(), featureId)
+                contact.normalImpulse = normalImpulse
+                manifold.contacts.append(contact)
+            manifold.lastStep = self.stepCount
+            self._add_manifold((bodyA, bodyB), manifold)
+
+    def remove_body(self, body: FlatBody) -> None:
+        self.remove_bodies({body})
+
+    def remove_bodies(self, bodies: set) -> None:
+        for body in bodies:
+            for key in list(self.bodyManifolds.get(body, ())):
+                self._remove_manifold(key)
+
+    def add_contact(self, collideInfo: CollideInfo) -> ContactManifold:
+        key = (collideInfo.bodyA, collideInfo.bodyB)
+        manifold = self.manifolds.get(key)
+        if manifold == None:
+            manifold = ContactManifold(collideInfo.bodyA, collideInfo.bodyB)
+            self._add_manifold(key, manifold)
+        manifold.update(collideInfo, self.stepCount)
+        return manifold
+
+    def solve(self, manifolds: list, tickPerSec: int) -> None:
+        if not manifolds:
+            return
+        #the velocities are copied into lists once instead of going through the body properties for every contact
+        velocities = {}
+        for manifold in manifolds:
+            for body in (manifold.bodyA, manifold.bodyB):
+                if body not in velocities:
+                    velocity = body.velocity
+                    velocities[body] = [velocity.x, velocity.y, body.rotationalVelocity]
+        for manifold in manifolds:
+            self.prepare(manifold, velocities)
+
+        groups = self.split_tasks(manifolds)
+        tasks = [pack_contacts(group) for group in groups]
+        if len(tasks) > 1:
+            #only plain lists are sent to the workers, the bodies stay here
+            results = list(self.executor.map(solve_contacts, [velocities for _, velocities, _ in tasks], [rows for _, _, rows in tasks],
+                                             [self.iterations]*len(tasks), [self.warmStarting]*len(tasks)))
+        else:
+            _, taskVelocities, rows = tasks[0]
+            results = [solve_contacts(taskVelocities, rows, self.iterations, self.warmStarting)]
+
+        #every dynamic body is in exactly one task so the results are the same no matter which task finished first
+        for group, (bodies, _, _), (bodyVelocities, impulses) in zip(groups, tasks, results):
+            for body, (vx, vy, w) in zip(bodies, bodyVelocities):
+                if body.IS_STATIC:
+                    continue
+                body.velocity = Vector2(vx, vy)
+                body.rotationalVelocity = w
+            for manifold, manifoldImpulses in zip(group, impulses):
+                for contact, impulse in zip(manifold.contacts, manifoldImpulses):
+                    contact.normalImpulse = impulse
+
+    def split_tasks(self, manifolds: list) -> list:
+        """
+        splits the manifolds into at most taskCount groups that don't share a dynamic body
+        whole islands go into the group with the fewest contacts so far, the manifolds keep their order in every group
+        """
+        if self.executor == None or self.taskCount < 2 or sum(len(manifold.contacts) for manifold in manifolds) < self.MIN_PARALLEL_CONTACTS:
+            return [manifolds]
+        islands = island.group_by_island(manifolds)
+        if len(islands) < 2:
+            return [manifolds]
+        groups = [[] for _ in range(min(self.taskCount, len(islands)))]
+        sizes = [0]*len(groups)
+        #the biggest islands are placed first so the groups end up about the same size
+        for islandManifolds in sorted(islands, key=lambda islandManifolds: -sum(len(manifold.contacts) for manifold in islandManifolds)):
+            index = sizes.index(min(sizes))
+            groups[index] += islandManifolds
+            sizes[index] += sum(len(manifold.contacts) for manifold in islandManifolds)
+        return [group for group in groups if group]
+
+    def prepare(self, manifold: ContactManifold, velocities: dict) -> None:
+        bodyA = manifold.bodyA
+        bodyB = manifold.bodyB
+        nx = manifold.normal.x
+        ny = manifold.normal.y
+        positionAX, positionAY = bodyA.get_positionXY()
+        positionBX, positionBY = bodyB.get_positionXY()
+        vA = velocities[bodyA]
+        vB = velocities[bodyB]
+        e = min(bodyA.restitution, bodyB.restitution)
+        for contact in manifold.contacts:
+            #the distance from the contact point to the center
+            rax = contact.point.x-positionAX
+            ray = contact.point.y-positionAY
+            rbx = contact.point.x-positionBX
+            rby = contact.point.y-positionBY
+            contact.radiusA = Vector2(rax, ray)
+            contact.radiusB = Vector2(rbx, rby)
+            raCrossN = rax*ny-ray*nx
+            rbCrossN = rbx*ny-rby*nx
+            denom = bodyA.INVERSE_MASS+bodyB.INVERSE_MASS+raCrossN*raCrossN*bodyA.inverseInteria+rbCrossN*rbCrossN*bodyB.inverseInteria
+            contact.normalMass = 1/denom if denom > 0 else 0
+            #the bounce is taken from the velocity before any impulse is applied
+            relativeX = vB[0]-rby*vB[2]-(vA[0]-ray*vA[2])
+            relativeY = vB[1]+rbx*vB[2]-(vA[1]+rax*vA[2])
+            contactVelocity = relativeX*nx+relativeY*ny
+            contact.velocityBias = -e*contactVelocity if contactVelocity < -self.RESTITUTION_THRESHOLD else 0
+            if not self.warmStarting:
+                contact.normalImpulse = 0
+
+def pack_contacts(manifolds: list) -> tuple:
+    """
+    copies what the solver needs out of the manifolds into plain lists so they can be sent to another process
+    returns (bodies, velocities, rows), a row is (index of bodyA, index of bodyB, inverse mass A, inverse inertia A, inverse mass B, inverse inertia B, normal x, normal y, contacts)
+    and every contact is [radiusA x, radiusA y, radiusB x, radiusB y, normal mass, velocity bias, normal impulse]
+    """
+    bodies = []
+    bodyIndices = {}
+    velocities = []
+    rows = []
+    for manifold in manifolds:
+        indices = []
+        for body in (manifold.bodyA, manifold.bodyB):
+            index = bodyIndices.get(body)
+            if index == None:
+                index = len(bodies)
+                bodyIndices[body] = index
+                bodies.append(body)
+                velocity = body.velocity
+                velocities.append([velocity.x, velocity.y, body.rotationalVelocity])
+            indices.append(index)
+        bodyA = manifold.bodyA
+        bodyB = manifold.bodyB
+        contacts = [[contact.radiusA.x, contact.radiusA.y, contact.radiusB.x, contact.radiusB.y, contact.normalMass, contact.velocityBias, contact.normalImpulse]
+                    for contact in manifold.contacts]
+        rows.append((indices[0], indices[1], bodyA.INVERSE_MASS, bodyA.inverseInteria, bodyB.INVERSE_MASS, bodyB.inverseInteria, manifold.normal.x, manifold.normal.y, contacts))
+    return bodies, velocities, rows
+
+def solve_contacts(velocities: list, rows: list, iterations: int, warmStarting: bool) -> tuple:
+    """
+    solves the velocities and rows made by pack_contacts, it only uses plain lists so it can run in a worker
+    returns (velocities, impulses) where impulses has the accumulated normal impulse of every contact of every row
+    """
+    if warmStarting:
+        for a, b, inverseMassA, inverseInertiaA, inverseMassB, inverseInertiaB, nx, ny, contacts in rows:
+            vA = velocities[a]
+            vB = velocities[b]
+            for rax, ray, rbx, rby, _, _, normalImpulse in contacts:
+                if normalImpulse == 0:
+                    continue
+                impulseX = normalImpulse*nx
+                impulseY = normalImpulse*ny
+                vA[0] -= impulseX*inverseMassA
+                vA[1] -= impulseY*inverseMassA
+                vA[2] -= (rax*impulseY-ray*impulseX)*inverseInertiaA
+                vB[0] += impulseX*inverseMassB
+                vB[1] += impulseY*inverseMassB
+                vB[2] += (rbx*impulseY-rby*impulseX)*inverseInertiaB
+    for _ in range(iterations):
+        for a, b, inverseMassA, inverseInertiaA, inverseMassB, inverseInertiaB, nx, ny, contacts in rows:
+            vA = velocities[a]
+            vB = velocities[b]
+            for contact in contacts:
+                rax, ray, rbx, rby, normalMass, velocityBias, normalImpulse = contact
+                relativeX = vB[0]-rby*vB[2]-(vA[0]-ray*vA[2])
+                relativeY = vB[1]+rbx*vB[2]-(vA[1]+rax*vA[2])
+                contactVelocity = relativeX*nx+relativeY*ny
+                #the accumulated impulse can only push the bodies apart
+                newImpulse = max(normalImpulse+normalMass*(velocityBias-contactVelocity), 0)
+                impulse = newImpulse-normalImpulse
+                contact[6] = newImpulse
+                #the impulse pushes bodyB along the normal and bodyA against it
+                impulseX = impulse*nx
+                impulseY = impulse*ny
+                vA[0] -= impulseX*inverseMassA
+                vA[1] -= impulseY*inverseMassA
+                vA[2] -= (rax*impulseY-ray*impulseX)*inverseInertiaA
+                vB[0] += impulseX*inverseMassB
+                vB[1] += impulseY*inverseMassB
+                vB[2] += (rbx*impulseY-rby*impulseX)*inverseInertiaB
+    return velocities, [[contact[6] for contact in row[8]] for row in rows]
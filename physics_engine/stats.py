@@ -0,0 +1,82 @@
+import csv
+import json
+from collections import deque
+
+#the parts of World.step that are timed
+PHASES = ("integrate", "broadphase", "collide", "contact", "solve", "sleep", "particles", "void", "aabbUpdate", "snapshot")
+#pairTests: AABB tests the broadphases did, aabbHits: pairs whose AABB overlap,
+#satCalls: polygon and box pairs that went through SAT (the batched ones too), narrowphaseHits: pairs that collide, contacts: contact points,
+#toiCalls: times of impact continuous collision detection looked for, particleContacts: contacts of the particles summed over the substeps
+COUNTERS = ("pairTests", "aabbHits", "satCalls", "narrowphaseHits", "contacts", "toiCalls", "particleContacts")
+
+class WorldStats:
+    """
+    what World.step spends its time on and how much work it did
+    the counters are always kept since they are only a few additions per step,
+    the phase times and the per step history are only recorded while enabled is True
+    """
+    def __init__(self, window: int = 60) -> None:
+        self.enabled = False
+        #how many steps the rolling averages are taken over
+        self.window = window
+        #the counters of every step since the last reset
+        self.totals = dict.fromkeys(COUNTERS, 0)
+        self.stepCount = 0
+        #the current step, World.step adds to these
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        #{"step": n, "stepTime": seconds, phase: seconds..., counter: count...} of the last window steps
+        self.history = deque(maxlen=window)
+
+    def begin_step(self) -> None:
+        times = self.times
+        for phase in times:
+            times[phase] = 0.0
+        counts = self.counts
+        for name in counts:
+            counts[name] = 0
+
+    def end_step(self, stepTime: float = 0) -> None:
+        totals = self.totals
+        counts = self.counts
+        for name in counts:
+            totals[name] += counts[name]
+        self.stepCount += 1
+        if self.enabled:
+            record = {"step": self.stepCount, "stepTime": stepTime}
+            record.update(self.times)
+            record.update(counts)
+            self.history.append(record)
+
+    def set_window(self, window: int) -> None:
+        self.window = window
+        self.history = deque(self.history, maxlen=window)
+
+    def reset(self) -> None:
+        for name in self.totals:
+            self.totals[name] = 0
+        self.stepCount = 0
+        self.history.clear()
+
+    def average(self, name: str) -> float:
+        """the average of a phase time (in seconds), a counter or stepTime over the last window steps"""
+        if not self.history:
+            return 0
+        return sum(record[name] for record in self.history)/len(self.history)
+
+    def averages(self) -> dict:
+        return {name: self.average(name) for name in ("stepTime",)+PHASES+COUNTERS}
+
+    def to_dict(self) -> dict:
+        return {"steps": self.stepCount, "totals": dict(self.totals), "averages": self.averages(), "history": list(self.history)}
+
+    def write_json(self, path: str) -> None:
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    def write_csv(self, path: str) -> None:
+        """one row per step in the history, the times are in seconds"""
+        with open(path, "w", newline="") as file:
+            writer = csv.DictWriter(file, ("step", "stepTime")+PHASES+COUNTERS)
+            writer.writeheader()
+            writer.writerows(self.history)
@@ -0,0 +1,59 @@
+import math
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import batchCollision
+import collision
+import flatBody
+from vector import Vector2
+
+def create_overlapping_pairs(rng: random.Random, count: int) -> list:
+    #random rotated boxes around the origin, only the pairs the scalar SAT says collide are kept
+    pairs = []
+    while len(pairs) < count:
+        bodyA = flatBody.create_box(Vector2(0, 0), 1, rng.uniform(0.5, 2), rng.uniform(0.5, 2))
+        bodyA.rotation = rng.uniform(-math.pi, math.pi)
+        bodyB = flatBody.create_box(Vector2(rng.uniform(-1.5, 1.5), rng.uniform(-1.5, 1.5)), 1, rng.uniform(0.5, 2), rng.uniform(0.5, 2))
+        bodyB.rotation = rng.uniform(-math.pi, math.pi)
+        if collision.get_collide_reference(bodyA, bodyB)[0] != None:
+            pairs.append((bodyA, bodyB))
+    return pairs
+
+class TestBoxCollides(unittest.TestCase):
+    def test_matches_scalar_on_overlapping_boxes(self):
+        pairs = create_overlapping_pairs(random.Random(0), 500)
+        for (bodyA, bodyB), (collide, reference) in zip(pairs, batchCollision.get_box_collides(pairs)):
+            expectedCollide, expectedReference = collision.get_collide_reference(bodyA, bodyB)
+            self.assertIsNotNone(collide)
+            self.assertAlmostEqual(collide.x, expectedCollide.x, places=9)
+            self.assertAlmostEqual(collide.y, expectedCollide.y, places=9)
+            #the depth and the reference face (which polygon and which edge)
+            self.assertAlmostEqual(reference[0], expectedReference[0], places=9)
+            self.assertEqual(reference[1:], expectedReference[1:])
+            self.assertEqual(collision.find_contact_features(bodyA, bodyB, reference), collision.find_contact_features(bodyA, bodyB, expectedReference))
+
+    def test_matches_scalar_on_random_boxes(self):
+        rng = random.Random(1)
+        boxes = []
+        for i in range(60):
+            body = flatBody.create_box(Vector2(rng.uniform(0, 20), rng.uniform(0, 20)), 1, rng.uniform(1, 6), rng.uniform(1, 6))
+            body.rotation = rng.uniform(-math.pi, math.pi)
+            boxes.append(body)
+        #every box is in many pairs and misses have to agree too
+        pairs = [(bodyA, bodyB) for i, bodyA in enumerate(boxes) for bodyB in boxes[i+1:]]
+        for (bodyA, bodyB), (collide, reference) in zip(pairs, batchCollision.get_box_collides(pairs)):
+            expectedCollide, expectedReference = collision.get_collide_reference(bodyA, bodyB)
+            self.assertEqual(collide == None, expectedCollide == None)
+            if collide != None:
+                self.assertAlmostEqual((collide-expectedCollide).magnitude(), 0, places=9)
+                self.assertEqual(reference[1:], expectedReference[1:])
+
+    def test_no_pairs(self):
+        self.assertEqual(batchCollision.get_box_collides([]), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import math
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import flatBody
+from broadphase import BruteForceBroadphase, SpatialHashBroadphase
+from vector import Vector2
+
+def create_bodies(rng: random.Random) -> list:
+    #static, dynamic, sleeping, oversized and filtered bodies of every shape
+    bodies = []
+    for _ in range(150):
+        position = Vector2(rng.uniform(0, 40), rng.uniform(0, 40))
+        isStatic = rng.random() < 0.2
+        shape = rng.randrange(3)
+        if shape == 0:
+            body = flatBody.create_box(position, 1, rng.uniform(0.3, 3), rng.uniform(0.3, 3), isStatic)
+        elif shape == 1:
+            body = flatBody.create_circle(position, 1, rng.uniform(0.2, 1.5), isStatic)
+        else:
+            body = flatBody.create_regular_polygon(position, 1, rng.uniform(0.3, 1.5), rng.randint(3, 8), isStatic)
+        body.rotate_body(rng.uniform(-math.pi, math.pi))
+        if not isStatic and rng.random() < 0.2:
+            body.isAwake = False
+        if rng.random() < 0.3:
+            body.categoryBits = 1 << rng.randrange(3)
+            body.maskBits = rng.randrange(1, 8)
+        if rng.random() < 0.2:
+            body.groupIndex = rng.choice((-2, -1, 1, 2))
+        bodies.append(body)
+    #grounds and walls that cover more than MAX_CELLS_PER_BODY cells
+    bodies.append(flatBody.create_box(Vector2(20, 41), 1, 60, 1, True))
+    bodies.append(flatBody.create_box(Vector2(-1, 20), 1, 1, 60, True))
+    bodies.append(flatBody.create_box(Vector2(20, 20), 1, 50, 2))
+    #a layer that nothing collides with
+    hidden = flatBody.create_box(Vector2(10, 10), 1, 2, 2)
+    hidden.categoryBits = 0x100
+    hidden.maskBits = 0x100
+    bodies.append(hidden)
+    rng.shuffle(bodies)
+    return bodies
+
+class TestBroadphases(unittest.TestCase):
+    def test_spatial_hash_matches_brute_force(self):
+        for seed in range(5):
+            bodies = create_bodies(random.Random(seed))
+            expected = BruteForceBroadphase().find_pairs(bodies)
+            self.assertTrue(expected)
+            #an explicit cell size, a tiny one that makes many bodies oversized and the derived one
+            for cellSize in (2.5, 0.4, None):
+                with self.subTest(seed=seed, cellSize=cellSize):
+                    self.assertEqual(SpatialHashBroadphase(cellSize).find_pairs(bodies), expected)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import flatBody
+from vector import Vector2
+from world import World
+
+def create_world(rng: random.Random) -> World:
+    world = World(Vector2(60, 60), createScene=False)
+    world.add_bodies([flatBody.create_box(Vector2(rng.uniform(0, 60), rng.uniform(0, 60)), 1, 3, 3, True) for _ in range(40)])
+    world.add_bodies([flatBody.create_box(Vector2(rng.uniform(0, 60), rng.uniform(0, 60)), 1, 1, 1) for _ in range(300)])
+    return world
+
+class TestRemoval(unittest.TestCase):
+    def test_remove_keeps_every_index_consistent(self):
+        rng = random.Random(0)
+        world = create_world(rng)
+        for _ in range(10):
+            world.step(60, 2)
+            bodies = list(world.flatBodies)
+            #single removals go through destroy_proxy, big batches rebuild the tree
+            for body in rng.sample(bodies, 5):
+                world.remove_body(body)
+            if rng.random() < 0.3:
+                world.remove_bodies(rng.sample(list(world.flatBodies), 60))
+            world.add_bodies([flatBody.create_box(Vector2(rng.uniform(0, 60), rng.uniform(0, 60)), 1, 1, 1) for _ in range(20)])
+
+            tree = world.aabbTree
+            self.assertEqual(tree.leafCount, sum(1 for node in tree.nodes if node.height == 0))
+            self.assertEqual(set(world.treeProxies), set(world.flatBodies))
+            staticIndex = world.staticIndex
+            self.assertEqual(set(staticIndex.staticBodies), {body for body in world.flatBodies if body.IS_STATIC})
+            self.assertEqual(staticIndex.bodyIndices, {body: index for index, body in enumerate(staticIndex.staticBodies)})
+            solver = world.solver
+            alive = set(world.flatBodies)
+            self.assertTrue(all(bodyA in alive and bodyB in alive for bodyA, bodyB in solver.manifolds))
+            self.assertEqual({key for keys in solver.bodyManifolds.values() for key in keys}, set(solver.manifolds))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import os
+import sys
+import unittest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark
+
+def run(name: str, executor, steps: int) -> list:
+    world = benchmark.create_world(name, solverExecutor=executor)
+    #solve every substep on the executor, however few contacts it has
+    world.solver.MIN_PARALLEL_CONTACTS = 0
+    world.solver.taskCount = 3
+    for _ in range(steps):
+        world.step(60, 4)
+    return [(body.velocity.x, body.velocity.y, body.rotationalVelocity, body.position.x, body.position.y, body.rotation)
+            for body in world.flatBodies]
+
+class TestParallelSolver(unittest.TestCase):
+    def test_parallel_matches_serial(self):
+        #the islands are solved on their own and merged back in a fixed order so the result must not change by a single bit
+        expected = run("mixed_pile", None, 40)
+        for executorType in (ThreadPoolExecutor, ProcessPoolExecutor):
+            with self.subTest(executor=executorType.__name__), executorType(2) as executor:
+                self.assertEqual(run("mixed_pile", executor, 40), expected)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+from world import World
+
+class FixedTimestep:
+    """
+    steps the world with a fixed delta time no matter how fast frames are rendered
+    the frame time goes into an accumulator and whole steps are taken out of it,
+    whatever is left over is the alpha used to interpolate between the previous and current state when rendering
+    """
+    def __init__(self, world: World, tickPerSecond: int = 60, subSteps: int = 2, maxStepsPerFrame: int = 5, maxFrameTime: float = 0.25) -> None:
+        self.world = world
+        self.tickPerSecond = tickPerSecond
+        self.subSteps = subSteps
+        self.deltaTime = 1/tickPerSecond
+        #how many steps a single frame may take to catch up before the rest of the time is dropped
+        self.maxStepsPerFrame = maxStepsPerFrame
+        #longer frames (a breakpoint, dragging the window) are clamped to this
+        self.maxFrameTime = maxFrameTime
+        self.accumulator = 0
+        self.alpha = 1
+        #the simulation time that was thrown away because the steps couldn't keep up (spiral of death)
+        self.droppedTime = 0
+        self.isBehind = False
+        #called before every step, the game applies the control force here so it is the same for every step however fast frames are drawn
+        self.beforeStep = None
+        #called after every step, the recorder uses it to record every step and not only the last one of a frame
+        self.onStep = None
+
+    def advance(self, frameTime: float) -> int:
+        """adds the time of the last frame and takes as many fixed steps as fit, returns how many steps were taken"""
+        deltaTime = self.deltaTime
+        frameTime = min(max(frameTime, 0), self.maxFrameTime)
+        self.accumulator += frameTime
+        steps = 0
+        while self.accumulator >= deltaTime and steps < self.maxStepsPerFrame:
+            if self.beforeStep != None:
+                self.beforeStep()
+            self.world.step(self.tickPerSecond, self.subSteps)
+            if self.onStep != None:
+                self.onStep()
+            self.accumulator -= deltaTime
+            steps += 1
+        #if the steps are slower than real time the accumulator would keep growing and every frame would take longer,
+        #so the whole steps that are left are dropped and the simulation runs slower than real time instead
+        self.isBehind = self.accumulator >= deltaTime
+        if self.isBehind:
+            dropped = self.accumulator-self.accumulator%deltaTime
+            self.droppedTime += dropped
+            self.accumulator -= dropped
+        self.alpha = self.accumulator/deltaTime
+        return steps
@@ -0,0 +1,109 @@
+import math
+
+class Vector2:
+    """
+    small 2D vector so the simulation doesn't need pygame
+    it behaves like pygame.Vector2 for everything the engine uses (the in place operators change the vector itself)
+    and it is a sequence of 2 numbers so it can still be passed straight to pygame.draw
+    the other vector in the math operators has to be a Vector2, use Vector2(sequence) to convert tuples first
+    """
+    __slots__ = ('x', 'y')
+    #stops numpy from turning the vector into an array when a numpy number is on the left side of an operator
+    __array_ufunc__ = None
+
+    def __init__(self, x = 0.0, y = None) -> None:
+        if y != None:
+            self.x = x
+            self.y = y
+        elif isinstance(x, (int, float)):
+            self.x = x
+            self.y = x
+        else:
+            self.x, self.y = x
+
+    def __repr__(self) -> str:
+        return f"Vector2({self.x}, {self.y})"
+
+    def __len__(self) -> int:
+        return 2
+    def __getitem__(self, index: int) -> float:
+        return (self.x, self.y)[index]
+    def __iter__(self):
+        yield self.x
+        yield self.y
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Vector2):
+            return self.x == other.x and self.y == other.y
+        try:
+            otherX, otherY = other
+        except (TypeError, ValueError):
+            return NotImplemented
+        return self.x == otherX and self.y == otherY
+    def __ne__(self, other) -> bool:
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+    __hash__ = None
+
+    def __neg__(self):
+        return Vector2(-self.x, -self.y)
+    def __pos__(self):
+        return Vector2(self.x, self.y)
+    def __add__(self, other):
+        return Vector2(self.x+other.x, self.y+other.y)
+    __radd__ = __add__
+    def __sub__(self, other):
+        return Vector2(self.x-other.x, self.y-other.y)
+    def __rsub__(self, other):
+        return Vector2(other.x-self.x, other.y-self.y)
+    def __mul__(self, other):
+        #like pygame multiplying two vectors is the dot product
+        if isinstance(other, Vector2):
+            return self.x*other.x+self.y*other.y
+        return Vector2(self.x*other, self.y*other)
+    __rmul__ = __mul__
+    def __truediv__(self, other):
+        return Vector2(self.x/other, self.y/other)
+
+    def __iadd__(self, other):
+        self.x += other.x
+        self.y += other.y
+        return self
+    def __isub__(self, other):
+        self.x -= other.x
+        self.y -= other.y
+        return self
+    def __imul__(self, other):
+        self.x *= other
+        self.y *= other
+        return self
+    def __itruediv__(self, other):
+        self.x /= other
+        self.y /= other
+        return self
+
+    def copy(self):
+        return Vector2(self.x, self.y)
+    def dot(self, other) -> float:
+        return self.x*other.x+self.y*other.y
+    def cross(self, other) -> float:
+        return self.x*other.y-self.y*other.x
+    def magnitude(self) -> float:
+        return math.sqrt(self.x*self.x+self.y*self.y)
+    def magnitude_squared(self) -> float:
+        return self.x*self.x+self.y*self.y
+    length = magnitude
+    length_squared = magnitude_squared
+    def normalize(self):
+        length = math.sqrt(self.x*self.x+self.y*self.y)
+        if length == 0:
+            raise ValueError("Can't normalize Vector of length Zero")
+        return Vector2(self.x/length, self.y/length)
+    def lerp(self, other, amount: float):
+        return Vector2(self.x+(other.x-self.x)*amount, self.y+(other.y-self.y)*amount)
+    def rotate_rad(self, angle: float):
+        sine = math.sin(angle)
+        cosine = math.cos(angle)
+        return Vector2(self.x*cosine-self.y*sine, self.x*sine+self.y*cosine)
@@ -0,0 +1,61 @@
+"""
+draws the world of a running server.py and sends it the clicks and the control keys
+
+    python viewer.py --port 5600        (or --unix /tmp/physics.sock)
+
+the camera keys and zoom work like in the game, any number of viewers can watch the same server
+"""
+import argparse
+import asyncio
+import sys
+import time
+import pygame
+from vector import Vector2
+from frontend import Frontend
+from server import SimulationClient
+
+class Viewer:
+    def __init__(self, client: SimulationClient) -> None:
+        pygame.init()
+        pygame.display.set_caption('physic engine viewer')
+        self.windowSize = (649, 480)
+        self.renderPerSecond = 120
+        self.screen = pygame.display.set_mode(self.windowSize)
+        self.client = client
+        self.frontend = Frontend(client.world, Vector2(self.windowSize))
+        self.frontend.commands = client
+
+    async def run(self):
+        #the messages are read in the background while the window is drawn
+        receiving = asyncio.create_task(self.client.run())
+        previousTime = time.perf_counter()
+        while not receiving.done():
+            currentTime = time.perf_counter()
+            self.frontend.player_input(currentTime-previousTime)
+            previousTime = currentTime
+            #the client only sends the direction when it changes, the server pushes the body with it every tick
+            self.frontend.apply_control()
+            self.screen.fill((0,0,0))
+            self.frontend.render(self.screen)
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    self.client.close()
+                    pygame.quit()
+                    sys.exit()
+            pygame.display.update()
+            await asyncio.sleep(1/self.renderPerSecond)
+        print("the server closed the connection")
+        pygame.quit()
+
+async def main(args) -> None:
+    client = SimulationClient()
+    await client.connect(args.host, args.port, args.unix)
+    await Viewer(client).run()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="watches a world stepped by server.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5600)
+    parser.add_argument("--unix", help="connect to this Unix socket instead of TCP")
+    args = parser.parse_args()
+    asyncio.run(main(args))
@@ -1,32 +1,88 @@
 import flatBody
 import collision
+import broadphase
+import aabbTree
+import bodyStore
+import bodyRegistry
+import batchCollision
+import island
+import continuous
+import snapshot
+import particles
+import solver
+import stats
 import random
-import pygame
 import math
 import time
-import camera
-from pygame import Vector2, SurfaceType
-from collision import CollideInfo
-from flatBody import ShapeType, FlatBody
+from vector import Vector2
+from collision import CollideInfo, RaycastHit
+from flatBody import ShapeType, FlatBody, FlatAABB
 
 class World:
-    def __init__(self, windowSize: Vector2) -> None:
-        self.camera = camera.Camera(windowSize)
-        #PPM = pixel per meter
-        self.DEFAULT_PPM = 20
-        self.zoom = 1
-        self.pixelsPerMeter = self.DEFAULT_PPM
-        self.bound = windowSize/self.DEFAULT_PPM
-
-        self.mousePrevious = (False, False, False)
+    """
+    the simulation, it doesn't import pygame so it can be stepped from a plain script
+    the window, camera and input are in frontend.py
+    """
+    def __init__(self, bound: Vector2, useBodyStore = False, createScene = True) -> None:
+        #the size of the world in meters, bodies that fall below it are removed
+        self.bound = bound
+
         self.GRAVITY = Vector2(0, 9.8)
-        self.controlBody = flatBody.create_box(self.bound/2, 1,1,1)
-        self.controlBody.color = 'blue'
+        self.controlBody = None
         self.FPS = 0
         self.tempFPS = 0
         self.previousTime = time.time()
         
         self.collides = []
+        #finds the pairs of bodies whose AABB overlap, BruteForceBroadphase is the reference implementation
+        self.broadphase = broadphase.SpatialHashBroadphase()
+        #box-box pairs of a substep are all tested in one vectorized pass with the positions at the start of the substep,
+        #so the hits differ a little from the scalar path that sees the pushes of the earlier pairs (see batchCollision)
+        self.useBatchNarrowphase = False
+        #bodies that move more than CCD_MOTION_FRACTION of their size in a substep are stopped where they hit a body instead of jumping over it,
+        #the other body is taken where it is at the end of the substep
+        self.continuousCollision = False
+        self.CCD_MOTION_FRACTION = 0.5
+        #solves the contacts of every substep with impulses that are kept between steps,
+        #None resolves every collision once at the end of the step instead
+        self.solver = solver.SequentialImpulseSolver()
+        #bodies that stay slower than these for TIME_TO_SLEEP seconds fall asleep with the rest of their island
+        self.allowSleeping = True
+        self.SLEEP_LINEAR_VELOCITY = 0.05
+        self.SLEEP_ANGULAR_VELOCITY = 0.05
+        self.TIME_TO_SLEEP = 0.5
+        #the time every phase of the step took and how many pairs and contacts it went through, phase times are only taken while stats.enabled is True
+        self.stats = stats.WorldStats()
+        #the tree is for scene queries (query_point, query_aabb, raycast) and is refitted at the end of every step
+        self.aabbTree = aabbTree.DynamicAABBTree()
+        self.treeProxies = {}
+        self.treeStaticVersion = -1
+        #when used the bodies are kept in numpy arrays and integrated all at once
+        self.bodyStore = bodyStore.BodyStore() if useBodyStore else None
+        #every body has a handle that stays the same while it is in the world, get_body finds the body of a handle
+        self.registry = bodyRegistry.BodyRegistry()
+        #the list of the registry, removing a body moves the last body into its place
+        self.flatBodies = self.registry.bodies
+        #only the dynamic bodies go through the broadphase, the static ones are kept in their own index
+        self.dynamicBodies = []
+        #bodies removed while the world is stepping are only taken out at the end of the step so the loops over the bodies don't skip any
+        self.stepping = False
+        self.pendingRemovals = []
+        self.staticIndex = broadphase.StaticIndex()
+        #snapshot keeps the state of the bodies of the last SNAPSHOT_FRAMES snapshots so restore can rewind to one of them,
+        #the buffer is made by the first snapshot and snapshotEveryStep takes one at the end of every step
+        self.snapshots = None
+        self.SNAPSHOT_FRAMES = 300
+        self.snapshotEveryStep = False
+        #circle particles that are stepped with arrays instead of as bodies and only collide with each other and the static bodies,
+        #made by the first add_particles
+        self.particles = None
+        if createScene:
+            self.create_default_scene()
+
+    def create_default_scene(self):
+        self.controlBody = flatBody.create_box(self.bound/2, 1,1,1)
+        self.controlBody.color = 'blue'
         ground  = flatBody.create_box(Vector2(self.bound.x/2, self.bound.y-0.5), 1, self.bound.x-10, 1, isStatic=True)
         wall1 = flatBody.create_box(Vector2(5, self.bound.y/2), 1, 1, self.bound.y, isStatic=True)
         wall2 = flatBody.create_box(Vector2(self.bound.x-5, self.bound.y/2), 1, 1, self.bound.y, isStatic=True)
@@ -34,50 +90,192 @@ class World:
         slope2 = flatBody.create_box(Vector2(self.bound.x-10, self.bound.y-5), 1, 9, 1, isStatic=True)
         slope1.rotate_body(math.pi/20)
         slope2.rotate_body(-math.pi/10)
-        self.flatBodies = [self.controlBody,ground]
+        self.add_body(self.controlBody)
+        self.add_body(ground)
         #self.create_randomBodies(10)
 
-    def render(self, display:SurfaceType):
-        for body in self.flatBodies:
-            body.render(display, self.pixelsPerMeter, self.camera)
-        for contactInfo in self.collides:
-            for points in contactInfo.contactPoints:
-                #self.render_point(display, points)
-                pass
-
-    def player_input(self, tickPerSecond):
-        keys = pygame.key.get_pressed()
-        mouse = pygame.mouse.get_pressed()
-        cameraMove = Vector2()
-
-        if mouse[0] and not self.mousePrevious[0]:
-            height = random.randrange(5, 40)/10
-            width = random.randrange(5, 40)/10
-            body = flatBody.create_box(self.screen_to_world(Vector2(pygame.mouse.get_pos())), width*height, height, width)
-            self.flatBodies.append(body)
-        if mouse[2] and not self.mousePrevious[2]:
-            radius = random.randrange(5,20)/10
-            body = flatBody.create_circle(self.screen_to_world(Vector2(pygame.mouse.get_pos())), radius**2, radius)
-            self.flatBodies.append(body)    
-        if keys[pygame.K_EQUALS]:
-            self.zoom += 0.125/tickPerSecond
-            self.pixelsPerMeter = self.zoom * self.DEFAULT_PPM
-        if keys[pygame.K_MINUS]:
-            self.zoom -= 0.125/tickPerSecond
-            self.pixelsPerMeter = self.zoom * self.DEFAULT_PPM
-        if keys[pygame.K_p]:
-            self.debug()
-        if keys[pygame.K_UP]:
-            cameraMove += Vector2(0,1)
-        if keys[pygame.K_DOWN]:
-            cameraMove += Vector2(0,-1)
-        if keys[pygame.K_RIGHT]:
-            cameraMove += Vector2(-1,0)
-        if keys[pygame.K_LEFT]:
-            cameraMove += Vector2(1,0)
-        self.camera.position += cameraMove*self.pixelsPerMeter/tickPerSecond*10
-        self.control_body(keys)
-        self.mousePrevious = mouse
+    def add_body(self, body: FlatBody) -> int:
+        """adds the body and returns its handle"""
+        handle = self._register_body(body)
+        self.treeProxies[body] = self.aabbTree.create_proxy(body.get_transformedAABB(), body)
+        return handle
+
+    def add_bodies(self, bodies: list) -> list:
+        """adds the bodies and returns their handles, they are put into the aabb tree together"""
+        handles = [self._register_body(body) for body in bodies]
+        proxies = self.aabbTree.create_proxies([body.get_transformedAABB() for body in bodies], bodies)
+        self.treeProxies.update(zip(bodies, proxies))
+        return handles
+
+    def _register_body(self, body: FlatBody) -> int:
+        handle = self.registry.add(body)
+        if body.IS_STATIC:
+            self.staticIndex.add(body)
+        else:
+            body.dynamicIndex = len(self.dynamicBodies)
+            self.dynamicBodies.append(body)
+            if self.bodyStore != None:
+                self.bodyStore.add(body)
+        return handle
+
+    def remove_body(self, body: FlatBody):
+        self.remove_bodies((body,))
+
+    def remove_bodies(self, bodies) -> None:
+        """removes the bodies, while the world is stepping they are removed at the end of the step"""
+        if self.stepping:
+            self.pendingRemovals += bodies
+            return
+        registry = self.registry
+        dynamicBodies = self.dynamicBodies
+        removed = set()
+        staticBodies = []
+        proxies = []
+        for body in bodies:
+            if body in removed or body not in registry:
+                continue
+            removed.add(body)
+            registry.remove(body)
+            if body.IS_STATIC:
+                staticBodies.append(body)
+            else:
+                #the last dynamic body takes the place of the removed one
+                index = body.dynamicIndex
+                last = dynamicBodies.pop()
+                if last is not body:
+                    dynamicBodies[index] = last
+                    last.dynamicIndex = index
+                body.dynamicIndex = -1
+            if body.store != None:
+                body.store.remove(body)
+            proxy = self.treeProxies.pop(body, None)
+            if proxy != None:
+                proxies.append(proxy)
+        self.aabbTree.destroy_proxies(proxies)
+        if staticBodies:
+            self.staticIndex.remove_many(staticBodies)
+        if removed and self.solver != None:
+            self.solver.remove_bodies(removed)
+
+    def flush_removals(self) -> None:
+        pendingRemovals = self.pendingRemovals
+        self.pendingRemovals = []
+        self.remove_bodies(pendingRemovals)
+
+    def snapshot(self) -> int:
+        """stores the position, velocity, rotation, rotational velocity, force and sleep of every body, which bodies there are and the impulses of the solver, returns the frame number"""
+        if self.snapshots == None:
+            self.snapshots = snapshot.SnapshotBuffer(self.SNAPSHOT_FRAMES, max(len(self.flatBodies), 64))
+        return self.snapshots.capture(self.flatBodies, self.solver.get_impulses() if self.solver != None else None)
+
+    def restore(self, frame: int) -> None:
+        """
+        puts the world back into the state of a snapshot, the snapshots after it are dropped
+        bodies added since then are removed and bodies removed since then are put back with the handles they had,
+        the solver gets back the impulses it had so the next step is warm started like it was the first time
+        """
+        if self.stepping:
+            raise RuntimeError("the world can't be restored while it is stepping")
+        snapshots = self.snapshots
+        if snapshots == None:
+            raise ValueError("there are no snapshots to restore")
+        state, handles, bodies, islands = snapshots.get_frame(frame)
+        current = self.flatBodies
+        if len(bodies) != len(current) or any(body is not frameBody or body.handle != handle for body, frameBody, handle in zip(current, bodies, handles.tolist())):
+            self._restore_bodies(bodies, handles.tolist())
+        if snapshot.write_state(bodies, state, islands, self.bodyStore):
+            self.staticIndex.dirty = True
+        #every body can have moved, sleeping ones too, so every proxy is checked and not only the awake ones like update_aabbTree does
+        tree = self.aabbTree
+        for body, proxy in self.treeProxies.items():
+            tree.move_proxy(proxy, body.get_transformedAABB())
+        if self.solver != None:
+            self.solver.set_impulses(snapshots.get_impulses(frame))
+        self.collides = []
+        snapshots.discard_after(frame)
+
+    def _restore_bodies(self, bodies: list, handles: list) -> None:
+        #makes the bodies of the world the bodies of a snapshot in the same order and with the same handles
+        keep = set(bodies)
+        self.remove_bodies([body for body in self.flatBodies if body not in keep])
+        self.add_bodies([body for body in bodies if body.handle == None])
+        self.registry.restore(bodies, handles)
+        self.dynamicBodies[:] = [body for body in bodies if not body.IS_STATIC]
+        for index, body in enumerate(self.dynamicBodies):
+            body.dynamicIndex = index
+
+    def add_particles(self, positions, radii, masses = None, velocities = None) -> None:
+        """adds a circle particle for every position (see particles.ParticleSystem.add)"""
+        if self.particles == None:
+            self.particles = particles.ParticleSystem()
+        self.particles.add(positions, radii, masses, velocities)
+
+    def get_body(self, handle: int) -> FlatBody:
+        """the body of a handle from add_body or spawn_many, None if the body was removed"""
+        return self.registry.get(handle)
+
+    def spawn_many(self, positions, masses, widths = None, heights = None, radii = None, rotations = None, velocities = None, isStatic = False) -> list:
+        """
+        adds a body for every position and returns their handles, the other parameters have a value for every body
+        they are circles when radii is given and boxes widths wide and heights high otherwise, every parameter can be a list or a numpy array
+        """
+        positions = _as_list(positions)
+        masses = _as_list(masses)
+        #the parameters can be numpy arrays so they are compared with is, == would compare every value
+        if radii is not None:
+            bodies = [flatBody.create_circle(Vector2(x, y), mass, radius, isStatic) for (x, y), mass, radius in zip(positions, masses, _as_list(radii))]
+        else:
+            bodies = [flatBody.create_box(Vector2(x, y), mass, width, height, isStatic)
+                      for (x, y), mass, width, height in zip(positions, masses, _as_list(widths), _as_list(heights))]
+        if rotations is not None:
+            for body, rotation in zip(bodies, _as_list(rotations)):
+                body.rotate_body(rotation)
+        if velocities is not None:
+            for body, (x, y) in zip(bodies, _as_list(velocities)):
+                body.velocity = Vector2(x, y)
+        return self.add_bodies(bodies)
+
+    def despawn_many(self, handles) -> None:
+        """removes the bodies of the handles, handles of bodies that were already removed are skipped"""
+        get = self.registry.get
+        self.remove_bodies([body for body in map(get, _as_list(handles)) if body != None])
+
+    def set_collision_filter(self, body: FlatBody, categoryBits: int = None, maskBits: int = None, groupIndex: int = None) -> None:
+        """changes the collision filter of a body (see broadphase.should_collide), the values that are None are kept"""
+        if categoryBits != None:
+            body.categoryBits = categoryBits
+        if maskBits != None:
+            body.maskBits = maskBits
+        if groupIndex != None:
+            body.groupIndex = groupIndex
+        if body.IS_STATIC:
+            #the static index leaves out the static bodies that can't collide so it is built again
+            self.staticIndex.dirty = True
+        elif not body.isAwake:
+            #a sleeping body could now collide with the sleeping bodies around it
+            body.wake_up()
+
+    def spawn_box(self, position: Vector2) -> FlatBody:
+        #a box with a random size like the ones made with a left click
+        height = random.randrange(5, 40)/10
+        width = random.randrange(5, 40)/10
+        body = flatBody.create_box(position, width*height, height, width)
+        self.add_body(body)
+        return body
+
+    def spawn_circle(self, position: Vector2) -> FlatBody:
+        #a circle with a random size like the ones made with a right click
+        radius = random.randrange(5,20)/10
+        body = flatBody.create_circle(position, radius**2, radius)
+        self.add_body(body)
+        return body
+
+    def spawn_polygon(self, position: Vector2) -> FlatBody:
+        #a regular polygon with a random size and number of sides like the ones made with a middle click
+        radius = random.randrange(5,20)/10
+        body = flatBody.create_regular_polygon(position, radius**2, radius, random.randrange(3, 9))
+        self.add_body(body)
+        return body
 
     def step(self, tickPerSecond:int, subStep:int):
         self.tempFPS += 1
@@ -85,91 +283,313 @@ class World:
             self.previousTime = time.time()
             self.FPS = self.tempFPS
             self.tempFPS = 0
+        self.stats.begin_step()
+        self.stepping = True
+        #the clock is only read while profiling so turning it off costs a few checks per step
+        profile = self.stats.enabled
+        if profile:
+            stepStart = start = time.perf_counter()
         self.collides = []
+        for body in self.dynamicBodies:
+            body.save_previous_state()
+        contactSolver = self.solver
+        if contactSolver != None:
+            contactSolver.begin_step()
         for _ in range(subStep):
-            for body in self.flatBodies:
-                body.physic_update(tickPerSecond*subStep, self.GRAVITY)
-            
-            #collision
-            flatBodies = self.flatBodies
-            for i in range(len(flatBodies)-1):
-                bodyA = flatBodies[i]
-                aabbA = bodyA.get_transformedAABB()
-                for j in range(i+1, len(flatBodies)):
-                    bodyB = flatBodies[j]
-                    aabbB = bodyB.get_transformedAABB()
-                    if not collision.collideAABB(aabbA, aabbB):
-                        continue
-                    if bodyA.IS_STATIC and bodyB.IS_STATIC:
-                        continue
-                    collide = collision.get_collide(bodyA, bodyB)
-                    if collide == None:
-                        continue
-                    if bodyA.IS_STATIC:
-                        bodyB.push_body(collide)
-                        self
-                    elif bodyB.IS_STATIC:
-                        bodyA.push_body(-collide)
-                    else:
-                        bodyA.push_body(-collide/2)
-                        bodyB.push_body(collide/2)
-                    self.collides.append(CollideInfo(collide, bodyA, bodyB, collision.find_contact(bodyA, bodyB)))
-        for collideInfo in self.collides:
-            collision.resolve_collision_with_rotation(collideInfo)
-        
-        for body in self.flatBodies:
+            if contactSolver == None:
+                self.integrate(tickPerSecond*subStep)
+                if profile: start = self._lap("integrate", start)
+                self.collides += self.find_collides()
+                if profile: start = time.perf_counter()
+                continue
+            #the contacts are solved between integrating the velocities and the positions
+            self.integrate_velocities(tickPerSecond*subStep)
+            if profile: start = self._lap("integrate", start)
+            collides = self.find_collides()
+            if profile: start = time.perf_counter()
+            self.collides += collides
+            manifolds = [contactSolver.add_contact(collideInfo) for collideInfo in collides if collideInfo.collide != Vector2()]
+            contactSolver.solve(manifolds, tickPerSecond*subStep)
+            if profile: start = self._lap("solve", start)
+            self.integrate_positions(tickPerSecond*subStep)
+            if profile: start = self._lap("integrate", start)
+        if contactSolver == None:
+            for collideInfo in self.collides:
+                collision.resolve_collision_with_rotation(collideInfo)
+        else:
+            contactSolver.end_step()
+        if profile: start = self._lap("solve", start)
+        self.update_sleeping(1/tickPerSecond)
+        if profile: start = self._lap("sleep", start)
+        if self.particles != None:
+            self.particles.step(tickPerSecond, subStep, self.GRAVITY, self.staticIndex, self.bound)
+            self.stats.counts["particleContacts"] += self.particles.contactCount
+            if profile: start = self._lap("particles", start)
+
+        for body in self.dynamicBodies:
             self.void_bodyPos(body)
             #self.wrap_bodyPos(body)
+        self.stepping = False
+        self.flush_removals()
+        if profile: start = self._lap("void", start)
+        self.update_aabbTree()
+        if profile: start = self._lap("aabbUpdate", start)
+        if self.snapshotEveryStep:
+            self.snapshot()
+        if profile:
+            start = self._lap("snapshot", start)
+            self.stats.end_step(start-stepStart)
+        else:
+            self.stats.end_step()
 
-    def create_randomBodies(self, num:int):
-        flatBodies = self.flatBodies
-        
+    def _lap(self, phase: str, start: float) -> float:
+        #adds the time since start to the phase and returns the current time
+        now = time.perf_counter()
+        self.stats.times[phase] += now-start
+        return now
+
+    def integrate(self, tickPerSec: int):
+        if self.continuousCollision:
+            #the fast bodies are found with the velocities they will move with
+            self.integrate_velocities(tickPerSec)
+            self.integrate_positions(tickPerSec)
+        elif self.bodyStore != None:
+            self.bodyStore.integrate(tickPerSec, self.GRAVITY)
+        else:
+            for body in self.dynamicBodies:
+                if body.isAwake:
+                    body.physic_update(tickPerSec, self.GRAVITY)
+
+    def integrate_velocities(self, tickPerSec: int):
+        if self.bodyStore != None:
+            self.bodyStore.integrate_velocities(tickPerSec, self.GRAVITY)
+        else:
+            for body in self.dynamicBodies:
+                if body.isAwake:
+                    body.integrate_velocity(tickPerSec, self.GRAVITY)
+
+    def integrate_positions(self, tickPerSec: int):
+        fastBodies = self.find_fastBodies(tickPerSec) if self.continuousCollision else None
+        if self.bodyStore != None:
+            self.bodyStore.integrate_positions(tickPerSec)
+        else:
+            for body in self.dynamicBodies:
+                if body.isAwake:
+                    body.integrate_position(tickPerSec)
+        if fastBodies:
+            self.sweep_fastBodies(fastBodies)
+
+    def find_fastBodies(self, tickPerSec: int) -> list:
+        """(body, position, rotation, aabb) before the move of every awake body that moves more than CCD_MOTION_FRACTION of its size in this substep"""
+        fastBodies = []
+        fraction = self.CCD_MOTION_FRACTION
+        for body in self.dynamicBodies:
+            if not body.isAwake:
+                continue
+            velocity = body.velocity
+            maxMotion = fraction*continuous.get_size(body)*tickPerSec
+            if velocity.x*velocity.x+velocity.y*velocity.y > maxMotion*maxMotion:
+                aabb = body.get_transformedAABB()
+                fastBodies.append((body, body.position.copy(), body.rotation, (aabb.minX, aabb.maxX, aabb.minY, aabb.maxY)))
+        return fastBodies
+
+    def sweep_fastBodies(self, fastBodies: list) -> None:
+        """moves every fast body back to where it first hits a body it passed on its way"""
+        #stopped a little inside the body so the next substep finds the contacts and the solver stops it
+        targetDepth = solver.SequentialImpulseSolver.LINEAR_SLOP
+        counts = self.stats.counts
+        for body, startPosition, startRotation, (minX, maxX, minY, maxY) in fastBodies:
+            endPosition = body.position.copy()
+            endRotation = body.rotation
+            aabb = body.get_transformedAABB()
+            #the aabb of everything the body goes through
+            sweptAABB = FlatAABB(min(minX, aabb.minX), max(maxX, aabb.maxX), min(minY, aabb.minY), max(maxY, aabb.maxY), None)
+            impactTime = 1
+            for other in self.aabbTree.query_aabb(sweptAABB):
+                if other is body or not broadphase.should_collide(body, other) or not collision.collideAABB(other.get_transformedAABB(), sweptAABB):
+                    continue
+                counts["toiCalls"] += 1
+                hitTime = continuous.time_of_impact(body, startPosition, startRotation, endPosition, endRotation, other, targetDepth, impactTime)
+                if hitTime != None:
+                    impactTime = hitTime
+            #the body keeps its velocity, the time after the impact is lost
+            continuous.set_pose(body, startPosition, startRotation, endPosition, endRotation, impactTime)
+
+    def find_collides(self) -> list:
+        """finds the colliding pairs, pushes them apart and returns a CollideInfo with the contact points of each"""
+        stats = self.stats
+        profile = stats.enabled
+        if profile:
+            start = time.perf_counter()
+        #collision, the static bodies are only looked up in the static index
+        dynamicBodies = self.dynamicBodies
+        staticBodies = self.staticIndex.staticBodies
+        pairs = self.broadphase.find_pairs(dynamicBodies)
+        staticPairs = self.staticIndex.find_pairs(dynamicBodies)
+        bodyPairs = [(staticBodies[i], dynamicBodies[j]) for i, j in staticPairs]
+        bodyPairs += [(dynamicBodies[i], dynamicBodies[j]) for i, j in pairs]
+        if profile:
+            start = self._lap("broadphase", start)
+        counts = stats.counts
+        counts["pairTests"] += self.broadphase.pairTests+self.staticIndex.pairTests
+        counts["aabbHits"] += len(bodyPairs)
+        batchedCollides = {}
+        if self.useBatchNarrowphase:
+            boxPairs = [n for n, (bodyA, bodyB) in enumerate(bodyPairs) if bodyA.shapeType == ShapeType.Box and bodyB.shapeType == ShapeType.Box]
+            boxCollides = batchCollision.get_box_collides([bodyPairs[n] for n in boxPairs])
+            batchedCollides = dict(zip(boxPairs, boxCollides))
+            #every row of the batch is one SAT test
+            counts["satCalls"] += len(boxPairs)
+            if profile:
+                start = self._lap("collide", start)
+        collides = []
+        contactCount = 0
+        slop = self.solver.LINEAR_SLOP if self.solver != None else 0
+        for n, (bodyA, bodyB) in enumerate(bodyPairs):
+            #the reference face SAT found for two polygons is used again to find their contacts
+            reference = None
+            if n in batchedCollides:
+                collide, reference = batchedCollides[n]
+            else:
+                if profile:
+                    start = time.perf_counter()
+                collide, reference = collision.get_collide_reference(bodyA, bodyB)
+                #only two polygons go through SAT, circles are tested by their distance
+                if bodyA.shapeType != ShapeType.Circle and bodyB.shapeType != ShapeType.Circle:
+                    counts["satCalls"] += 1
+                if profile:
+                    self._lap("collide", start)
+            if collide == None:
+                continue
+            #touching a sleeping body wakes up its island
+            if not bodyA.isAwake:
+                bodyA.wake_up()
+            if not bodyB.isAwake:
+                bodyB.wake_up()
+            push = collide
+            if slop > 0:
+                #a little overlap is left so the bodies still touch in the next substep and keep their contacts
+                depth = collide.magnitude()
+                push = collide*(max(depth-slop, 0)/depth) if depth > 0 else collide
+            if bodyA.IS_STATIC:
+                bodyB.push_body(push)
+            elif bodyB.IS_STATIC:
+                bodyA.push_body(-push)
+            else:
+                bodyA.push_body(-push/2)
+                bodyB.push_body(push/2)
+            if profile:
+                start = time.perf_counter()
+            contactFeatures = collision.find_contact_features(bodyA, bodyB, reference)
+            if profile:
+                self._lap("contact", start)
+            contactPoints = [point for point, _, _ in contactFeatures]
+            contactCount += len(contactPoints)
+            collides.append(CollideInfo(collide, bodyA, bodyB, contactPoints, [featureId for _, featureId, _ in contactFeatures],
+                                        [depth for _, _, depth in contactFeatures]))
+        counts["narrowphaseHits"] += len(collides)
+        counts["contacts"] += contactCount
+        return collides
+
+    def update_sleeping(self, deltaTime: float):
+        if not self.allowSleeping:
+            return
+        linearTolerance = self.SLEEP_LINEAR_VELOCITY**2
+        angularTolerance = self.SLEEP_ANGULAR_VELOCITY
+        awakeBodies = []
+        for body in self.dynamicBodies:
+            if not body.isAwake:
+                continue
+            awakeBodies.append(body)
+            if body.velocity.magnitude_squared() > linearTolerance or abs(body.rotationalVelocity) > angularTolerance:
+                body.sleepTime = 0
+            else:
+                body.sleepTime += deltaTime
+        #an island only falls asleep when every body in it has been resting long enough
+        for bodies in island.build_islands(awakeBodies, self.collides):
+            if min(body.sleepTime for body in bodies) < self.TIME_TO_SLEEP:
+                continue
+            for body in bodies:
+                body.put_to_sleep(bodies)
+
+    def update_aabbTree(self):
+        #only the bodies that moved out of their fat aabb are reinserted
+        tree = self.aabbTree
+        #static bodies only has to be refitted when they moved, which also rebuilds the static index
+        bodies = self.dynamicBodies
+        if self.staticIndex.dirty or self.staticIndex.version != self.treeStaticVersion:
+            bodies = self.flatBodies
+            self.treeStaticVersion = self.staticIndex.version
+        for body in bodies:
+            proxy = self.treeProxies.get(body)
+            #sleeping bodies can't have moved
+            if proxy != None and not body.isAwake:
+                continue
+            if proxy == None:
+                self.treeProxies[body] = tree.create_proxy(body.get_transformedAABB(), body)
+            else:
+                tree.move_proxy(proxy, body.get_transformedAABB())
+
+    def query_point(self, point: Vector2) -> list:
+        """returns the bodies that contains the point"""
+        return [body for body in self.aabbTree.query_point(point) if collision.contains_point(body, point)]
+
+    def query_aabb(self, aabb: FlatAABB) -> list:
+        """returns the bodies that overlaps the aabb"""
+        return [body for body in self.aabbTree.query_aabb(aabb) if collision.intersect_body_aabb(body, aabb)]
+
+    def raycast(self, origin: Vector2, direction: Vector2, maxDistance: float = math.inf):
+        """returns the RaycastHit of the closest body the ray hits or None"""
+        if direction == Vector2():
+            return None
+        direction = direction.normalize()
+        closest = [None]
+        def clip_ray(body: FlatBody, maxDistance: float):
+            hit = collision.raycast_body(body, origin, direction)
+            if hit == None or hit[0] > maxDistance:
+                return maxDistance
+            closest[0] = RaycastHit(body, origin+direction*hit[0], hit[1], hit[0])
+            return hit[0]
+        self.aabbTree.raycast(origin, direction, maxDistance, clip_ray)
+        return closest[0]
+
+    def create_randomBodies(self, num:int, rng: random.Random = random):
+        #pass a seeded random.Random as rng to get the same bodies every time
+        bodies = []
         for _ in range(num):
-            isStatic = random.randint(1,3) == 0
-            pos = Vector2(random.random()*self.bound.x, random.random()*self.bound.y)
-            mass = random.randrange(10, 20)/10
-            if random.random() <= 0.2:
-                width = random.randrange(10, 20)/20
-                height = random.randrange(10, 20)/20
-                rotation = random.random()*2*math.pi
+            isStatic = rng.randint(1,3) == 0
+            pos = Vector2(rng.random()*self.bound.x, rng.random()*self.bound.y)
+            mass = rng.randrange(10, 20)/10
+            if rng.random() <= 0.2:
+                width = rng.randrange(10, 20)/20
+                height = rng.randrange(10, 20)/20
+                rotation = rng.random()*2*math.pi
                 body = flatBody.create_box(pos, mass, width, height, isStatic)
                 body.rotation = rotation
             else:
-                radius = random.randrange(10, 20)/20
+                radius = rng.randrange(10, 20)/20
                 body = flatBody.create_circle(pos, mass, radius, isStatic)
-            flatBodies.append(body)
-    def control_body(self, keys: list):
-        #control the body
+            bodies.append(body)
+        self.add_bodies(bodies)
+    def control_body(self, dir: Vector2):
+        #control the body, dir is the direction the keys are pointing (WASD in the frontend)
         if self.controlBody == None:
             return
-        dir = Vector2()
-        if keys[pygame.K_w]:
-            dir.y -= 1
-        if keys[pygame.K_a]:
-            dir.x -= 1
-        if keys[pygame.K_s]:
-            dir.y += 1
-        if keys[pygame.K_d]:
-            dir.x += 1
-        
         self.controlBody.apply_force(dir*self.controlBody.MASS*200)
     
     def void_bodyPos(self, body:FlatBody):
         if body.position.y > self.bound.y:
-            self.flatBodies.remove(body)
+            self.remove_body(body)
     def wrap_bodyPos(self, body: FlatBody):
-        body.position.x = body.position.x % self.bound.x
-        body.position.y = body.position.y % self.bound.y
+        body.move_body(Vector2(body.position.x % self.bound.x, body.position.y % self.bound.y))
 
-    def world_to_screen(self, world_pos:Vector2):
-        return (world_pos+self.camera.position)*self.pixelsPerMeter
-    
-    def screen_to_world(self, screen_pos:Vector2):
-        return (screen_pos - self.camera.position)/self.pixelsPerMeter
+    def reset_counters(self):
+        self.stats.reset()
 
     def debug(self):
         print(f"FPS: {self.FPS}")
         print(f"Body Count: {len(self.flatBodies)}")
 
-    def render_point(self, display: pygame.SurfaceType, point:Vector2):
-        pygame.draw.circle(display, 'red', point*self.pixelsPerMeter+self.camera.position, 4)
+def _as_list(values) -> list:
+    #numpy arrays are turned into lists of floats in one call instead of one numpy scalar per value
+    return values.tolist() if hasattr(values, "tolist") else list(values)